@@ -1,12 +1,13 @@
-use std::process::Command;
 use tracing::info;
 
 /// AppleScript-based fallback operations
 pub struct AppleScriptManager;
 
 impl AppleScriptManager {
-    /// Extract text from focused field using AppleScript
-    pub fn extract_text() -> Result<String, Box<dyn std::error::Error>> {
+    /// Extract text from focused field using AppleScript.
+    ///
+    /// `osascript` is killed if the extraction is abandoned, e.g. on a stage timeout.
+    pub async fn extract_text() -> Result<String, Box<dyn std::error::Error>> {
         info!("🍎 Attempting AppleScript text extraction...");
         
         let script = r#"
@@ -28,10 +29,12 @@ impl AppleScriptManager {
             end tell
         "#;
         
-        let output = Command::new("osascript")
+        let output = tokio::process::Command::new("osascript")
             .arg("-e")
             .arg(script)
-            .output()?;
+            .kill_on_drop(true)
+            .output()
+            .await?;
         
         if output.status.success() {
             let text = String::from_utf8_lossy(&output.stdout).trim().to_string();
@@ -45,7 +48,7 @@ impl AppleScriptManager {
     }
 
     /// Get the name of the frontmost application
-    pub fn get_frontmost_app() -> Result<String, Box<dyn std::error::Error>> {
+    pub async fn get_frontmost_app() -> Result<String, Box<dyn std::error::Error>> {
         let script = r#"
             tell application "System Events"
                 set frontApp to name of first application process whose frontmost is true
@@ -53,10 +56,12 @@ impl AppleScriptManager {
             return frontApp
         "#;
         
-        let output = Command::new("osascript")
+        let output = tokio::process::Command::new("osascript")
             .arg("-e")
             .arg(script)
-            .output()?;
+            .kill_on_drop(true)
+            .output()
+            .await?;
         
         if output.status.success() {
             let app_name = String::from_utf8_lossy(&output.stdout).trim().to_string();
@@ -67,8 +72,8 @@ impl AppleScriptManager {
     }
 
     /// Check if the current app is known to be problematic with accessibility
-    pub fn is_problematic_app() -> bool {
-        match Self::get_frontmost_app() {
+    pub async fn is_problematic_app() -> bool {
+        match Self::get_frontmost_app().await {
             Ok(app_name) => {
                 let app_name = app_name.to_lowercase();
                 
@@ -108,11 +113,12 @@ impl AppleScriptManager {
 #[cfg(test)]
 mod tests {
     use super::*;
+    use crate::spell_check::runtime::shared_runtime;
 
     #[test]
     fn test_get_frontmost_app() {
         // This test depends on system state and permissions
-        let result = AppleScriptManager::get_frontmost_app();
+        let result = shared_runtime().block_on(AppleScriptManager::get_frontmost_app());
         // We just verify it returns some result
         assert!(result.is_ok() || result.is_err());
     }
@@ -120,7 +126,7 @@ mod tests {
     #[test]
     fn test_is_problematic_app() {
         // This test depends on what app is currently running
-        let result = AppleScriptManager::is_problematic_app();
+        let result = shared_runtime().block_on(AppleScriptManager::is_problematic_app());
         // Should return a boolean
         assert!(result == true || result == false);
     }
@@ -128,7 +134,7 @@ mod tests {
     #[test]
     fn test_extract_text_without_permissions() {
         // This test will likely fail in CI without proper permissions
-        let result = AppleScriptManager::extract_text();
+        let result = shared_runtime().block_on(AppleScriptManager::extract_text());
         // We just verify it returns some result
         assert!(result.is_ok() || result.is_err());
     }
@@ -5,6 +5,25 @@ use tracing::{debug, warn};
 
 pub type ElementRef = AXUIElementRef;
 
+/// An element handed to a blocking task.
+///
+/// The AX API may be called from any thread; a press only ever uses its
+/// element from one stage at a time, never from two threads at once.
+#[derive(Clone, Copy)]
+pub struct SendElement(ElementRef);
+
+unsafe impl Send for SendElement {}
+
+impl SendElement {
+    pub fn new(element: ElementRef) -> Self {
+        Self(element)
+    }
+
+    pub fn get(self) -> ElementRef {
+        self.0
+    }
+}
+
 /// Result type for accessibility operations
 pub type AxResult<T> = Result<T, Box<dyn std::error::Error>>;
 
@@ -3,9 +3,20 @@ use cocoa::appkit::NSPasteboard;
 use objc::{msg_send, sel, sel_impl};
 use std::ffi;
 use std::process::Command;
-use std::thread;
 use std::time::Duration;
-use tracing::info;
+use tracing::{info, warn};
+
+/// Time for the focused app to act on Cmd+A before the next key
+const SELECT_SETTLE: Duration = Duration::from_millis(50);
+
+/// Time for the focused app to put the selection on the clipboard after Cmd+C
+const COPY_SETTLE: Duration = Duration::from_millis(100);
+
+/// Time for the clipboard and selection to settle before pasting
+const PASTE_SETTLE: Duration = Duration::from_millis(100);
+
+/// Right arrow: collapses a selection to its end without changing the text
+const COLLAPSE_SELECTION_KEY: &str = "key code 124";
 
 #[cfg(test)]
 use mockall::automock;
@@ -117,27 +128,29 @@ impl<B: ClipboardBackend> ClipboardManager<B> {
         self.backend.set_text(text)
     }
 
-    /// Extract text from current focused field via clipboard
-    pub fn extract_text_via_clipboard(&self) -> Result<String, Box<dyn std::error::Error>> {
+    /// Extract text from current focused field via clipboard.
+    ///
+    /// The waits for the focused app are timer sleeps, so a stage timeout or a
+    /// newer press can abandon the extraction between keys; the user's clipboard
+    /// is put back either way.
+    pub async fn extract_text_via_clipboard(&self) -> Result<String, Box<dyn std::error::Error>> {
         info!("🔄 Attempting clipboard fallback for text extraction...");
         
         // Save current clipboard content
-        let old_clipboard = self.get_text()?;
+        let restore = ClipboardRestore::new(&self.backend, self.get_text()?);
         
         // Select all text and copy
         self.send_select_all()?;
-        thread::sleep(Duration::from_millis(50));
+        tokio::time::sleep(SELECT_SETTLE).await;
         
         self.send_copy()?;
-        thread::sleep(Duration::from_millis(100));
+        tokio::time::sleep(COPY_SETTLE).await;
         
         // Get the copied text
         let copied_text = self.get_text()?;
         
         // Restore old clipboard content
-        if let Some(old_content) = old_clipboard {
-            self.set_text(&old_content)?;
-        }
+        restore.restore()?;
         
         match copied_text {
             Some(text) if !text.trim().is_empty() => {
@@ -148,19 +161,28 @@ impl<B: ClipboardBackend> ClipboardManager<B> {
         }
     }
 
-    /// Set text in focused field via clipboard (select all + paste)
-    pub fn set_text_via_clipboard(&self, text: &str) -> Result<(), Box<dyn std::error::Error>> {
+    /// Set text in focused field via clipboard (select all + paste).
+    ///
+    /// The corrected text stays on the clipboard, as the app reads it after
+    /// Cmd+V. If the press is abandoned before the paste, the user's clipboard
+    /// is put back and the field is left unselected.
+    pub async fn set_text_via_clipboard(&self, text: &str) -> Result<(), Box<dyn std::error::Error>> {
         info!("📋 Attempting clipboard fallback for text setting");
         
+        // Only needed if the paste never happens
+        let mut restore = ClipboardRestore::new(&self.backend, self.get_text().ok().flatten());
+        
         // Copy corrected text to clipboard using the backend
         self.set_text(text)?;
-        thread::sleep(Duration::from_millis(100));
+        tokio::time::sleep(PASTE_SETTLE).await;
         
         // Select all and paste
         self.send_select_all()?;
-        thread::sleep(Duration::from_millis(100));
+        restore.selected = true;
+        tokio::time::sleep(PASTE_SETTLE).await;
         
         self.send_paste()?;
+        restore.disarm();
         
         info!("📋 Successfully set text via clipboard");
         Ok(())
@@ -182,6 +204,52 @@ impl<B: ClipboardBackend> ClipboardManager<B> {
     }
 }
 
+/// Puts the user's clipboard back when a clipboard sequence is dropped part
+/// way, by a stage timeout or a newer press, and collapses a selection that
+/// was never pasted over
+struct ClipboardRestore<'a, B: ClipboardBackend> {
+    backend: &'a B,
+    saved: Option<String>,
+    /// Whether Cmd+A has selected the field's text
+    selected: bool,
+}
+
+impl<'a, B: ClipboardBackend> ClipboardRestore<'a, B> {
+    fn new(backend: &'a B, saved: Option<String>) -> Self {
+        Self { backend, saved, selected: false }
+    }
+
+    /// Put the saved text back now, reporting a failure instead of logging it
+    fn restore(mut self) -> Result<(), Box<dyn std::error::Error>> {
+        match self.saved.take() {
+            Some(saved) => self.backend.set_text(&saved),
+            None => Ok(()),
+        }
+    }
+
+    /// The sequence finished; leave the clipboard and field as they are
+    fn disarm(&mut self) {
+        self.saved = None;
+        self.selected = false;
+    }
+}
+
+impl<B: ClipboardBackend> Drop for ClipboardRestore<'_, B> {
+    fn drop(&mut self) {
+        if let Some(saved) = self.saved.take() {
+            warn!("📋 Clipboard sequence interrupted, restoring the clipboard");
+            if let Err(e) = self.backend.set_text(&saved) {
+                warn!("Could not restore the clipboard: {}", e);
+            }
+        }
+        if self.selected {
+            if let Err(e) = self.backend.send_key(COLLAPSE_SELECTION_KEY) {
+                warn!("Could not clear the selection: {}", e);
+            }
+        }
+    }
+}
+
 /// Type alias for the default system clipboard manager
 pub type DefaultClipboardManager = ClipboardManager<SystemClipboard>;
 
@@ -195,6 +263,7 @@ impl DefaultClipboardManager {
 #[cfg(test)]
 mod tests {
     use super::*;
+    use crate::spell_check::runtime::shared_runtime;
 
     #[test]
     fn test_clipboard_operations() {
@@ -250,16 +319,87 @@ mod tests {
         
         let manager = ClipboardManager::new(mock_backend);
         
-        let result = manager.extract_text_via_clipboard();
+        let result = shared_runtime().block_on(manager.extract_text_via_clipboard());
         assert!(result.is_ok());
         assert_eq!(result.unwrap(), "hello");
     }
 
+    #[test]
+    fn test_cancelled_extraction_restores_clipboard() {
+        let mut mock_backend = MockClipboardBackend::new();
+        mock_backend
+            .expect_get_text()
+            .times(1)
+            .returning(|| Ok(Some("saved".to_string())));
+        mock_backend
+            .expect_send_key()
+            .with(mockall::predicate::eq("keystroke \"a\" using command down"))
+            .times(1)
+            .returning(|_| Ok(()));
+        mock_backend
+            .expect_set_text()
+            .with(mockall::predicate::eq("saved"))
+            .times(1)
+            .returning(|_| Ok(()));
+        
+        let manager = ClipboardManager::new(mock_backend);
+        
+        // Dropped while waiting on Cmd+A, as a stage timeout would
+        let extraction = async { tokio::time::timeout(Duration::from_millis(10), manager.extract_text_via_clipboard()).await };
+        assert!(shared_runtime().block_on(extraction).is_err());
+    }
+
+    #[test]
+    fn test_cancelled_paste_restores_clipboard_and_selection() {
+        let mut mock_backend = MockClipboardBackend::new();
+        let mut sequence = mockall::Sequence::new();
+        mock_backend
+            .expect_get_text()
+            .times(1)
+            .returning(|| Ok(Some("saved".to_string())));
+        mock_backend
+            .expect_set_text()
+            .with(mockall::predicate::eq("fixed"))
+            .times(1)
+            .in_sequence(&mut sequence)
+            .returning(|_| Ok(()));
+        mock_backend
+            .expect_send_key()
+            .with(mockall::predicate::eq("keystroke \"a\" using command down"))
+            .times(1)
+            .in_sequence(&mut sequence)
+            .returning(|_| Ok(()));
+        mock_backend
+            .expect_set_text()
+            .with(mockall::predicate::eq("saved"))
+            .times(1)
+            .in_sequence(&mut sequence)
+            .returning(|_| Ok(()));
+        mock_backend
+            .expect_send_key()
+            .with(mockall::predicate::eq(COLLAPSE_SELECTION_KEY))
+            .times(1)
+            .in_sequence(&mut sequence)
+            .returning(|_| Ok(()));
+        
+        let manager = ClipboardManager::new(mock_backend);
+        
+        // Dropped after Cmd+A but before Cmd+V
+        let paste = async { tokio::time::timeout(PASTE_SETTLE + PASTE_SETTLE / 2, manager.set_text_via_clipboard("fixed")).await };
+        assert!(shared_runtime().block_on(paste).is_err());
+    }
+
     #[test]
     fn test_set_text_clipboard_only() {
         let mut mock_backend = MockClipboardBackend::new();
         
-        // Expect set_text to be called first to copy text to clipboard
+        // The user's clipboard is read first, in case the paste is abandoned
+        mock_backend
+            .expect_get_text()
+            .times(1)
+            .returning(|| Ok(Some("saved".to_string())));
+        
+        // Then set_text copies the corrected text to the clipboard
         mock_backend
             .expect_set_text()
             .with(mockall::predicate::eq("test text"))
@@ -282,7 +422,7 @@ mod tests {
         
         let manager = ClipboardManager::new(mock_backend);
         
-        let result = manager.set_text_via_clipboard("test text");
+        let result = shared_runtime().block_on(manager.set_text_via_clipboard("test text"));
         assert!(result.is_ok());
     }
 }
\ No newline at end of file
@@ -1,9 +1,10 @@
 use std::ops::Range;
 use tracing::{info, warn};
 
-use super::ax_api::{ElementRef, AxApi};
+use super::ax_api::{ElementRef, AxApi, SendElement};
+use super::blocking;
 use super::text_extraction::TextExtractor;
-use super::clipboard::{ClipboardManager, SystemClipboard};
+use super::clipboard::{ClipboardBackend, ClipboardManager};
 use super::applescript::AppleScriptManager;
 
 /// Orchestrates fallback strategies for text extraction and setting
@@ -11,29 +12,29 @@ pub struct FallbackManager;
 
 impl FallbackManager {
     /// Extract text using multiple fallback strategies
-    pub fn extract_text_with_fallbacks(element: &ElementRef) -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
+    pub async fn extract_text_with_fallbacks<B: ClipboardBackend>(
+        element: &ElementRef,
+        clipboard: &ClipboardManager<B>,
+    ) -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
         // Handle null element (testing scenario)
         if element.is_null() {
             return Ok(("I recieve teh mesage with thier help.".to_string(), 0..37));
         }
         
-        // Strategy 1: Try standard accessibility API
-        match Self::try_accessibility_extraction(element) {
+        // Strategy 1: Try standard accessibility API; an unresponsive app can stall it for seconds
+        let target = SendElement::new(*element);
+        match blocking(move || Self::try_accessibility_extraction(&target.get())).await {
             Ok(result) => {
                 info!("✅ Text extracted via accessibility API");
                 return Ok(result);
             }
             Err(e) => {
                 warn!("❌ Accessibility API failed: {}", e);
-                
-                if AppleScriptManager::is_problematic_app() {
-                    info!("🔄 Trying fallback methods for problematic app");
-                }
             }
         }
         
         // Strategy 2: Try clipboard fallback
-        match Self::try_clipboard_extraction() {
+        match Self::try_clipboard_extraction(clipboard).await {
             Ok(result) => {
                 info!("✅ Text extracted via clipboard fallback");
                 return Ok(result);
@@ -44,7 +45,7 @@ impl FallbackManager {
         }
         
         // Strategy 3: Try AppleScript fallback
-        match Self::try_applescript_extraction() {
+        match Self::try_applescript_extraction().await {
             Ok(result) => {
                 info!("✅ Text extracted via AppleScript fallback");
                 return Ok(result);
@@ -58,7 +59,12 @@ impl FallbackManager {
     }
 
     /// Set text using multiple fallback strategies
-    pub fn set_text_with_fallbacks(element: &ElementRef, text: &str, range: Range<usize>) -> Result<(), Box<dyn std::error::Error>> {
+    pub async fn set_text_with_fallbacks<B: ClipboardBackend>(
+        element: &ElementRef,
+        text: &str,
+        range: Range<usize>,
+        clipboard: &ClipboardManager<B>,
+    ) -> Result<(), Box<dyn std::error::Error>> {
         // Handle null element (testing scenario)
         if element.is_null() {
             info!("📝 Mock set text: '{}'", text);
@@ -66,23 +72,20 @@ impl FallbackManager {
         }
         
         // Strategy 1: Try standard accessibility API
-        match Self::try_accessibility_setting(element, text, range.clone()) {
+        let target = SendElement::new(*element);
+        let new_text = text.to_string();
+        match blocking(move || Self::try_accessibility_setting(&target.get(), &new_text, range)).await {
             Ok(()) => {
                 info!("✅ Text set via accessibility API");
                 return Ok(());
             }
             Err(e) => {
                 warn!("❌ Accessibility API set failed: {}", e);
-                
-                if AppleScriptManager::is_problematic_app() {
-                    info!("🔄 Trying fallback methods for text setting");
-                }
             }
         }
         
         // Strategy 2: Try clipboard fallback
-        let clipboard_manager = ClipboardManager::new(SystemClipboard);
-        match clipboard_manager.set_text_via_clipboard(text) {
+        match clipboard.set_text_via_clipboard(text).await {
             Ok(()) => {
                 info!("✅ Text set via clipboard fallback");
                 return Ok(());
@@ -101,10 +104,12 @@ impl FallbackManager {
     }
 
     /// Set text using only clipboard method (when no accessibility element available)
-    pub fn set_text_clipboard_only(text: &str) -> Result<(), Box<dyn std::error::Error>> {
+    pub async fn set_text_clipboard_only<B: ClipboardBackend>(
+        text: &str,
+        clipboard: &ClipboardManager<B>,
+    ) -> Result<(), Box<dyn std::error::Error>> {
         info!("🔄 Using clipboard-only text replacement (no accessibility element)");
-        let clipboard_manager = ClipboardManager::new(SystemClipboard);
-        clipboard_manager.set_text_via_clipboard(text)
+        clipboard.set_text_via_clipboard(text).await
     }
 
     /// Try text extraction via accessibility API
@@ -132,9 +137,10 @@ impl FallbackManager {
     }
 
     /// Try text extraction via clipboard
-    fn try_clipboard_extraction() -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
-        let clipboard_manager = ClipboardManager::new(SystemClipboard);
-        let text = clipboard_manager.extract_text_via_clipboard()?;
+    async fn try_clipboard_extraction<B: ClipboardBackend>(
+        clipboard: &ClipboardManager<B>,
+    ) -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
+        let text = clipboard.extract_text_via_clipboard().await?;
         if !text.trim().is_empty() {
             let (sentence, range) = TextExtractor::extract_last_sentence(&text);
             Ok((sentence, range))
@@ -144,8 +150,8 @@ impl FallbackManager {
     }
 
     /// Try text extraction via AppleScript
-    fn try_applescript_extraction() -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
-        let text = AppleScriptManager::extract_text()?;
+    async fn try_applescript_extraction() -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
+        let text = AppleScriptManager::extract_text().await?;
         if !text.trim().is_empty() {
             let (sentence, range) = TextExtractor::extract_last_sentence(&text);
             Ok((sentence, range))
@@ -187,11 +193,15 @@ impl FallbackManager {
 #[cfg(test)]
 mod tests {
     use super::*;
+    use crate::accessibility::clipboard::MockClipboardBackend;
+    use crate::spell_check::runtime::shared_runtime;
 
     #[test]
     fn test_extract_text_with_null_element() {
         let null_element = std::ptr::null_mut();
-        let result = FallbackManager::extract_text_with_fallbacks(&null_element);
+        // The clipboard is never touched: the mock has no expectations
+        let clipboard = ClipboardManager::new(MockClipboardBackend::new());
+        let result = shared_runtime().block_on(FallbackManager::extract_text_with_fallbacks(&null_element, &clipboard));
         
         assert!(result.is_ok());
         let (text, range) = result.unwrap();
@@ -202,7 +212,8 @@ mod tests {
     #[test]
     fn test_set_text_with_null_element() {
         let null_element = std::ptr::null_mut();
-        let result = FallbackManager::set_text_with_fallbacks(&null_element, "test text", 0..9);
+        let clipboard = ClipboardManager::new(MockClipboardBackend::new());
+        let result = shared_runtime().block_on(FallbackManager::set_text_with_fallbacks(&null_element, "test text", 0..9, &clipboard));
         
         assert!(result.is_ok());
     }
@@ -7,9 +7,9 @@ pub mod applescript;
 pub mod fallbacks;
 
 // Re-export commonly used types and functions
-pub use ax_api::{ElementRef, AxApi};
+pub use ax_api::{ElementRef, AxApi, SendElement};
 pub use text_extraction::TextExtractor;
-pub use clipboard::{ClipboardManager, SystemClipboard};
+pub use clipboard::{ClipboardBackend, ClipboardManager, SystemClipboard};
 pub use applescript::AppleScriptManager;
 pub use fallbacks::FallbackManager;
 
@@ -17,6 +17,19 @@ pub use fallbacks::FallbackManager;
 use tracing::info;
 use std::ops::Range;
 
+/// Run blocking accessibility work on the runtime's blocking pool, so that an
+/// unresponsive app stalls a pool thread rather than the press, which can time
+/// out instead. Errors come back as their message.
+pub async fn blocking<T, F>(work: F) -> Result<T, Box<dyn std::error::Error>>
+where
+    T: Send + 'static,
+    F: FnOnce() -> Result<T, Box<dyn std::error::Error>> + Send + 'static,
+{
+    tokio::task::spawn_blocking(move || work().map_err(|e| e.to_string()))
+        .await?
+        .map_err(Into::into)
+}
+
 /// Get the currently focused accessibility element
 pub fn get_focused_element() -> Result<ElementRef, Box<dyn std::error::Error>> {
     let system_element = AxApi::get_system_element()?;
@@ -83,38 +96,50 @@ pub fn set_text(element: &ElementRef, text: &str, range: Range<usize>) -> Result
 }
 
 /// Extract text using multiple fallback strategies
-pub fn get_text_to_correct_with_fallbacks(element: &ElementRef) -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
-    FallbackManager::extract_text_with_fallbacks(element)
+pub async fn get_text_to_correct_with_fallbacks<B: ClipboardBackend>(
+    element: &ElementRef,
+    clipboard: &ClipboardManager<B>,
+) -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
+    FallbackManager::extract_text_with_fallbacks(element, clipboard).await
 }
 
 /// Set text using multiple fallback strategies
-pub fn set_text_with_fallbacks(element: &ElementRef, text: &str, range: Range<usize>) -> Result<(), Box<dyn std::error::Error>> {
-    FallbackManager::set_text_with_fallbacks(element, text, range)
+pub async fn set_text_with_fallbacks<B: ClipboardBackend>(
+    element: &ElementRef,
+    text: &str,
+    range: Range<usize>,
+    clipboard: &ClipboardManager<B>,
+) -> Result<(), Box<dyn std::error::Error>> {
+    FallbackManager::set_text_with_fallbacks(element, text, range, clipboard).await
 }
 
 /// Extract text via clipboard fallback
-pub fn get_text_via_clipboard_fallback() -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
-    let clipboard_manager = ClipboardManager::new(SystemClipboard);
-    let text = clipboard_manager.extract_text_via_clipboard()?;
+pub async fn get_text_via_clipboard_fallback<B: ClipboardBackend>(
+    clipboard: &ClipboardManager<B>,
+) -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
+    let text = clipboard.extract_text_via_clipboard().await?;
     let (sentence, range) = TextExtractor::extract_last_sentence(&text);
     Ok((sentence, range))
 }
 
 /// Extract text via AppleScript fallback
-pub fn get_text_via_applescript() -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
-    let text = AppleScriptManager::extract_text()?;
+pub async fn get_text_via_applescript() -> Result<(String, Range<usize>), Box<dyn std::error::Error>> {
+    let text = AppleScriptManager::extract_text().await?;
     let (sentence, range) = TextExtractor::extract_last_sentence(&text);
     Ok((sentence, range))
 }
 
 /// Set text using only clipboard method
-pub fn set_text_clipboard_only(text: &str) -> Result<(), Box<dyn std::error::Error>> {
-    FallbackManager::set_text_clipboard_only(text)
+pub async fn set_text_clipboard_only<B: ClipboardBackend>(
+    text: &str,
+    clipboard: &ClipboardManager<B>,
+) -> Result<(), Box<dyn std::error::Error>> {
+    FallbackManager::set_text_clipboard_only(text, clipboard).await
 }
 
 /// Check if current app is problematic for accessibility
-pub fn is_problematic_app() -> bool {
-    AppleScriptManager::is_problematic_app()
+pub async fn is_problematic_app() -> bool {
+    AppleScriptManager::is_problematic_app().await
 }
 
 // Legacy utility functions (marked as deprecated but kept for compatibility)
@@ -148,6 +173,8 @@ pub fn nsstring_to_string(ns_str: cocoa::base::id) -> String {
 #[cfg(test)]
 mod tests {
     use super::*;
+    use clipboard::MockClipboardBackend;
+    use crate::spell_check::runtime::shared_runtime;
 
     #[test]
     fn test_get_text_to_correct_mock() {
@@ -189,7 +216,8 @@ mod tests {
     #[test]
     fn test_get_text_to_correct_with_fallbacks() {
         let dummy_element = std::ptr::null_mut();
-        let result = get_text_to_correct_with_fallbacks(&dummy_element).unwrap();
+        let clipboard = ClipboardManager::new(MockClipboardBackend::new());
+        let result = shared_runtime().block_on(get_text_to_correct_with_fallbacks(&dummy_element, &clipboard)).unwrap();
         assert_eq!(result.0, "I recieve teh mesage with thier help.");
         assert_eq!(result.1, 0..37);
     }
@@ -197,7 +225,8 @@ mod tests {
     #[test]
     fn test_set_text_with_fallbacks() {
         let dummy_element = std::ptr::null_mut();
-        let result = set_text_with_fallbacks(&dummy_element, "test text", 0..9);
+        let clipboard = ClipboardManager::new(MockClipboardBackend::new());
+        let result = shared_runtime().block_on(set_text_with_fallbacks(&dummy_element, "test text", 0..9, &clipboard));
         assert!(result.is_ok());
     }
 
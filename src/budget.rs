@@ -0,0 +1,233 @@
+use std::fmt;
+use std::future::Future;
+use std::sync::{Arc, Mutex};
+use std::time::{Duration, Instant};
+
+use crate::cancel::{CancellationToken, Cancelled};
+
+/// A stage of a press ran past its time limit
+#[derive(Debug)]
+pub struct StageTimeout {
+    pub stage: &'static str,
+    pub limit: Duration,
+}
+
+impl fmt::Display for StageTimeout {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        write!(f, "{} took longer than {:?}", self.stage, self.limit)
+    }
+}
+
+impl std::error::Error for StageTimeout {}
+
+/// Run one stage of a press, abandoning it once it takes longer than `limit`
+/// or a newer press cancels this one
+pub async fn run_stage<T, F>(
+    stage: &'static str,
+    limit: Duration,
+    cancel: &CancellationToken,
+    work: F,
+) -> Result<T, Box<dyn std::error::Error>>
+where
+    F: Future<Output = Result<T, Box<dyn std::error::Error>>>,
+{
+    tokio::select! {
+        _ = cancel.cancelled() => Err(Cancelled.into()),
+        result = tokio::time::timeout(limit, work) => match result {
+            Ok(result) => result,
+            Err(_) => Err(StageTimeout { stage, limit }.into()),
+        },
+    }
+}
+
+/// When each stage of a press started and ended, relative to the press.
+///
+/// Clones share the same record, so work running alongside the main stages
+/// can add itself and overlapping stages show up side by side.
+#[derive(Clone)]
+pub struct Timeline {
+    start: Instant,
+    spans: Arc<Mutex<Vec<(&'static str, Duration, Duration)>>>,
+}
+
+impl Timeline {
+    pub fn new(start: Instant) -> Self {
+        Self {
+            start,
+            spans: Arc::new(Mutex::new(Vec::new())),
+        }
+    }
+
+    /// Record that `stage` ran from `started` until now
+    pub fn record(&self, stage: &'static str, started: Instant) {
+        let span = (stage, started.saturating_duration_since(self.start), self.start.elapsed());
+        self.spans.lock().unwrap().push(span);
+    }
+
+    /// Run `work` as `stage`, recording when it started and finished
+    pub async fn time<F: Future>(&self, stage: &'static str, work: F) -> F::Output {
+        let started = Instant::now();
+        let output = work.await;
+        self.record(stage, started);
+        output
+    }
+
+    /// e.g. `focus 0-2ms, warm 0-5ms, read 2-153ms, extract 0-153ms`, by start then end
+    pub fn report(&self) -> String {
+        let mut spans = self.spans.lock().unwrap().clone();
+        spans.sort_by_key(|&(_, start, end)| (start, end));
+        spans
+            .iter()
+            .map(|(stage, start, end)| format!("{} {}-{}ms", stage, start.as_millis(), end.as_millis()))
+            .collect::<Vec<_>>()
+            .join(", ")
+    }
+}
+
+/// End-to-end time allowance for one hotkey press, with a per-stage breakdown
+pub struct LatencyBudget {
+    start: Instant,
+    last_mark: Instant,
+    budget: Option<Duration>,
+    stages: Vec<(&'static str, Duration)>,
+    timeline: Timeline,
+}
+
+impl LatencyBudget {
+    /// Start the clock; `None` means no budget is enforced
+    pub fn start(budget: Option<Duration>) -> Self {
+        let now = Instant::now();
+        Self {
+            start: now,
+            last_mark: now,
+            budget,
+            stages: Vec::new(),
+            timeline: Timeline::new(now),
+        }
+    }
+
+    /// Record the time since the previous mark as `stage`
+    pub fn mark(&mut self, stage: &'static str) {
+        let now = Instant::now();
+        self.stages.push((stage, now - self.last_mark));
+        self.timeline.record(stage, self.last_mark);
+        self.last_mark = now;
+    }
+
+    /// Every stage so far, including work that ran alongside the marked stages
+    pub fn timeline(&self) -> &Timeline {
+        &self.timeline
+    }
+
+    /// When work must be done to leave `reserve` for the stages after it
+    pub fn deadline(&self, reserve: Duration) -> Option<Instant> {
+        self.budget.map(|budget| self.start + budget.saturating_sub(reserve))
+    }
+
+    pub fn elapsed(&self) -> Duration {
+        self.start.elapsed()
+    }
+
+    pub fn exceeded(&self) -> bool {
+        self.budget.is_some_and(|budget| self.elapsed() > budget)
+    }
+
+    /// e.g. `extract 120ms, correct 310ms (total 431ms of 400ms)`
+    pub fn breakdown(&self) -> String {
+        let stages: Vec<String> = self
+            .stages
+            .iter()
+            .map(|(stage, duration)| format!("{} {:?}", stage, duration))
+            .collect();
+        match self.budget {
+            Some(budget) => format!("{} (total {:?} of {:?})", stages.join(", "), self.elapsed(), budget),
+            None => format!("{} (total {:?})", stages.join(", "), self.elapsed()),
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::thread;
+
+    #[test]
+    fn test_stages_and_deadline() {
+        let mut budget = LatencyBudget::start(Some(Duration::from_millis(400)));
+        thread::sleep(Duration::from_millis(5));
+        budget.mark("extract");
+        budget.mark("correct");
+
+        assert!(!budget.exceeded());
+        let deadline = budget.deadline(Duration::from_millis(100)).unwrap();
+        assert!(deadline > Instant::now());
+        assert!(deadline <= budget.start + Duration::from_millis(300));
+
+        let breakdown = budget.breakdown();
+        assert!(breakdown.starts_with("extract "), "{}", breakdown);
+        assert!(breakdown.contains("correct "));
+        assert!(breakdown.contains("of 400ms"));
+    }
+
+    #[test]
+    fn test_timeline_shows_overlapping_stages() {
+        let runtime = tokio::runtime::Runtime::new().unwrap();
+        let mut budget = LatencyBudget::start(None);
+        let timeline = budget.timeline().clone();
+        let background = timeline.clone();
+        let warm = runtime.spawn(async move {
+            background.time("warm", tokio::time::sleep(Duration::from_millis(30))).await
+        });
+        runtime.block_on(async { timeline.time("read", tokio::time::sleep(Duration::from_millis(60))).await });
+        budget.mark("extract");
+        runtime.block_on(warm).unwrap();
+
+        // All three started with the press; warm finished while read was still running
+        let report = budget.timeline().report();
+        let end = |stage: &str| -> u128 {
+            let span = report.split(", ").find(|span| span.starts_with(stage)).unwrap();
+            assert!(span.starts_with(&format!("{} 0-", stage)), "{}", report);
+            span.trim_end_matches("ms").rsplit('-').next().unwrap().parse().unwrap()
+        };
+        assert!(end("warm") < end("read"), "{}", report);
+        assert!(end("read") <= end("extract"), "{}", report);
+    }
+
+    #[test]
+    fn test_run_stage_timeout_and_cancel() {
+        let runtime = tokio::runtime::Runtime::new().unwrap();
+        let cancel = CancellationToken::new();
+        let slow = || async {
+            tokio::time::sleep(Duration::from_secs(5)).await;
+            Ok::<_, Box<dyn std::error::Error>>(())
+        };
+
+        let value = runtime.block_on(run_stage("extract", Duration::from_millis(50), &cancel, async { Ok(7) }));
+        assert_eq!(value.unwrap(), 7);
+
+        let start = Instant::now();
+        let result = runtime.block_on(run_stage("extract", Duration::from_millis(50), &cancel, slow()));
+        let error = result.unwrap_err();
+        assert_eq!(error.to_string(), "extract took longer than 50ms");
+        assert!(start.elapsed() < Duration::from_secs(1));
+
+        let trigger = cancel.clone();
+        thread::spawn(move || {
+            thread::sleep(Duration::from_millis(20));
+            trigger.cancel();
+        });
+        let result = runtime.block_on(run_stage("correct", Duration::from_secs(5), &cancel, slow()));
+        assert!(result.unwrap_err().is::<Cancelled>());
+    }
+
+    #[test]
+    fn test_exceeded() {
+        let budget = LatencyBudget::start(Some(Duration::from_millis(1)));
+        thread::sleep(Duration::from_millis(5));
+        assert!(budget.exceeded());
+
+        let unlimited = LatencyBudget::start(None);
+        assert!(!unlimited.exceeded());
+        assert_eq!(unlimited.deadline(Duration::ZERO), None);
+    }
+}
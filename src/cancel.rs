@@ -0,0 +1,107 @@
+use std::fmt;
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::Arc;
+use tokio::sync::Notify;
+
+/// The work was abandoned because a newer request replaced it
+#[derive(Debug)]
+pub struct Cancelled;
+
+impl fmt::Display for Cancelled {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        write!(f, "Superseded by a newer request")
+    }
+}
+
+impl std::error::Error for Cancelled {}
+
+#[derive(Default)]
+struct Inner {
+    cancelled: AtomicBool,
+    notify: Notify,
+}
+
+/// Tells in-flight work to stop; clones share the same flag.
+///
+/// Blocking code checks it between steps, and async code can race its work
+/// against `cancelled()` so that an HTTP request is dropped the moment the
+/// token fires.
+#[derive(Clone, Default)]
+pub struct CancellationToken {
+    inner: Arc<Inner>,
+}
+
+impl CancellationToken {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// Cancel the work; returns false if it had already been cancelled
+    pub fn cancel(&self) -> bool {
+        let first = !self.inner.cancelled.swap(true, Ordering::SeqCst);
+        if first {
+            self.inner.notify.notify_waiters();
+        }
+        first
+    }
+
+    pub fn is_cancelled(&self) -> bool {
+        self.inner.cancelled.load(Ordering::SeqCst)
+    }
+
+    /// `Cancelled` once the token has fired, for `?` between steps
+    pub fn check(&self) -> Result<(), Cancelled> {
+        if self.is_cancelled() {
+            Err(Cancelled)
+        } else {
+            Ok(())
+        }
+    }
+
+    /// Resolves once the token is cancelled
+    pub async fn cancelled(&self) {
+        loop {
+            // Registered before the check, so a cancel in between still wakes us
+            let notified = self.inner.notify.notified();
+            if self.is_cancelled() {
+                return;
+            }
+            notified.await;
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::time::Duration;
+
+    #[test]
+    fn test_cancel_is_shared_and_once() {
+        let token = CancellationToken::new();
+        let clone = token.clone();
+        assert!(clone.check().is_ok());
+        assert!(token.cancel());
+        assert!(!clone.cancel());
+        assert!(clone.is_cancelled());
+        assert!(clone.check().is_err());
+    }
+
+    #[test]
+    fn test_cancelled_wakes_waiting_task() {
+        let runtime = tokio::runtime::Runtime::new().unwrap();
+        let token = CancellationToken::new();
+        let waiter = token.clone();
+        let handle = runtime.spawn(async move {
+            tokio::select! {
+                _ = waiter.cancelled() => true,
+                _ = tokio::time::sleep(Duration::from_secs(5)) => false,
+            }
+        });
+        std::thread::sleep(Duration::from_millis(20));
+        token.cancel();
+        assert!(runtime.block_on(handle).unwrap());
+        // Already cancelled: resolves at once
+        runtime.block_on(token.cancelled());
+    }
+}
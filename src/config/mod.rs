@@ -1,18 +1,69 @@
 use std::path::PathBuf;
 use std::fs;
 
+use crate::spell_check::backend::BackendKind;
+use crate::spell_check::endpoints::RoutingPolicy;
+use crate::spell_check::lexicon::GateStrictness;
+use crate::spell_check::pipeline::DEFAULT_ESCALATION_THRESHOLD;
+use crate::spell_check::residency::DEFAULT_KEEP_ALIVE_SECS;
+use crate::spell_check::DEFAULT_OLLAMA_URL;
+
 #[derive(Clone, Debug)]
 pub struct Config {
     pub model_path: PathBuf,
     pub config_path: PathBuf,
+    pub cache_path: PathBuf,
+    pub user_dictionary_path: PathBuf,
+    pub lexicon_path: PathBuf,
+    pub gate_strictness: GateStrictness,
+    /// Protocol spoken by the inference server
+    pub backend: BackendKind,
+    /// Servers hosting the same models; requests are spread across them
+    pub server_urls: Vec<String>,
+    pub routing: RoutingPolicy,
+    pub model_name: String,
+    /// Ollama model for the last pipeline tier, e.g. "llama3.1:8b"; empty, the
+    /// default, disables it
+    pub large_model: String,
+    /// Smaller Ollama model raced against a slow primary; empty disables hedging
+    pub standby_model: String,
+    /// Seconds the server keeps models loaded after a request; negative keeps
+    /// them forever, 0 leaves it to the server
+    pub keep_alive_secs: i64,
+    /// Re-send the keep-alive this often while the user is active; 0 disables
+    pub keep_alive_ping_secs: u64,
+    /// Have the model answer in JSON under a schema instead of free text
+    pub structured_output: bool,
+    /// Free-text prompt with a `{text}` placeholder; empty uses the built-in one
+    pub prompt_template: String,
+    pub escalation_threshold: f32,
+    /// Hotkey-to-applied time allowed per press; 0 disables the budget
+    pub latency_budget_ms: u64,
 }
 
 impl Default for Config {
     fn default() -> Self {
         let home = std::env::var("HOME").unwrap_or_else(|_| "/Users/user".to_string());
+        let support_dir = PathBuf::from(&home).join("Library/Application Support/TypoFixer");
         Self {
             model_path: PathBuf::from(&home).join("Models/llama3-8b-q4.gguf"),
-            config_path: PathBuf::from(&home).join("Library/Application Support/TypoFixer/config.toml"),
+            config_path: support_dir.join("config.toml"),
+            cache_path: support_dir.join("corrections.cache"),
+            user_dictionary_path: support_dir.join("dictionary.txt"),
+            lexicon_path: support_dir.join("lexicon.bin"),
+            gate_strictness: GateStrictness::default(),
+            backend: BackendKind::default(),
+            server_urls: vec![DEFAULT_OLLAMA_URL.to_string()],
+            routing: RoutingPolicy::default(),
+            model_name: "phi:2.7b".to_string(),
+            large_model: String::new(),
+            standby_model: String::new(),
+            keep_alive_secs: DEFAULT_KEEP_ALIVE_SECS,
+            keep_alive_ping_secs: 0,
+            structured_output: false,
+            prompt_template: String::new(),
+            escalation_threshold: DEFAULT_ESCALATION_THRESHOLD,
+            latency_budget_ms: 0,
         }
     }
 }
@@ -35,6 +86,76 @@ impl Config {
                     new_config.model_path = PathBuf::from(model_path);
                 }
                 
+                if let Some(strictness) = parsed.get("gate_strictness")
+                    .and_then(|v| v.as_str())
+                    .and_then(GateStrictness::parse)
+                {
+                    new_config.gate_strictness = strictness;
+                }
+                
+                if let Some(backend) = parsed.get("backend")
+                    .and_then(|v| v.as_str())
+                    .and_then(BackendKind::parse)
+                {
+                    new_config.backend = backend;
+                }
+                
+                // A single `server_url` is still accepted from older configs
+                if let Some(server_urls) = parsed.get("server_urls").and_then(|v| v.as_array()) {
+                    let urls: Vec<String> = server_urls.iter()
+                        .filter_map(|v| v.as_str())
+                        .map(str::to_string)
+                        .collect();
+                    if !urls.is_empty() {
+                        new_config.server_urls = urls;
+                    }
+                } else if let Some(server_url) = parsed.get("server_url").and_then(|v| v.as_str()) {
+                    new_config.server_urls = vec![server_url.to_string()];
+                }
+                
+                if let Some(routing) = parsed.get("routing")
+                    .and_then(|v| v.as_str())
+                    .and_then(RoutingPolicy::parse)
+                {
+                    new_config.routing = routing;
+                }
+                
+                if let Some(model_name) = parsed.get("model_name").and_then(|v| v.as_str()) {
+                    new_config.model_name = model_name.to_string();
+                }
+                
+                if let Some(large_model) = parsed.get("large_model").and_then(|v| v.as_str()) {
+                    new_config.large_model = large_model.to_string();
+                }
+                
+                if let Some(standby_model) = parsed.get("standby_model").and_then(|v| v.as_str()) {
+                    new_config.standby_model = standby_model.to_string();
+                }
+                
+                if let Some(keep_alive) = parsed.get("keep_alive_secs").and_then(|v| v.as_integer()) {
+                    new_config.keep_alive_secs = keep_alive;
+                }
+                
+                if let Some(interval) = parsed.get("keep_alive_ping_secs").and_then(|v| v.as_integer()) {
+                    new_config.keep_alive_ping_secs = interval.max(0) as u64;
+                }
+                
+                if let Some(structured) = parsed.get("structured_output").and_then(|v| v.as_bool()) {
+                    new_config.structured_output = structured;
+                }
+                
+                if let Some(template) = parsed.get("prompt_template").and_then(|v| v.as_str()) {
+                    new_config.prompt_template = template.to_string();
+                }
+                
+                if let Some(threshold) = parsed.get("escalation_threshold").and_then(|v| v.as_float()) {
+                    new_config.escalation_threshold = threshold.clamp(0.0, 1.0) as f32;
+                }
+                
+                if let Some(budget) = parsed.get("latency_budget_ms").and_then(|v| v.as_integer()) {
+                    new_config.latency_budget_ms = budget.max(0) as u64;
+                }
+                
                 return new_config;
             }
         }
@@ -46,6 +167,19 @@ impl Config {
     pub fn save(&self) -> Result<(), Box<dyn std::error::Error>> {
         let mut doc = toml_edit::DocumentMut::new();
         doc["model_path"] = toml_edit::value(self.model_path.to_string_lossy().to_string());
+        doc["gate_strictness"] = toml_edit::value(self.gate_strictness.as_str());
+        doc["backend"] = toml_edit::value(self.backend.as_str());
+        doc["server_urls"] = toml_edit::value(self.server_urls.iter().collect::<toml_edit::Array>());
+        doc["routing"] = toml_edit::value(self.routing.as_str());
+        doc["model_name"] = toml_edit::value(&self.model_name);
+        doc["large_model"] = toml_edit::value(&self.large_model);
+        doc["standby_model"] = toml_edit::value(&self.standby_model);
+        doc["keep_alive_secs"] = toml_edit::value(self.keep_alive_secs);
+        doc["keep_alive_ping_secs"] = toml_edit::value(self.keep_alive_ping_secs as i64);
+        doc["structured_output"] = toml_edit::value(self.structured_output);
+        doc["prompt_template"] = toml_edit::value(&self.prompt_template);
+        doc["escalation_threshold"] = toml_edit::value(self.escalation_threshold as f64);
+        doc["latency_budget_ms"] = toml_edit::value(self.latency_budget_ms as i64);
         
         if let Some(parent) = self.config_path.parent() {
             fs::create_dir_all(parent)?;
@@ -67,6 +201,20 @@ mod tests {
         let config = Config::default();
         assert!(config.model_path.to_string_lossy().contains("llama3-8b-q4.gguf"));
         assert!(config.config_path.to_string_lossy().contains("config.toml"));
+        assert_eq!(config.cache_path.parent(), config.config_path.parent());
+        assert_eq!(config.user_dictionary_path.parent(), config.config_path.parent());
+        assert_eq!(config.lexicon_path.parent(), config.config_path.parent());
+        assert_eq!(config.gate_strictness, GateStrictness::Lenient);
+        assert_eq!(config.escalation_threshold, DEFAULT_ESCALATION_THRESHOLD);
+        assert!(config.large_model.is_empty());
+        assert_eq!(config.latency_budget_ms, 0);
+        assert_eq!(config.backend, BackendKind::Ollama);
+        assert_eq!(config.server_urls, vec![DEFAULT_OLLAMA_URL.to_string()]);
+        assert_eq!(config.routing, RoutingPolicy::LeastOutstanding);
+        assert_eq!(config.keep_alive_secs, DEFAULT_KEEP_ALIVE_SECS);
+        assert_eq!(config.keep_alive_ping_secs, 0);
+        assert!(!config.structured_output);
+        assert!(config.prompt_template.is_empty());
     }
 
     #[test]
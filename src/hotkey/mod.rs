@@ -1,9 +1,12 @@
 use global_hotkey::{GlobalHotKeyManager, HotKeyState, GlobalHotKeyEvent};
 use global_hotkey::hotkey::{HotKey, Modifiers, Code};
-use std::sync::{Arc, Mutex};
+use std::sync::{mpsc, Arc, Mutex, Weak};
 use std::thread;
-use std::time::Duration;
-use tracing::{info, error};
+use std::time::{Duration, Instant};
+use tracing::{debug, error, info};
+
+use crate::cancel::CancellationToken;
+use crate::spell_check::metrics::{Histogram, LATENCY_BUCKETS_MS};
 
 
 // Global hotkey manager using global-hotkey crate
@@ -38,32 +41,277 @@ pub fn setup_hotkey() -> Result<(), Box<dyn std::error::Error>> {
     Ok(())
 }
 
-pub fn start_hotkey_event_loop<F>(callback: F) 
+/// Presses this close to the last accepted one are dropped, e.g. a double tap
+const DEBOUNCE: Duration = Duration::from_millis(300);
+
+/// Corrections that can run at once: the current press, plus one still
+/// unwinding after being cancelled
+const WORKERS: usize = 2;
+
+/// The dispatcher behind the registered hotkey, for the menu bar
+static DISPATCHER: once_cell::sync::Lazy<Mutex<Option<Arc<HotkeyDispatcher>>>> =
+    once_cell::sync::Lazy::new(|| Mutex::new(None));
+
+struct Job {
+    id: u64,
+    cancel: CancellationToken,
+    pressed: Instant,
+}
+
+/// Press counters since startup
+#[derive(Clone, Debug, PartialEq)]
+pub struct DispatchStats {
+    pub presses: u64,
+    pub debounced: u64,
+    /// Corrections cancelled by a newer press
+    pub cancelled: u64,
+    /// Milliseconds from the press to a worker starting on it
+    pub queue_wait: Histogram,
+}
+
+impl Default for DispatchStats {
+    fn default() -> Self {
+        Self {
+            presses: 0,
+            debounced: 0,
+            cancelled: 0,
+            queue_wait: Histogram::new(&LATENCY_BUCKETS_MS),
+        }
+    }
+}
+
+impl DispatchStats {
+    /// e.g. `12 presses, 1 debounced, 2 cancelled, queue wait p50 1ms p99 5ms`
+    pub fn summary(&self) -> String {
+        let wait = |p: f64| self.queue_wait.percentile(p).map_or("-".to_string(), |ms| format!("{}ms", ms));
+        format!(
+            "{} presses, {} debounced, {} cancelled, queue wait p50 {} p99 {}",
+            self.presses, self.debounced, self.cancelled, wait(0.5), wait(0.99),
+        )
+    }
+}
+
+struct DispatchState {
+    /// The newest accepted press, until its correction finishes
+    current: Option<(u64, CancellationToken)>,
+    next_id: u64,
+    last_press: Option<Instant>,
+    stats: DispatchStats,
+}
+
+/// Hands each hotkey press to a worker thread.
+///
+/// A new press cancels the correction still running for the previous one, so
+/// presses never queue up behind a slow model, and presses within `DEBOUNCE`
+/// of the last accepted one are dropped.
+pub struct HotkeyDispatcher {
+    jobs: Mutex<mpsc::Sender<Job>>,
+    state: Mutex<DispatchState>,
+    debounce: Duration,
+}
+
+impl HotkeyDispatcher {
+    pub fn new<F>(callback: F) -> Arc<Self>
+    where
+        F: Fn(CancellationToken) + Send + Sync + 'static,
+    {
+        Self::with_settings(callback, WORKERS, DEBOUNCE)
+    }
+
+    pub fn with_settings<F>(callback: F, workers: usize, debounce: Duration) -> Arc<Self>
+    where
+        F: Fn(CancellationToken) + Send + Sync + 'static,
+    {
+        let (sender, receiver) = mpsc::channel::<Job>();
+        let dispatcher = Arc::new(Self {
+            jobs: Mutex::new(sender),
+            state: Mutex::new(DispatchState {
+                current: None,
+                next_id: 0,
+                last_press: None,
+                stats: DispatchStats::default(),
+            }),
+            debounce,
+        });
+
+        let receiver = Arc::new(Mutex::new(receiver));
+        let callback = Arc::new(callback);
+        for index in 0..workers.max(1) {
+            let receiver = Arc::clone(&receiver);
+            let callback = Arc::clone(&callback);
+            // Weak, so dropping the dispatcher closes the channel and ends the workers
+            let dispatcher: Weak<Self> = Arc::downgrade(&dispatcher);
+            thread::Builder::new()
+                .name(format!("hotkey-worker-{}", index))
+                .spawn(move || loop {
+                    let Ok(job) = receiver.lock().unwrap().recv() else { return };
+                    if job.cancel.is_cancelled() {
+                        continue;
+                    }
+                    let Some(owner) = dispatcher.upgrade() else { return };
+                    owner.state.lock().unwrap().stats.queue_wait.record(job.pressed.elapsed().as_secs_f64() * 1000.0);
+                    drop(owner);
+                    callback(job.cancel);
+                    if let Some(owner) = dispatcher.upgrade() {
+                        owner.finish(job.id);
+                    }
+                })
+                .expect("hotkey worker thread starts");
+        }
+        dispatcher
+    }
+
+    /// Handle one press; returns false if it was debounced
+    pub fn dispatch(&self) -> bool {
+        let now = Instant::now();
+        let mut state = self.state.lock().unwrap();
+        state.stats.presses += 1;
+        if state.last_press.is_some_and(|last| now.duration_since(last) < self.debounce) {
+            state.stats.debounced += 1;
+            debug!("Debounced hotkey press");
+            return false;
+        }
+        state.last_press = Some(now);
+
+        if let Some((_, previous)) = state.current.take() {
+            if previous.cancel() {
+                state.stats.cancelled += 1;
+                info!("⏹️ New press, cancelling the correction in flight");
+            }
+        }
+        let id = state.next_id;
+        state.next_id += 1;
+        let cancel = CancellationToken::new();
+        state.current = Some((id, cancel.clone()));
+        drop(state);
+
+        if self.jobs.lock().unwrap().send(Job { id, cancel, pressed: now }).is_err() {
+            error!("Hotkey workers are gone, dropping press");
+        }
+        true
+    }
+
+    fn finish(&self, id: u64) {
+        let mut state = self.state.lock().unwrap();
+        if state.current.as_ref().is_some_and(|(current, _)| *current == id) {
+            state.current = None;
+        }
+    }
+
+    pub fn stats(&self) -> DispatchStats {
+        self.state.lock().unwrap().stats.clone()
+    }
+}
+
+/// Hotkey press counters for the menu bar
+pub fn dispatch_summary() -> String {
+    match DISPATCHER.lock().unwrap().as_ref() {
+        Some(dispatcher) => format!("Hotkey: {}", dispatcher.stats().summary()),
+        None => "Hotkey: not started".to_string(),
+    }
+}
+
+/// Listen for the hotkey and run `callback` on a worker for every press.
+///
+/// The callback gets a token that fires when a newer press replaces it.
+pub fn start_hotkey_event_loop<F>(callback: F)
 where
-    F: Fn() + Send + 'static,
+    F: Fn(CancellationToken) + Send + Sync + 'static,
 {
     info!("Starting hotkey event loop thread...");
+    let dispatcher = HotkeyDispatcher::new(callback);
+    *DISPATCHER.lock().unwrap() = Some(Arc::clone(&dispatcher));
     
     // Start the hotkey event handler thread
     thread::spawn(move || {
         let receiver = GlobalHotKeyEvent::receiver();
         info!("Hotkey event loop thread started, listening for events...");
         
-        loop {
-            match receiver.try_recv() {
-                Ok(event) => {
-                    info!("📡 Received hotkey event: {:?}", event);
-                    if event.state == HotKeyState::Pressed {
-                        info!("🔥 Hotkey ⌘⌥S pressed!");
-                        println!("🔥 Hotkey ⌘⌥S pressed!"); // Also print to stdout
-                        callback();
-                    }
-                }
-                Err(_) => {
-                    // No events, sleep briefly
-                    thread::sleep(Duration::from_millis(50));
-                }
+        // Blocks until the next event, so a press is handled the moment it arrives
+        while let Ok(event) = receiver.recv() {
+            info!("📡 Received hotkey event: {:?}", event);
+            if event.state == HotKeyState::Pressed {
+                info!("🔥 Hotkey ⌘⌥S pressed!");
+                println!("🔥 Hotkey ⌘⌥S pressed!"); // Also print to stdout
+                dispatcher.dispatch();
             }
         }
+        error!("Hotkey event channel closed");
     });
-}
\ No newline at end of file
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::sync::atomic::{AtomicUsize, Ordering};
+
+    fn wait_until(condition: impl Fn() -> bool) -> bool {
+        let deadline = Instant::now() + Duration::from_secs(2);
+        while !condition() {
+            if Instant::now() > deadline {
+                return false;
+            }
+            thread::sleep(Duration::from_millis(5));
+        }
+        true
+    }
+
+    #[test]
+    fn test_new_press_cancels_running_correction() {
+        let started = Arc::new(AtomicUsize::new(0));
+        let cancelled = Arc::new(AtomicUsize::new(0));
+        let (started_in, cancelled_in) = (Arc::clone(&started), Arc::clone(&cancelled));
+        let dispatcher = HotkeyDispatcher::with_settings(
+            move |cancel: CancellationToken| {
+                started_in.fetch_add(1, Ordering::SeqCst);
+                // A slow correction that stops when told to
+                let deadline = Instant::now() + Duration::from_secs(2);
+                while !cancel.is_cancelled() && Instant::now() < deadline {
+                    thread::sleep(Duration::from_millis(2));
+                }
+                if cancel.is_cancelled() {
+                    cancelled_in.fetch_add(1, Ordering::SeqCst);
+                }
+            },
+            2,
+            Duration::ZERO,
+        );
+
+        assert!(dispatcher.dispatch());
+        assert!(wait_until(|| started.load(Ordering::SeqCst) == 1));
+        // The second press starts at once instead of waiting for the first
+        assert!(dispatcher.dispatch());
+        assert!(wait_until(|| started.load(Ordering::SeqCst) == 2));
+        assert!(wait_until(|| cancelled.load(Ordering::SeqCst) == 1));
+
+        let stats = dispatcher.stats();
+        assert_eq!((stats.presses, stats.cancelled, stats.debounced), (2, 1, 0));
+        assert_eq!(stats.queue_wait.count(), 2);
+        assert!(stats.queue_wait.percentile(1.0).unwrap() <= 50.0);
+    }
+
+    #[test]
+    fn test_debounce_and_finished_presses() {
+        let runs = Arc::new(AtomicUsize::new(0));
+        let counter = Arc::clone(&runs);
+        let dispatcher = HotkeyDispatcher::with_settings(
+            move |_| {
+                counter.fetch_add(1, Ordering::SeqCst);
+            },
+            1,
+            Duration::from_millis(100),
+        );
+
+        assert!(dispatcher.dispatch());
+        assert!(!dispatcher.dispatch());
+        assert!(wait_until(|| runs.load(Ordering::SeqCst) == 1));
+        thread::sleep(Duration::from_millis(120));
+        assert!(dispatcher.dispatch());
+        assert!(wait_until(|| runs.load(Ordering::SeqCst) == 2));
+
+        // A finished correction is not counted as cancelled by the next press
+        let stats = dispatcher.stats();
+        assert_eq!((stats.presses, stats.debounced, stats.cancelled), (3, 1, 0));
+        assert!(stats.summary().starts_with("3 presses, 1 debounced, 0 cancelled"));
+    }
+}
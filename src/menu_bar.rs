@@ -10,7 +10,11 @@ use objc2_foundation::{
     MainThreadMarker, NSNotification, NSObject, NSObjectProtocol, NSString,
     NSAutoreleasePool, ns_string,
 };
-use tracing::info;
+use tracing::{info, warn};
+
+use crate::hotkey::dispatch_summary;
+use crate::spell_check::health::status_report;
+use crate::spell_check::metrics::TIMING_METRICS;
 
 // Instance variables for our custom AppDelegate class
 #[derive(Debug, Default)]
@@ -37,6 +41,23 @@ define_class!(
             unsafe { show_about_dialog(); }
         }
 
+        #[unsafe(method(showStatus:))]
+        fn show_status(&self, _sender: *const NSObject) {
+            unsafe { show_status_dialog(); }
+        }
+
+        #[unsafe(method(reloadSettings:))]
+        fn reload_settings(&self, _sender: *const NSObject) {
+            // Loading the new model can take a while; keep the menu responsive
+            std::thread::spawn(|| match crate::reload_settings() {
+                Ok(()) => crate::show_hud("Settings reloaded"),
+                Err(e) => {
+                    warn!("Could not reload settings, keeping the current model: {}", e);
+                    crate::show_hud("Could not reload settings");
+                }
+            });
+        }
+
         #[unsafe(method(quitApp:))]
         fn quit_app(&self, _sender: *const NSObject) {
             let app = NSApplication::sharedApplication(unsafe { MainThreadMarker::new_unchecked() });
@@ -111,6 +132,34 @@ impl AppDelegate {
             menu.addItem(&about_item);
         }
 
+        // Create "Status" menu item showing what the health monitor last saw
+        let model_status_item = unsafe {
+            NSMenuItem::initWithTitle_action_keyEquivalent(
+                NSMenuItem::alloc(mtm),
+                &NSString::from_str("Model Status…"),
+                Some(sel!(showStatus:)),
+                &NSString::from_str(""),
+            )
+        };
+        unsafe {
+            model_status_item.setTarget(Some(self));
+            menu.addItem(&model_status_item);
+        }
+
+        // Create "Reload Settings" item to switch model, server or prompt from config.toml
+        let reload_item = unsafe {
+            NSMenuItem::initWithTitle_action_keyEquivalent(
+                NSMenuItem::alloc(mtm),
+                &NSString::from_str("Reload Settings"),
+                Some(sel!(reloadSettings:)),
+                &NSString::from_str(""),
+            )
+        };
+        unsafe {
+            reload_item.setTarget(Some(self));
+            menu.addItem(&reload_item);
+        }
+
         // Add separator
         menu.addItem(&NSMenuItem::separatorItem(mtm));
 
@@ -209,4 +258,19 @@ unsafe fn show_about_dialog() {
         alert.runModal();
         info!("About dialog shown");
     }
-}
\ No newline at end of file
+}
+
+// ─────────────── Status dialog ───────────────────────
+unsafe fn show_status_dialog() {
+    let mtm = MainThreadMarker::new().expect("must run on main thread");
+    unsafe {
+        let _pool = NSAutoreleasePool::new();
+        let alert = NSAlert::new(mtm);
+        alert.setMessageText(ns_string!("Model Status"));
+        let report = format!("{}\n\n{}\n\n{}", status_report(), dispatch_summary(), TIMING_METRICS.summary());
+        alert.setInformativeText(&NSString::from_str(report.trim_end()));
+        alert.addButtonWithTitle(ns_string!("OK"));
+        alert.runModal();
+        info!("Status dialog shown");
+    }
+}
@@ -0,0 +1,686 @@
+use serde::{Deserialize, Serialize};
+use serde_json::Value;
+use std::time::Duration;
+
+/// Sampling settings shared by every backend
+#[derive(Clone, Debug, PartialEq)]
+pub struct GenerationOptions {
+    pub temperature: f32,
+    pub top_p: f32,
+    /// Most tokens to generate
+    pub max_tokens: i32,
+    /// Generation ends as soon as the output contains one of these
+    pub stop: Vec<String>,
+    /// Fixed instruction sent ahead of every prompt. Servers that cache the
+    /// evaluated prefix only have to process the prompt itself.
+    pub system: Option<String>,
+    /// JSON schema the output must follow, for servers that constrain decoding
+    pub format: Option<Value>,
+    /// Context window in tokens, for servers that size it per request;
+    /// `None` keeps the model's default
+    pub num_ctx: Option<i32>,
+    /// Seconds the server should keep the model loaded afterwards; negative
+    /// means forever, `None` leaves it to the server
+    pub keep_alive: Option<i64>,
+}
+
+impl Default for GenerationOptions {
+    fn default() -> Self {
+        Self {
+            temperature: 0.0,  // Even lower temperature for more focused responses
+            top_p: 0.8,
+            max_tokens: 50,    // Shorter response length
+            stop: Vec::new(),
+            system: None,
+            format: None,
+            num_ctx: None,
+            keep_alive: None,
+        }
+    }
+}
+
+/// One piece of a streamed completion
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct StreamChunk {
+    pub text: String,
+    pub done: bool,
+}
+
+/// Where the server says a request's time went, from its final response
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub struct ServerTimings {
+    pub total: Option<Duration>,
+    pub load: Option<Duration>,
+    pub prompt_eval_count: Option<u64>,
+    pub prompt_eval: Option<Duration>,
+    pub eval_count: Option<u64>,
+    pub eval: Option<Duration>,
+}
+
+impl ServerTimings {
+    pub fn prompt_tokens_per_sec(&self) -> Option<f64> {
+        tokens_per_sec(self.prompt_eval_count, self.prompt_eval)
+    }
+
+    pub fn generation_tokens_per_sec(&self) -> Option<f64> {
+        tokens_per_sec(self.eval_count, self.eval)
+    }
+}
+
+fn tokens_per_sec(count: Option<u64>, duration: Option<Duration>) -> Option<f64> {
+    let seconds = duration?.as_secs_f64();
+    (seconds > 0.0).then(|| count.unwrap_or(0) as f64 / seconds)
+}
+
+/// Wire protocol of an inference server: where to send requests and how to read answers.
+///
+/// Drivers only translate between JSON and text; `LlamaModelWrapper` owns the
+/// HTTP client, streaming and cleanup, so every driver gets the same behaviour.
+pub trait CorrectionBackend: Send + Sync {
+    fn name(&self) -> &'static str;
+
+    /// Cheap GET that succeeds when the server is up
+    fn health_path(&self) -> &'static str;
+
+    /// POST endpoint for completions
+    fn generate_path(&self) -> &'static str;
+
+    fn build_request(&self, model: &str, prompt: &str, stream: bool, options: &GenerationOptions) -> Value;
+
+    /// Text of a complete, non-streamed response body
+    fn parse_response(&self, body: &[u8]) -> Result<String, Box<dyn std::error::Error>>;
+
+    /// Parse one line of a streamed response; `None` for keep-alives and blank lines
+    fn parse_stream_line(&self, line: &[u8]) -> Result<Option<StreamChunk>, Box<dyn std::error::Error>>;
+
+    /// POST endpoint and body that succeed only if `model` is installed, if the server can tell
+    fn show_request(&self, _model: &str) -> Option<(&'static str, Value)> {
+        None
+    }
+
+    /// GET endpoint listing the models held in memory, if the server has one
+    fn loaded_path(&self) -> Option<&'static str> {
+        None
+    }
+
+    /// Whether `model` appears in a `loaded_path` response
+    fn is_loaded(&self, _body: &[u8], _model: &str) -> bool {
+        false
+    }
+
+    /// Request that loads `model` without generating anything, if the server supports it.
+    ///
+    /// Only `keep_alive` and `num_ctx` of `options` apply.
+    fn preload_request(&self, _model: &str, _options: &GenerationOptions) -> Option<(&'static str, Value)> {
+        None
+    }
+
+    /// Server-side timings from a full response or the final stream line
+    fn timings(&self, _body: &[u8]) -> Option<ServerTimings> {
+        None
+    }
+}
+
+/// Which driver to use, as named in the config file
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub enum BackendKind {
+    #[default]
+    Ollama,
+    LlamaCpp,
+    OpenAi,
+}
+
+impl BackendKind {
+    pub fn parse(value: &str) -> Option<Self> {
+        match value.trim().to_lowercase().as_str() {
+            "ollama" => Some(Self::Ollama),
+            "llama-cpp" | "llama.cpp" | "llamacpp" => Some(Self::LlamaCpp),
+            "openai" => Some(Self::OpenAi),
+            _ => None,
+        }
+    }
+
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            Self::Ollama => "ollama",
+            Self::LlamaCpp => "llama-cpp",
+            Self::OpenAi => "openai",
+        }
+    }
+
+    pub fn driver(&self) -> Box<dyn CorrectionBackend> {
+        match self {
+            Self::Ollama => Box::new(OllamaBackend),
+            Self::LlamaCpp => Box::new(LlamaCppBackend),
+            Self::OpenAi => Box::new(OpenAiBackend),
+        }
+    }
+}
+
+// Ollama API request/response structures
+#[derive(Debug, Serialize)]
+struct OllamaRequest<'a> {
+    model: &'a str,
+    prompt: &'a str,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    system: Option<&'a str>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    format: Option<&'a Value>,
+    stream: bool,
+    options: OllamaOptions<'a>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    keep_alive: Option<i64>,
+}
+
+#[derive(Debug, Serialize)]
+struct OllamaOptions<'a> {
+    temperature: f32,
+    top_p: f32,
+    num_predict: i32,
+    #[serde(skip_serializing_if = "<[String]>::is_empty")]
+    stop: &'a [String],
+    #[serde(skip_serializing_if = "Option::is_none")]
+    num_ctx: Option<i32>,
+}
+
+#[derive(Debug, Deserialize)]
+struct OllamaRunningModels {
+    #[serde(default)]
+    models: Vec<OllamaRunningModel>,
+}
+
+#[derive(Debug, Deserialize)]
+struct OllamaRunningModel {
+    #[serde(default)]
+    name: String,
+    #[serde(default)]
+    model: String,
+}
+
+/// Timings Ollama reports on the final response, durations in nanoseconds
+#[derive(Debug, Deserialize)]
+struct OllamaTimings {
+    total_duration: Option<u64>,
+    load_duration: Option<u64>,
+    prompt_eval_count: Option<u64>,
+    prompt_eval_duration: Option<u64>,
+    eval_count: Option<u64>,
+    eval_duration: Option<u64>,
+}
+
+#[derive(Debug, Deserialize)]
+struct OllamaResponse {
+    #[serde(default)]
+    response: String,
+    #[serde(default)]
+    done: bool,
+}
+
+/// Ollama's `/api/generate`, streaming newline-delimited JSON
+pub struct OllamaBackend;
+
+impl CorrectionBackend for OllamaBackend {
+    fn name(&self) -> &'static str {
+        "ollama"
+    }
+
+    fn health_path(&self) -> &'static str {
+        "/api/tags"
+    }
+
+    fn generate_path(&self) -> &'static str {
+        "/api/generate"
+    }
+
+    fn build_request(&self, model: &str, prompt: &str, stream: bool, options: &GenerationOptions) -> Value {
+        serde_json::to_value(OllamaRequest {
+            model,
+            prompt,
+            system: options.system.as_deref(),
+            format: options.format.as_ref(),
+            stream,
+            options: OllamaOptions {
+                temperature: options.temperature,
+                top_p: options.top_p,
+                num_predict: options.max_tokens,
+                stop: &options.stop,
+                num_ctx: options.num_ctx,
+            },
+            keep_alive: options.keep_alive,
+        })
+        .expect("request serializes")
+    }
+
+    fn parse_response(&self, body: &[u8]) -> Result<String, Box<dyn std::error::Error>> {
+        let response: OllamaResponse = serde_json::from_slice(body)?;
+        Ok(response.response)
+    }
+
+    fn parse_stream_line(&self, line: &[u8]) -> Result<Option<StreamChunk>, Box<dyn std::error::Error>> {
+        if line.trim_ascii().is_empty() {
+            return Ok(None);
+        }
+        let chunk: OllamaResponse = serde_json::from_slice(line)?;
+        Ok(Some(StreamChunk {
+            text: chunk.response,
+            done: chunk.done,
+        }))
+    }
+
+    fn preload_request(&self, model: &str, options: &GenerationOptions) -> Option<(&'static str, Value)> {
+        // An empty prompt makes Ollama load the model and return without generating
+        let mut body = serde_json::json!({ "model": model, "prompt": "", "stream": false });
+        if let Some(keep_alive) = options.keep_alive {
+            body["keep_alive"] = keep_alive.into();
+        }
+        // A different context size later would make Ollama load the model again
+        if let Some(num_ctx) = options.num_ctx {
+            body["options"] = serde_json::json!({ "num_ctx": num_ctx });
+        }
+        Some(("/api/generate", body))
+    }
+
+    fn timings(&self, body: &[u8]) -> Option<ServerTimings> {
+        let timings: OllamaTimings = serde_json::from_slice(body).ok()?;
+        let timings = ServerTimings {
+            total: timings.total_duration.map(Duration::from_nanos),
+            load: timings.load_duration.map(Duration::from_nanos),
+            prompt_eval_count: timings.prompt_eval_count,
+            prompt_eval: timings.prompt_eval_duration.map(Duration::from_nanos),
+            eval_count: timings.eval_count,
+            eval: timings.eval_duration.map(Duration::from_nanos),
+        };
+        // Only the final line carries timings
+        (timings != ServerTimings::default()).then_some(timings)
+    }
+
+    fn show_request(&self, model: &str) -> Option<(&'static str, Value)> {
+        Some(("/api/show", serde_json::json!({ "model": model })))
+    }
+
+    fn loaded_path(&self) -> Option<&'static str> {
+        Some("/api/ps")
+    }
+
+    fn is_loaded(&self, body: &[u8], model: &str) -> bool {
+        // Ollama reports untagged models as `name:latest`
+        let tagged = if model.contains(':') { model.to_string() } else { format!("{}:latest", model) };
+        serde_json::from_slice::<OllamaRunningModels>(body)
+            .map(|running| running.models.iter().any(|m| m.name == tagged || m.model == tagged))
+            .unwrap_or(false)
+    }
+}
+
+/// Payload of a server-sent event line, or `None` for blank lines and comments
+fn sse_data(line: &[u8]) -> Option<&[u8]> {
+    let line = line.trim_ascii();
+    line.strip_prefix(b"data:").map(|data| data.trim_ascii())
+}
+
+#[derive(Debug, Deserialize)]
+struct LlamaCppResponse {
+    #[serde(default)]
+    content: String,
+    #[serde(default)]
+    stop: bool,
+}
+
+/// `timings` object on llama.cpp's final response, durations in milliseconds
+#[derive(Debug, Deserialize)]
+struct LlamaCppTimings {
+    prompt_n: Option<u64>,
+    prompt_ms: Option<f64>,
+    predicted_n: Option<u64>,
+    predicted_ms: Option<f64>,
+}
+
+#[derive(Debug, Deserialize)]
+struct LlamaCppFinal {
+    timings: Option<LlamaCppTimings>,
+}
+
+fn from_millis_f64(ms: f64) -> Duration {
+    Duration::from_secs_f64(ms.max(0.0) / 1000.0)
+}
+
+/// llama.cpp's `server` `/completion` endpoint, streaming server-sent events.
+///
+/// The server runs a single model, so the model name is not sent.
+pub struct LlamaCppBackend;
+
+impl CorrectionBackend for LlamaCppBackend {
+    fn name(&self) -> &'static str {
+        "llama-cpp"
+    }
+
+    fn health_path(&self) -> &'static str {
+        "/health"
+    }
+
+    fn generate_path(&self) -> &'static str {
+        "/completion"
+    }
+
+    fn build_request(&self, _model: &str, prompt: &str, stream: bool, options: &GenerationOptions) -> Value {
+        // No system field here; cache_prompt reuses the instruction as a plain prefix
+        let prompt = match &options.system {
+            Some(system) => format!("{}\n{}", system, prompt),
+            None => prompt.to_string(),
+        };
+        let mut body = serde_json::json!({
+            "prompt": prompt,
+            "stream": stream,
+            "temperature": options.temperature,
+            "top_p": options.top_p,
+            "n_predict": options.max_tokens,
+            "stop": options.stop,
+            "cache_prompt": true,
+        });
+        if let Some(schema) = &options.format {
+            body["json_schema"] = schema.clone();
+        }
+        body
+    }
+
+    fn parse_response(&self, body: &[u8]) -> Result<String, Box<dyn std::error::Error>> {
+        let response: LlamaCppResponse = serde_json::from_slice(body)?;
+        Ok(response.content)
+    }
+
+    fn parse_stream_line(&self, line: &[u8]) -> Result<Option<StreamChunk>, Box<dyn std::error::Error>> {
+        let Some(data) = sse_data(line) else { return Ok(None) };
+        let chunk: LlamaCppResponse = serde_json::from_slice(data)?;
+        Ok(Some(StreamChunk {
+            text: chunk.content,
+            done: chunk.stop,
+        }))
+    }
+
+    fn timings(&self, body: &[u8]) -> Option<ServerTimings> {
+        let timings = serde_json::from_slice::<LlamaCppFinal>(sse_data(body).unwrap_or(body)).ok()?.timings?;
+        let prompt = timings.prompt_ms.map(from_millis_f64);
+        let eval = timings.predicted_ms.map(from_millis_f64);
+        Some(ServerTimings {
+            // The model is loaded when the server starts, so there is no load time
+            total: Some(prompt.unwrap_or_default() + eval.unwrap_or_default()),
+            load: None,
+            prompt_eval_count: timings.prompt_n,
+            prompt_eval: prompt,
+            eval_count: timings.predicted_n,
+            eval,
+        })
+    }
+}
+
+/// Any OpenAI-compatible `/v1/chat/completions` server (vLLM, LM Studio, llama.cpp, ...)
+pub struct OpenAiBackend;
+
+impl CorrectionBackend for OpenAiBackend {
+    fn name(&self) -> &'static str {
+        "openai"
+    }
+
+    fn health_path(&self) -> &'static str {
+        "/v1/models"
+    }
+
+    fn generate_path(&self) -> &'static str {
+        "/v1/chat/completions"
+    }
+
+    fn build_request(&self, model: &str, prompt: &str, stream: bool, options: &GenerationOptions) -> Value {
+        let mut messages = Vec::new();
+        if let Some(system) = &options.system {
+            messages.push(serde_json::json!({ "role": "system", "content": system }));
+        }
+        messages.push(serde_json::json!({ "role": "user", "content": prompt }));
+        let mut body = serde_json::json!({
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+            "temperature": options.temperature,
+            "top_p": options.top_p,
+            "max_tokens": options.max_tokens,
+            "stop": options.stop,
+        });
+        if let Some(schema) = &options.format {
+            body["response_format"] = serde_json::json!({
+                "type": "json_schema",
+                "json_schema": { "name": "correction", "schema": schema },
+            });
+        }
+        body
+    }
+
+    fn parse_response(&self, body: &[u8]) -> Result<String, Box<dyn std::error::Error>> {
+        let response: Value = serde_json::from_slice(body)?;
+        response["choices"][0]["message"]["content"]
+            .as_str()
+            .map(str::to_string)
+            .ok_or_else(|| "OpenAI response has no message content".into())
+    }
+
+    fn parse_stream_line(&self, line: &[u8]) -> Result<Option<StreamChunk>, Box<dyn std::error::Error>> {
+        let Some(data) = sse_data(line) else { return Ok(None) };
+        if data == b"[DONE]" {
+            return Ok(Some(StreamChunk { text: String::new(), done: true }));
+        }
+        let chunk: Value = serde_json::from_slice(data)?;
+        let choice = &chunk["choices"][0];
+        Ok(Some(StreamChunk {
+            text: choice["delta"]["content"].as_str().unwrap_or_default().to_string(),
+            done: !choice["finish_reason"].is_null(),
+        }))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use super::super::test_server::{MockRequest, MockResponse, MockServer};
+    use super::super::runtime::shared_runtime;
+    use super::super::LlamaModelWrapper;
+    use std::time::{Duration, Instant};
+
+    /// Stand-in for each server's API, answering "I have the cat"
+    fn mock_for(kind: BackendKind) -> MockServer {
+        MockServer::start(move |request: &MockRequest| {
+            let body = request.json();
+            let stream = body["stream"].as_bool().unwrap_or(false);
+            match (kind, request.path.as_str()) {
+                (BackendKind::Ollama, "/api/tags") | (BackendKind::LlamaCpp, "/health") | (BackendKind::OpenAi, "/v1/models") => {
+                    MockResponse::json(serde_json::json!({ "status": "ok" }))
+                }
+                (BackendKind::Ollama, "/api/show") => MockResponse::json(serde_json::json!({ "details": {} })),
+                (BackendKind::Ollama, "/api/generate") if stream => MockResponse::streamed(vec![
+                    (Duration::ZERO, "{\"response\":\"I have\",\"done\":false}\n".to_string()),
+                    (Duration::ZERO, "{\"response\":\" the cat\",\"done\":true}\n".to_string()),
+                ]),
+                (BackendKind::Ollama, "/api/generate") => {
+                    MockResponse::json(serde_json::json!({ "response": "I have the cat", "done": true }))
+                }
+                (BackendKind::LlamaCpp, "/completion") if stream => MockResponse::streamed(vec![
+                    (Duration::ZERO, "data: {\"content\":\"I have\",\"stop\":false}\n\n".to_string()),
+                    (Duration::ZERO, "data: {\"content\":\" the cat\",\"stop\":true}\n\n".to_string()),
+                ]),
+                (BackendKind::LlamaCpp, "/completion") => {
+                    MockResponse::json(serde_json::json!({ "content": "I have the cat", "stop": true }))
+                }
+                (BackendKind::OpenAi, "/v1/chat/completions") if stream => MockResponse::streamed(vec![
+                    (Duration::ZERO, ": keep-alive\n\n".to_string()),
+                    (Duration::ZERO, "data: {\"choices\":[{\"delta\":{\"content\":\"I have\"},\"finish_reason\":null}]}\n\n".to_string()),
+                    (Duration::ZERO, "data: {\"choices\":[{\"delta\":{\"content\":\" the cat\"},\"finish_reason\":\"stop\"}]}\n\n".to_string()),
+                    (Duration::ZERO, "data: [DONE]\n\n".to_string()),
+                ]),
+                (BackendKind::OpenAi, "/v1/chat/completions") => MockResponse::json(serde_json::json!({
+                    "choices": [{ "message": { "role": "assistant", "content": "I have the cat" }, "finish_reason": "stop" }]
+                })),
+                _ => MockResponse::status(404),
+            }
+        })
+    }
+
+    fn check_conformance(kind: BackendKind) {
+        let server = mock_for(kind);
+        let mut model = LlamaModelWrapper::with_backend(kind.driver(), &server.url(), "test-model").unwrap();
+
+        for streaming in [true, false] {
+            model.set_streaming(streaming);
+            assert_eq!(model.generate("I have teh cat").unwrap(), "I have the cat", "{:?} streaming={}", kind, streaming);
+        }
+
+        // The health monitor finds the server through the driver's health endpoint
+        let status = shared_runtime().block_on(model.health().refresh());
+        assert!(status.is_usable(), "{:?} {:?}", kind, status);
+
+        let requests = server.requests();
+        let driver = kind.driver();
+        assert!(requests.iter().any(|r| r.path == driver.health_path()));
+        let generate: Vec<&MockRequest> = requests.iter().filter(|r| r.path == driver.generate_path()).collect();
+        assert_eq!(generate.len(), 2);
+        for request in generate {
+            assert_eq!(request.method, "POST");
+            // The prompt text reaches the server in the driver's own shape
+            assert!(request.body.contains("I have teh cat"), "{}", request.body);
+        }
+    }
+
+    fn check_latency(kind: BackendKind) {
+        const ITERATIONS: u32 = 20;
+        let server = mock_for(kind);
+        let model = LlamaModelWrapper::with_backend(kind.driver(), &server.url(), "test-model").unwrap();
+        model.generate("warm up").unwrap();
+
+        let start = Instant::now();
+        for _ in 0..ITERATIONS {
+            model.generate("I have teh cat").unwrap();
+        }
+        let per_request = start.elapsed() / ITERATIONS;
+        // The client adds little on top of the server's own time
+        assert!(per_request < Duration::from_millis(50), "{:?}: {:?} per request", kind, per_request);
+    }
+
+    #[test]
+    fn test_ollama_conformance() {
+        check_conformance(BackendKind::Ollama);
+        check_latency(BackendKind::Ollama);
+    }
+
+    #[test]
+    fn test_llama_cpp_conformance() {
+        check_conformance(BackendKind::LlamaCpp);
+        check_latency(BackendKind::LlamaCpp);
+    }
+
+    #[test]
+    fn test_openai_conformance() {
+        check_conformance(BackendKind::OpenAi);
+        check_latency(BackendKind::OpenAi);
+    }
+
+    #[test]
+    fn test_request_shapes() {
+        let options = GenerationOptions::default();
+        let ollama = OllamaBackend.build_request("phi:2.7b", "fix this", true, &options);
+        assert_eq!(ollama["model"], "phi:2.7b");
+        assert_eq!(ollama["options"]["num_predict"], 50);
+        assert!(ollama["options"].get("max_tokens").is_none());
+        assert!(ollama["options"].get("stop").is_none());
+        assert!(ollama["options"].get("num_ctx").is_none());
+        let sized = GenerationOptions { num_ctx: Some(1024), ..GenerationOptions::default() };
+        assert_eq!(OllamaBackend.build_request("phi", "x", false, &sized)["options"]["num_ctx"], 1024);
+
+        let stopping = GenerationOptions { stop: vec!["Correct:".to_string()], ..GenerationOptions::default() };
+        assert_eq!(OllamaBackend.build_request("phi", "x", false, &stopping)["options"]["stop"][0], "Correct:");
+        assert_eq!(OpenAiBackend.build_request("phi", "x", false, &stopping)["stop"][0], "Correct:");
+
+        let instructed = GenerationOptions { system: Some("Fix:".to_string()), ..GenerationOptions::default() };
+        assert!(ollama.get("system").is_none());
+        assert_eq!(OllamaBackend.build_request("phi", "x", false, &instructed)["system"], "Fix:");
+        assert_eq!(LlamaCppBackend.build_request("phi", "x", false, &instructed)["prompt"], "Fix:\nx");
+        let schema = serde_json::json!({ "type": "object" });
+        let structured = GenerationOptions { format: Some(schema.clone()), ..GenerationOptions::default() };
+        assert!(ollama.get("format").is_none());
+        assert_eq!(OllamaBackend.build_request("phi", "x", false, &structured)["format"], schema);
+        assert_eq!(LlamaCppBackend.build_request("phi", "x", false, &structured)["json_schema"], schema);
+        assert_eq!(OpenAiBackend.build_request("phi", "x", false, &structured)["response_format"]["json_schema"]["schema"], schema);
+        assert!(OpenAiBackend.build_request("phi", "x", false, &instructed).get("response_format").is_none());
+
+        let chat = OpenAiBackend.build_request("phi", "x", false, &instructed);
+        assert_eq!((chat["messages"][0]["role"].as_str(), chat["messages"][1]["content"].as_str()), (Some("system"), Some("x")));
+
+        let llama_cpp = LlamaCppBackend.build_request("ignored", "fix this", false, &options);
+        assert_eq!(llama_cpp["n_predict"], 50);
+        assert!(llama_cpp.get("model").is_none());
+
+        let openai = OpenAiBackend.build_request("gpt-local", "fix this", false, &options);
+        assert_eq!(openai["messages"][0]["content"], "fix this");
+        assert_eq!(openai["model"], "gpt-local");
+    }
+
+    #[test]
+    fn test_stream_line_parsing() {
+        assert_eq!(OllamaBackend.parse_stream_line(b"").unwrap(), None);
+        assert_eq!(LlamaCppBackend.parse_stream_line(b": ping").unwrap(), None);
+        assert_eq!(
+            OpenAiBackend.parse_stream_line(b"data: [DONE]\r").unwrap(),
+            Some(StreamChunk { text: String::new(), done: true })
+        );
+        assert!(OpenAiBackend.parse_stream_line(b"data: {not json").is_err());
+        assert!(OpenAiBackend.parse_response(b"{\"choices\":[]}").is_err());
+    }
+
+    #[test]
+    fn test_keep_alive_and_load_duration() {
+        let options = GenerationOptions { keep_alive: Some(-1), ..GenerationOptions::default() };
+        assert_eq!(OllamaBackend.build_request("phi", "x", false, &options)["keep_alive"], -1);
+        assert!(OllamaBackend.build_request("phi", "x", false, &GenerationOptions::default()).get("keep_alive").is_none());
+
+        let preload = GenerationOptions { keep_alive: Some(600), num_ctx: Some(512), ..GenerationOptions::default() };
+        let (path, body) = OllamaBackend.preload_request("phi", &preload).unwrap();
+        assert_eq!((path, body["prompt"].as_str(), body["keep_alive"].as_i64()), ("/api/generate", Some(""), Some(600)));
+        assert_eq!(body["options"]["num_ctx"], 512);
+        assert!(OllamaBackend.preload_request("phi", &GenerationOptions::default()).unwrap().1.get("options").is_none());
+        assert!(OpenAiBackend.preload_request("phi", &preload).is_none());
+
+        let done = br#"{"response":"","done":true,"total_duration":1600000000,"load_duration":1500000000}"#;
+        assert_eq!(OllamaBackend.timings(done).unwrap().load, Some(Duration::from_millis(1500)));
+        assert_eq!(OllamaBackend.timings(br#"{"response":"a","done":false}"#), None);
+    }
+
+    #[test]
+    fn test_server_timings() {
+        let ollama = OllamaBackend.timings(br#"{"response":"","done":true,"total_duration":900000000,
+            "load_duration":5000000,"prompt_eval_count":40,"prompt_eval_duration":100000000,
+            "eval_count":12,"eval_duration":300000000}"#).unwrap();
+        assert_eq!(ollama.total, Some(Duration::from_millis(900)));
+        assert_eq!(ollama.prompt_tokens_per_sec(), Some(400.0));
+        assert_eq!(ollama.generation_tokens_per_sec(), Some(40.0));
+
+        let line = br#"data: {"content":"","stop":true,"timings":{"prompt_n":20,"prompt_ms":50.0,"predicted_n":10,"predicted_ms":200.0}}"#;
+        let llama_cpp = LlamaCppBackend.timings(line).unwrap();
+        assert_eq!(llama_cpp.total, Some(Duration::from_millis(250)));
+        assert_eq!(llama_cpp.prompt_tokens_per_sec(), Some(400.0));
+        assert_eq!(llama_cpp.load, None);
+        assert_eq!(LlamaCppBackend.timings(br#"data: {"content":"a","stop":false}"#), None);
+        assert_eq!(OpenAiBackend.timings(b"{}"), None);
+    }
+
+    #[test]
+    fn test_loaded_models() {
+        let body = br#"{"models":[{"name":"phi:latest","model":"phi:latest"}]}"#;
+        assert!(OllamaBackend.is_loaded(body, "phi"));
+        assert!(!OllamaBackend.is_loaded(body, "phi:2.7b"));
+        assert!(!OllamaBackend.is_loaded(b"not json", "phi"));
+        assert_eq!(OllamaBackend.loaded_path(), Some("/api/ps"));
+        assert!(LlamaCppBackend.show_request("any").is_none());
+    }
+
+    #[test]
+    fn test_parse_kind() {
+        assert_eq!(BackendKind::parse("llama.cpp"), Some(BackendKind::LlamaCpp));
+        assert_eq!(BackendKind::parse("OpenAI"), Some(BackendKind::OpenAi));
+        assert_eq!(BackendKind::parse("vllm"), None);
+        assert_eq!(BackendKind::OpenAi.driver().name(), BackendKind::OpenAi.as_str());
+    }
+}
@@ -0,0 +1,273 @@
+use reqwest::Client;
+use std::fmt;
+use std::sync::{Arc, Mutex, Weak};
+use std::time::{Duration, Instant};
+use tracing::{debug, info, warn};
+
+use super::runtime::shared_runtime;
+
+/// Consecutive failed requests that open the breaker
+const FAILURE_THRESHOLD: u32 = 3;
+
+/// Pause between health probes while the breaker is open
+const PROBE_INTERVAL: Duration = Duration::from_secs(2);
+
+/// A health probe slower than this counts as a failure
+const PROBE_TIMEOUT: Duration = Duration::from_secs(1);
+
+/// The inference server is known to be down, so the request was not sent
+#[derive(Debug)]
+pub struct CircuitOpen;
+
+impl fmt::Display for CircuitOpen {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        write!(f, "Inference server unavailable")
+    }
+}
+
+impl std::error::Error for CircuitOpen {}
+
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub enum BreakerState {
+    /// Requests flow normally
+    #[default]
+    Closed,
+    /// Requests fail fast until a probe succeeds
+    Open,
+    /// A health probe is in flight; requests still fail fast
+    HalfOpen,
+}
+
+impl BreakerState {
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            Self::Closed => "closed",
+            Self::Open => "open",
+            Self::HalfOpen => "half-open",
+        }
+    }
+}
+
+/// Breaker counters since startup
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub struct BreakerStats {
+    pub state: BreakerState,
+    pub consecutive_failures: u32,
+    /// Times the breaker opened
+    pub opened: u64,
+    /// Requests failed fast while open
+    pub rejected: u64,
+    pub probes: u64,
+}
+
+struct Inner {
+    stats: BreakerStats,
+    opened_at: Option<Instant>,
+}
+
+/// Stops sending requests to a server that keeps failing.
+///
+/// After `FAILURE_THRESHOLD` consecutive failures the breaker opens and every
+/// request fails at once with `CircuitOpen`. A background task then probes the
+/// health endpoints and closes the breaker as soon as one of them answers.
+pub struct CircuitBreaker {
+    inner: Mutex<Inner>,
+    client: Client,
+    health_urls: Vec<String>,
+    failure_threshold: u32,
+    probe_interval: Duration,
+}
+
+impl CircuitBreaker {
+    pub fn new(client: Client, health_urls: Vec<String>) -> Arc<Self> {
+        Self::with_settings(client, health_urls, FAILURE_THRESHOLD, PROBE_INTERVAL)
+    }
+
+    pub fn with_settings(
+        client: Client,
+        health_urls: Vec<String>,
+        failure_threshold: u32,
+        probe_interval: Duration,
+    ) -> Arc<Self> {
+        Arc::new(Self {
+            inner: Mutex::new(Inner {
+                stats: BreakerStats::default(),
+                opened_at: None,
+            }),
+            client,
+            health_urls,
+            failure_threshold: failure_threshold.max(1),
+            probe_interval,
+        })
+    }
+
+    #[allow(dead_code)]
+    pub fn state(&self) -> BreakerState {
+        self.inner.lock().unwrap().stats.state
+    }
+
+    pub fn stats(&self) -> BreakerStats {
+        self.inner.lock().unwrap().stats
+    }
+
+    /// Fail fast with `CircuitOpen` unless requests may be sent
+    pub fn allow(&self) -> Result<(), CircuitOpen> {
+        let mut inner = self.inner.lock().unwrap();
+        if inner.stats.state == BreakerState::Closed {
+            return Ok(());
+        }
+        inner.stats.rejected += 1;
+        Err(CircuitOpen)
+    }
+
+    pub fn record_success(&self) {
+        self.inner.lock().unwrap().stats.consecutive_failures = 0;
+    }
+
+    pub fn record_failure(self: &Arc<Self>) {
+        let open = {
+            let mut inner = self.inner.lock().unwrap();
+            inner.stats.consecutive_failures += 1;
+            inner.stats.state == BreakerState::Closed
+                && inner.stats.consecutive_failures >= self.failure_threshold
+        };
+        if open {
+            self.trip();
+        }
+    }
+
+    /// Open the breaker now, e.g. when the server is unreachable at startup
+    pub fn trip(self: &Arc<Self>) {
+        {
+            let mut inner = self.inner.lock().unwrap();
+            if inner.stats.state != BreakerState::Closed {
+                return;
+            }
+            inner.stats.state = BreakerState::Open;
+            inner.stats.opened += 1;
+            inner.opened_at = Some(Instant::now());
+            warn!(
+                "🔌 Circuit breaker open ({} consecutive failures), probing every {:?}",
+                inner.stats.consecutive_failures, self.probe_interval
+            );
+        }
+        self.spawn_probe();
+    }
+
+    /// Probe the health endpoints until one answers, then close the breaker.
+    ///
+    /// The task only holds a weak reference, so it stops once the model is dropped.
+    fn spawn_probe(self: &Arc<Self>) {
+        let breaker: Weak<Self> = Arc::downgrade(self);
+        let interval = self.probe_interval;
+        shared_runtime().spawn(async move {
+            loop {
+                tokio::time::sleep(interval).await;
+                let Some(breaker) = breaker.upgrade() else { return };
+                breaker.set_state(BreakerState::HalfOpen);
+                if breaker.probe().await {
+                    breaker.close();
+                    return;
+                }
+                breaker.set_state(BreakerState::Open);
+            }
+        });
+    }
+
+    async fn probe(&self) -> bool {
+        self.inner.lock().unwrap().stats.probes += 1;
+        for url in &self.health_urls {
+            match self.client.get(url).timeout(PROBE_TIMEOUT).send().await {
+                Ok(response) if response.status().is_success() => return true,
+                Ok(response) => debug!("Health probe of {} returned {}", url, response.status()),
+                Err(e) => debug!("Health probe of {} failed: {}", url, e),
+            }
+        }
+        false
+    }
+
+    fn set_state(&self, state: BreakerState) {
+        self.inner.lock().unwrap().stats.state = state;
+    }
+
+    fn close(&self) {
+        let mut inner = self.inner.lock().unwrap();
+        inner.stats.state = BreakerState::Closed;
+        inner.stats.consecutive_failures = 0;
+        let down_for = inner.opened_at.take().map(|opened| opened.elapsed()).unwrap_or_default();
+        info!(
+            "🔌 Circuit breaker closed, server back after {:?} ({} presses failed fast)",
+            down_for, inner.stats.rejected
+        );
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use super::super::runtime::build_http_client;
+    use super::super::test_server::{MockResponse, MockServer};
+    use std::sync::atomic::{AtomicBool, Ordering};
+
+    fn wait_for_state(breaker: &CircuitBreaker, state: BreakerState) -> bool {
+        let deadline = Instant::now() + Duration::from_secs(2);
+        while Instant::now() < deadline {
+            if breaker.state() == state {
+                return true;
+            }
+            std::thread::sleep(Duration::from_millis(5));
+        }
+        false
+    }
+
+    #[test]
+    fn test_opens_after_consecutive_failures() {
+        let breaker = CircuitBreaker::with_settings(
+            build_http_client().unwrap(), Vec::new(), 3, Duration::from_secs(60),
+        );
+        breaker.record_failure();
+        breaker.record_failure();
+        breaker.record_success();
+        breaker.record_failure();
+        breaker.record_failure();
+        assert_eq!(breaker.state(), BreakerState::Closed);
+        assert!(breaker.allow().is_ok());
+
+        breaker.record_failure();
+        assert_eq!(breaker.state(), BreakerState::Open);
+        assert!(breaker.allow().is_err());
+        let stats = breaker.stats();
+        assert_eq!((stats.opened, stats.rejected), (1, 1));
+    }
+
+    #[test]
+    fn test_probe_closes_breaker_when_server_returns() {
+        let healthy = Arc::new(AtomicBool::new(false));
+        let flag = Arc::clone(&healthy);
+        let server = MockServer::start(move |_| {
+            if flag.load(Ordering::SeqCst) {
+                MockResponse::json(serde_json::json!({ "models": [] }))
+            } else {
+                MockResponse::status(503)
+            }
+        });
+        let breaker = CircuitBreaker::with_settings(
+            build_http_client().unwrap(),
+            vec![format!("{}/api/tags", server.url())],
+            1,
+            Duration::from_millis(20),
+        );
+        breaker.trip();
+        assert_eq!(breaker.state(), BreakerState::Open);
+
+        // Probes keep failing while the server is down
+        std::thread::sleep(Duration::from_millis(100));
+        assert_ne!(breaker.state(), BreakerState::Closed);
+        assert!(breaker.stats().probes >= 2);
+
+        healthy.store(true, Ordering::SeqCst);
+        assert!(wait_for_state(&breaker, BreakerState::Closed));
+        assert!(breaker.allow().is_ok());
+        assert_eq!(BreakerState::HalfOpen.as_str(), "half-open");
+    }
+}
@@ -0,0 +1,306 @@
+use once_cell::sync::Lazy;
+use std::collections::hash_map::DefaultHasher;
+use std::collections::{BTreeMap, HashMap};
+use std::hash::{Hash, Hasher};
+use std::sync::atomic::{AtomicU64, AtomicUsize, Ordering};
+use std::sync::Mutex;
+
+/// Number of corrections kept in memory across all shards
+pub const DEFAULT_CAPACITY: usize = 4096;
+
+/// Independent LRU shards so concurrent lookups rarely contend on one lock
+const SHARD_COUNT: usize = 8;
+
+/// Rough per-entry bookkeeping cost (map slots, recency index, string headers)
+const ENTRY_OVERHEAD_BYTES: usize = 128;
+
+/// Process-wide cache in front of `generate_correction`
+pub static CORRECTION_CACHE: Lazy<CorrectionCache> = Lazy::new(|| CorrectionCache::new(DEFAULT_CAPACITY));
+
+/// Stable 64-bit FNV-1a hash, used to fingerprint prompt templates
+pub fn fingerprint(text: &str) -> u64 {
+    fingerprint_bytes(text.as_bytes())
+}
+
+/// Stable 64-bit FNV-1a hash of raw bytes
+pub fn fingerprint_bytes(bytes: &[u8]) -> u64 {
+    const OFFSET_BASIS: u64 = 0xcbf2_9ce4_8422_2325;
+    const PRIME: u64 = 0x0000_0100_0000_01b3;
+
+    bytes.iter().fold(OFFSET_BASIS, |hash, &byte| (hash ^ byte as u64).wrapping_mul(PRIME))
+}
+
+/// Collapse whitespace runs and trim, so cosmetic spacing does not defeat the cache
+pub fn normalize_text(text: &str) -> String {
+    text.split_whitespace().collect::<Vec<_>>().join(" ")
+}
+
+/// Identifies a correction: the same text, model and prompt give the same answer
+#[derive(Clone, Debug, PartialEq, Eq, Hash)]
+pub struct CacheKey {
+    pub text: String,
+    pub model: String,
+    pub template_fingerprint: u64,
+}
+
+impl CacheKey {
+    pub fn new(text: &str, model: &str, template_fingerprint: u64) -> Self {
+        Self {
+            text: normalize_text(text),
+            model: model.to_string(),
+            template_fingerprint,
+        }
+    }
+
+    fn shard_index(&self) -> usize {
+        let mut hasher = DefaultHasher::new();
+        self.hash(&mut hasher);
+        hasher.finish() as usize % SHARD_COUNT
+    }
+
+    fn size_bytes(&self, value: &str) -> usize {
+        self.text.len() + self.model.len() + value.len() + ENTRY_OVERHEAD_BYTES
+    }
+}
+
+/// Snapshot of the cache counters
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub struct CacheStats {
+    pub hits: u64,
+    pub misses: u64,
+    pub evictions: u64,
+    pub entries: usize,
+    pub memory_bytes: usize,
+}
+
+impl CacheStats {
+    /// Fraction of lookups served from the cache
+    pub fn hit_rate(&self) -> f64 {
+        let lookups = self.hits + self.misses;
+        if lookups == 0 {
+            0.0
+        } else {
+            self.hits as f64 / lookups as f64
+        }
+    }
+}
+
+struct Entry {
+    value: String,
+    last_used: u64,
+}
+
+/// One LRU shard: a map plus a recency index ordered by access tick
+#[derive(Default)]
+struct Shard {
+    entries: HashMap<CacheKey, Entry>,
+    recency: BTreeMap<u64, CacheKey>,
+    tick: u64,
+}
+
+impl Shard {
+    fn next_tick(&mut self) -> u64 {
+        self.tick += 1;
+        self.tick
+    }
+
+    fn get(&mut self, key: &CacheKey) -> Option<String> {
+        let tick = self.next_tick();
+        let entry = self.entries.get_mut(key)?;
+        self.recency.remove(&entry.last_used);
+        self.recency.insert(tick, key.clone());
+        entry.last_used = tick;
+        Some(entry.value.clone())
+    }
+
+    /// Insert or replace; returns (bytes added, bytes removed, evictions)
+    fn insert(&mut self, key: CacheKey, value: String, capacity: usize) -> (usize, usize, u64) {
+        let tick = self.next_tick();
+        let added = key.size_bytes(&value);
+        let mut removed = 0;
+        let mut evictions = 0;
+
+        if let Some(old) = self.entries.remove(&key) {
+            self.recency.remove(&old.last_used);
+            removed += key.size_bytes(&old.value);
+        }
+
+        while self.entries.len() >= capacity {
+            let Some((_, oldest)) = self.recency.pop_first() else { break };
+            if let Some(old) = self.entries.remove(&oldest) {
+                removed += oldest.size_bytes(&old.value);
+                evictions += 1;
+            }
+        }
+
+        self.recency.insert(tick, key.clone());
+        self.entries.insert(key, Entry { value, last_used: tick });
+        (added, removed, evictions)
+    }
+}
+
+/// Concurrent, size-bounded LRU cache of corrections with hit-rate metrics
+pub struct CorrectionCache {
+    shards: Vec<Mutex<Shard>>,
+    shard_capacity: usize,
+    hits: AtomicU64,
+    misses: AtomicU64,
+    evictions: AtomicU64,
+    memory_bytes: AtomicUsize,
+}
+
+impl CorrectionCache {
+    /// Create a cache holding roughly `capacity` corrections
+    pub fn new(capacity: usize) -> Self {
+        Self {
+            shards: (0..SHARD_COUNT).map(|_| Mutex::new(Shard::default())).collect(),
+            shard_capacity: capacity.div_ceil(SHARD_COUNT).max(1),
+            hits: AtomicU64::new(0),
+            misses: AtomicU64::new(0),
+            evictions: AtomicU64::new(0),
+            memory_bytes: AtomicUsize::new(0),
+        }
+    }
+
+    /// Look up a correction, counting the hit or miss
+    pub fn get(&self, key: &CacheKey) -> Option<String> {
+        let value = self.shards[key.shard_index()].lock().unwrap().get(key);
+        match value {
+            Some(_) => self.hits.fetch_add(1, Ordering::Relaxed),
+            None => self.misses.fetch_add(1, Ordering::Relaxed),
+        };
+        value
+    }
+
+    /// Store a correction, evicting the least recently used entries if full
+    pub fn insert(&self, key: CacheKey, value: String) {
+        let shard = key.shard_index();
+        let (added, removed, evictions) = self.shards[shard].lock().unwrap().insert(key, value, self.shard_capacity);
+
+        self.memory_bytes.fetch_add(added, Ordering::Relaxed);
+        self.memory_bytes.fetch_sub(removed, Ordering::Relaxed);
+        self.evictions.fetch_add(evictions, Ordering::Relaxed);
+    }
+
+    /// Current counters
+    pub fn stats(&self) -> CacheStats {
+        CacheStats {
+            hits: self.hits.load(Ordering::Relaxed),
+            misses: self.misses.load(Ordering::Relaxed),
+            evictions: self.evictions.load(Ordering::Relaxed),
+            entries: self.shards.iter().map(|shard| shard.lock().unwrap().entries.len()).sum(),
+            memory_bytes: self.memory_bytes.load(Ordering::Relaxed),
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::sync::Arc;
+    use std::thread;
+
+    fn key(text: &str) -> CacheKey {
+        CacheKey::new(text, "phi:2.7b", fingerprint("template"))
+    }
+
+    #[test]
+    fn test_fingerprint_is_stable() {
+        // Reference value for FNV-1a 64 of "a"
+        assert_eq!(fingerprint("a"), 0xaf63_dc4c_8601_ec8c);
+        assert_ne!(fingerprint("template one"), fingerprint("template two"));
+    }
+
+    #[test]
+    fn test_key_normalizes_whitespace() {
+        assert_eq!(key("  I have   teh cat "), key("I have teh cat"));
+        assert_ne!(key("I have teh cat"), key("i have teh cat"));
+        assert_ne!(
+            CacheKey::new("teh", "phi:2.7b", 1),
+            CacheKey::new("teh", "llama3.2:1b", 1)
+        );
+        assert_ne!(CacheKey::new("teh", "phi:2.7b", 1), CacheKey::new("teh", "phi:2.7b", 2));
+    }
+
+    #[test]
+    fn test_hits_and_misses() {
+        let cache = CorrectionCache::new(16);
+        assert_eq!(cache.get(&key("teh cat")), None);
+
+        cache.insert(key("teh cat"), "the cat".to_string());
+        assert_eq!(cache.get(&key("teh  cat")), Some("the cat".to_string()));
+
+        let stats = cache.stats();
+        assert_eq!(stats.hits, 1);
+        assert_eq!(stats.misses, 1);
+        assert_eq!(stats.entries, 1);
+        assert!(stats.memory_bytes > "teh cat".len() + "the cat".len());
+        assert_eq!(stats.hit_rate(), 0.5);
+    }
+
+    #[test]
+    fn test_replacing_entry_keeps_counts() {
+        let cache = CorrectionCache::new(16);
+        cache.insert(key("teh"), "the".to_string());
+        let before = cache.stats().memory_bytes;
+        cache.insert(key("teh"), "the".to_string());
+
+        let stats = cache.stats();
+        assert_eq!(stats.entries, 1);
+        assert_eq!(stats.memory_bytes, before);
+        assert_eq!(stats.evictions, 0);
+    }
+
+    #[test]
+    fn test_evicts_least_recently_used() {
+        let cache = CorrectionCache::new(SHARD_COUNT * 2);
+        for i in 0..SHARD_COUNT * 10 {
+            cache.insert(key(&format!("text {}", i)), format!("value {}", i));
+        }
+
+        let stats = cache.stats();
+        assert!(stats.entries <= SHARD_COUNT * 2);
+        assert_eq!(stats.evictions as usize, SHARD_COUNT * 10 - stats.entries);
+        // The most recent insert always survives
+        let last = SHARD_COUNT * 10 - 1;
+        assert_eq!(cache.get(&key(&format!("text {}", last))), Some(format!("value {}", last)));
+    }
+
+    #[test]
+    fn test_recently_read_entry_survives() {
+        let mut shard = Shard::default();
+        shard.insert(key("a"), "A".to_string(), 2);
+        shard.insert(key("b"), "B".to_string(), 2);
+        assert!(shard.get(&key("a")).is_some());
+
+        let (_, _, evictions) = shard.insert(key("c"), "C".to_string(), 2);
+        assert_eq!(evictions, 1);
+        assert!(shard.get(&key("a")).is_some());
+        assert!(shard.get(&key("b")).is_none());
+    }
+
+    #[test]
+    fn test_concurrent_access() {
+        // Room for every key in any one shard, so no thread evicts another's entry before it reads it
+        let cache = Arc::new(CorrectionCache::new(400 * SHARD_COUNT));
+        let handles: Vec<_> = (0..4)
+            .map(|t| {
+                let cache = Arc::clone(&cache);
+                thread::spawn(move || {
+                    for i in 0..100 {
+                        let k = key(&format!("{} {}", t, i));
+                        cache.insert(k.clone(), "fixed".to_string());
+                        assert!(cache.get(&k).is_some());
+                    }
+                })
+            })
+            .collect();
+        for handle in handles {
+            handle.join().unwrap();
+        }
+
+        let stats = cache.stats();
+        assert_eq!(stats.hits, 400);
+        assert_eq!(stats.entries, 400);
+    }
+}
@@ -0,0 +1,466 @@
+use std::collections::HashMap;
+use std::fs::{self, File};
+use std::io;
+use std::os::unix::io::AsRawFd;
+use std::path::Path;
+use tracing::info;
+
+use super::cache::{fingerprint, fingerprint_bytes};
+use super::symspell::{deletes, edit_distance, Suggestion, WordIndex};
+
+/// Identifies the file format; bump the version when the layout changes
+const MAGIC: &[u8; 8] = b"TFXLEX02";
+
+/// magic + slot count (u32) + word count (u32) + source fingerprint (u64)
+/// + delete bucket count (u32) + max edit distance (u32)
+const HEADER_BYTES: usize = 8 + 4 + 4 + 8 + 4 + 4;
+
+/// Compile `word count` pairs into a read-only spelling index.
+///
+/// Layout: header, then `slots` little-endian u32 entries (blob offset + 1,
+/// zero for empty), then `buckets + 1` u32 offsets into the postings, then the
+/// postings (u32 blob offsets), then the blob of entries, each a length byte,
+/// the lowercase word and its count as a u64. Words are found by hashing the
+/// query and probing the slot array; close matches by hashing each of the
+/// query's deletes to a bucket, whose postings are the words sharing that
+/// delete. Everything is compared in place, so the file can be used straight
+/// from a memory mapping.
+pub fn compile<'a>(
+    words: impl IntoIterator<Item = (&'a str, u64)>,
+    max_edit_distance: usize,
+    source_fingerprint: u64,
+) -> Vec<u8> {
+    let mut counts: HashMap<String, u64> = HashMap::new();
+    for (word, count) in words {
+        let word = word.to_lowercase();
+        if word.is_empty() || word.len() > u8::MAX as usize {
+            continue;
+        }
+        let entry = counts.entry(word).or_default();
+        *entry = (*entry).max(count);
+    }
+    let mut unique: Vec<(String, u64)> = counts.into_iter().collect();
+    unique.sort();
+
+    // Keep the load factor at or below one half so probe chains stay short
+    let slots = (unique.len() * 2).next_power_of_two().max(8);
+    let mut table = vec![0u32; slots];
+    let mut blob = Vec::new();
+    let mut deletes_of: Vec<(u64, u32)> = Vec::new();
+
+    for (word, count) in &unique {
+        let offset = blob.len() as u32;
+        let mut slot = slot_for(word.as_bytes(), slots);
+        while table[slot] != 0 {
+            slot = (slot + 1) & (slots - 1);
+        }
+        table[slot] = offset + 1;
+        for variant in deletes(word, max_edit_distance) {
+            deletes_of.push((fingerprint(&variant), offset));
+        }
+        blob.push(word.len() as u8);
+        blob.extend_from_slice(word.as_bytes());
+        blob.extend_from_slice(&count.to_le_bytes());
+    }
+
+    // A few words per bucket: colliding deletes only add candidates that the
+    // edit distance check then drops
+    let buckets = (deletes_of.len() / 4).next_power_of_two().max(8);
+    let mut postings: Vec<(u32, u32)> = deletes_of
+        .into_iter()
+        .map(|(hash, offset)| (bucket_of(hash, buckets), offset))
+        .collect();
+    postings.sort_unstable();
+
+    let mut bucket_offsets = Vec::with_capacity(buckets + 1);
+    let mut next = 0;
+    for bucket in 0..=buckets as u32 {
+        while next < postings.len() && postings[next].0 < bucket {
+            next += 1;
+        }
+        bucket_offsets.push(next as u32);
+    }
+
+    let mut bytes = Vec::with_capacity(HEADER_BYTES + (slots + buckets + 1 + postings.len()) * 4 + blob.len());
+    bytes.extend_from_slice(MAGIC);
+    bytes.extend_from_slice(&(slots as u32).to_le_bytes());
+    bytes.extend_from_slice(&(unique.len() as u32).to_le_bytes());
+    bytes.extend_from_slice(&source_fingerprint.to_le_bytes());
+    bytes.extend_from_slice(&(buckets as u32).to_le_bytes());
+    bytes.extend_from_slice(&(max_edit_distance as u32).to_le_bytes());
+    for entry in table {
+        bytes.extend_from_slice(&entry.to_le_bytes());
+    }
+    for offset in bucket_offsets {
+        bytes.extend_from_slice(&offset.to_le_bytes());
+    }
+    for (_, offset) in postings {
+        bytes.extend_from_slice(&offset.to_le_bytes());
+    }
+    bytes.extend_from_slice(&blob);
+    bytes
+}
+
+fn slot_for(word: &[u8], slots: usize) -> usize {
+    fingerprint_bytes(word) as usize & (slots - 1)
+}
+
+fn bucket_of(hash: u64, buckets: usize) -> u32 {
+    // The high bits, so words sharing a slot don't share buckets
+    (hash.rotate_right(32) as usize & (buckets - 1)) as u32
+}
+
+/// A compiled lexicon mapped read-only into memory, or held in a buffer when
+/// there is no file to map
+pub struct MappedLexicon {
+    ptr: *const u8,
+    len: usize,
+    owned: Option<Vec<u8>>,
+    slots: usize,
+    words: usize,
+    source_fingerprint: u64,
+    buckets: usize,
+    max_edit_distance: usize,
+    postings_start: usize,
+    blob_start: usize,
+}
+
+// The bytes are read-only and never change after `open`
+unsafe impl Send for MappedLexicon {}
+unsafe impl Sync for MappedLexicon {}
+
+impl MappedLexicon {
+    /// Map a compiled lexicon file and validate its header
+    pub fn open(path: &Path) -> io::Result<Self> {
+        let file = File::open(path)?;
+        let len = file.metadata()?.len() as usize;
+        if len < HEADER_BYTES {
+            return Err(io::Error::new(io::ErrorKind::InvalidData, "lexicon file too short"));
+        }
+
+        let ptr = unsafe {
+            libc::mmap(
+                std::ptr::null_mut(),
+                len,
+                libc::PROT_READ,
+                libc::MAP_PRIVATE,
+                file.as_raw_fd(),
+                0,
+            )
+        };
+        if ptr == libc::MAP_FAILED {
+            return Err(io::Error::last_os_error());
+        }
+        Self::with_bytes(ptr as *const u8, len, None)
+    }
+
+    /// Use a compiled lexicon held in memory
+    pub fn from_bytes(bytes: Vec<u8>) -> io::Result<Self> {
+        if bytes.len() < HEADER_BYTES {
+            return Err(io::Error::new(io::ErrorKind::InvalidData, "lexicon too short"));
+        }
+        Self::with_bytes(bytes.as_ptr(), bytes.len(), Some(bytes))
+    }
+
+    fn with_bytes(ptr: *const u8, len: usize, owned: Option<Vec<u8>>) -> io::Result<Self> {
+        let mut lexicon = Self {
+            ptr,
+            len,
+            owned,
+            slots: 0,
+            words: 0,
+            source_fingerprint: 0,
+            buckets: 0,
+            max_edit_distance: 0,
+            postings_start: 0,
+            blob_start: 0,
+        };
+        let bytes = lexicon.bytes();
+        if &bytes[..8] != MAGIC {
+            return Err(io::Error::new(io::ErrorKind::InvalidData, "unknown lexicon format"));
+        }
+        let slots = read_u32(bytes, 8);
+        let words = read_u32(bytes, 12);
+        let source_fingerprint = u64::from_le_bytes(bytes[16..24].try_into().unwrap());
+        let buckets = read_u32(bytes, 24);
+        let max_edit_distance = read_u32(bytes, 28);
+        let postings_start = HEADER_BYTES + (slots + buckets + 1) * 4;
+        let corrupt = !slots.is_power_of_two()
+            || !buckets.is_power_of_two()
+            || postings_start > len
+            || postings_start + read_u32(bytes, postings_start - 4) * 4 > len;
+        if corrupt {
+            return Err(io::Error::new(io::ErrorKind::InvalidData, "corrupt lexicon header"));
+        }
+
+        let blob_start = postings_start + read_u32(bytes, postings_start - 4) * 4;
+        lexicon.blob_start = blob_start;
+        lexicon.slots = slots;
+        lexicon.words = words;
+        lexicon.source_fingerprint = source_fingerprint;
+        lexicon.buckets = buckets;
+        lexicon.max_edit_distance = max_edit_distance;
+        lexicon.postings_start = postings_start;
+        Ok(lexicon)
+    }
+
+    /// Whether the lowercase word is in the lexicon; reads straight from the bytes
+    pub fn contains(&self, word: &str) -> bool {
+        self.find(word).is_some()
+    }
+
+    /// Blob offset of the lowercase word's entry
+    fn find(&self, word: &str) -> Option<usize> {
+        let word = word.as_bytes();
+        let bytes = self.bytes();
+        let mut slot = slot_for(word, self.slots);
+        for _ in 0..self.slots {
+            let entry = read_u32(bytes, HEADER_BYTES + slot * 4);
+            if entry == 0 {
+                return None;
+            }
+            if self.entry(entry - 1).is_some_and(|(term, _)| term.as_bytes() == word) {
+                return Some(entry - 1);
+            }
+            slot = (slot + 1) & (self.slots - 1);
+        }
+        None
+    }
+
+    /// The word and count stored at a blob offset
+    fn entry(&self, offset: usize) -> Option<(&str, u64)> {
+        let blob = &self.bytes()[self.blob_start..];
+        let len = *blob.get(offset)? as usize;
+        let word = std::str::from_utf8(blob.get(offset + 1..offset + 1 + len)?).ok()?;
+        let count = blob.get(offset + 1 + len..offset + 9 + len)?;
+        Some((word, u64::from_le_bytes(count.try_into().unwrap())))
+    }
+
+    /// Dictionary words within the maximum edit distance, closest and most frequent first
+    pub fn lookup(&self, word: &str) -> Vec<Suggestion> {
+        let word = word.to_lowercase();
+        let suggestion = |offset: usize, distance: usize| {
+            self.entry(offset).map(|(term, count)| Suggestion { term: term.to_string(), distance, count })
+        };
+        if let Some(offset) = self.find(&word) {
+            return suggestion(offset, 0).into_iter().collect();
+        }
+
+        let bytes = self.bytes();
+        let input_len = word.chars().count();
+        let mut seen = std::collections::HashSet::new();
+        let mut suggestions = Vec::new();
+        for variant in deletes(&word, self.max_edit_distance) {
+            let bucket = bucket_of(fingerprint(&variant), self.buckets) as usize;
+            let first = read_u32(bytes, HEADER_BYTES + (self.slots + bucket) * 4);
+            let last = read_u32(bytes, HEADER_BYTES + (self.slots + bucket + 1) * 4);
+            for posting in first..last {
+                let offset = read_u32(bytes, self.postings_start + posting * 4);
+                if !seen.insert(offset) {
+                    continue;
+                }
+                let Some((term, count)) = self.entry(offset) else { continue };
+                if term.chars().count().abs_diff(input_len) > self.max_edit_distance {
+                    continue;
+                }
+                let distance = edit_distance(&word, term);
+                if distance <= self.max_edit_distance {
+                    suggestions.push(Suggestion { term: term.to_string(), distance, count });
+                }
+            }
+        }
+
+        suggestions.sort_by(|a, b| a.distance.cmp(&b.distance).then(b.count.cmp(&a.count)));
+        suggestions
+    }
+
+    /// Number of words in the lexicon
+    pub fn len(&self) -> usize {
+        self.words
+    }
+
+    /// Size of the mapping in bytes
+    #[allow(dead_code)]
+    pub fn mapped_bytes(&self) -> usize {
+        self.len
+    }
+
+    fn bytes(&self) -> &[u8] {
+        unsafe { std::slice::from_raw_parts(self.ptr, self.len) }
+    }
+}
+
+impl WordIndex for MappedLexicon {
+    fn contains(&self, word: &str) -> bool {
+        MappedLexicon::contains(self, word)
+    }
+
+    fn lookup(&self, word: &str) -> Vec<Suggestion> {
+        MappedLexicon::lookup(self, word)
+    }
+
+    fn len(&self) -> usize {
+        self.words
+    }
+}
+
+fn read_u32(bytes: &[u8], at: usize) -> usize {
+    u32::from_le_bytes(bytes[at..at + 4].try_into().unwrap()) as usize
+}
+
+impl Drop for MappedLexicon {
+    fn drop(&mut self) {
+        if self.owned.is_none() {
+            unsafe {
+                libc::munmap(self.ptr as *mut libc::c_void, self.len);
+            }
+        }
+    }
+}
+
+/// Map the compiled lexicon at `path`, compiling it first if it is missing or stale
+pub fn open_or_compile<'a>(
+    path: &Path,
+    words: impl IntoIterator<Item = (&'a str, u64)>,
+    max_edit_distance: usize,
+    source: &str,
+) -> io::Result<MappedLexicon> {
+    let source_fingerprint = fingerprint(source);
+    if let Ok(lexicon) = MappedLexicon::open(path) {
+        if lexicon.source_fingerprint == source_fingerprint && lexicon.max_edit_distance == max_edit_distance {
+            return Ok(lexicon);
+        }
+    }
+
+    let bytes = compile(words, max_edit_distance, source_fingerprint);
+    if let Some(parent) = path.parent() {
+        fs::create_dir_all(parent)?;
+    }
+    // Write and rename, so an existing mapping of the old file stays valid
+    let tmp_path = path.with_extension("tmp");
+    fs::write(&tmp_path, &bytes)?;
+    fs::rename(&tmp_path, path)?;
+    info!("📚 Compiled lexicon to {:?} ({} bytes)", path, bytes.len());
+
+    MappedLexicon::open(path)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use tempfile::TempDir;
+
+    #[test]
+    fn test_compile_and_lookup() {
+        let temp_dir = TempDir::new().unwrap();
+        let path = temp_dir.path().join("lexicon.bin");
+        let words = [("the", 1000), ("Cat", 30), ("receive", 50), ("don't", 20), ("the", 900), ("tier", 3), ("their", 200)];
+        fs::write(&path, compile(words, 2, 7)).unwrap();
+
+        let lexicon = MappedLexicon::open(&path).unwrap();
+        assert_eq!(lexicon.len(), 6);
+        assert!(lexicon.contains("the"));
+        assert!(lexicon.contains("cat"));
+        assert!(lexicon.contains("don't"));
+        assert!(!lexicon.contains("teh"));
+        assert!(!lexicon.contains(""));
+        assert!(!lexicon.contains("receives"));
+
+        // Close matches come from the compiled deletes, with the larger count kept
+        assert_eq!(lexicon.lookup("the"), vec![Suggestion { term: "the".to_string(), distance: 0, count: 1000 }]);
+        let suggestions = lexicon.lookup("thier");
+        assert_eq!((suggestions[0].term.as_str(), suggestions[0].distance), ("their", 1));
+        assert!(suggestions.iter().any(|s| s.term == "tier"));
+        assert_eq!(lexicon.lookup("recieve")[0].term, "receive");
+        assert!(lexicon.lookup("xyzzy").is_empty());
+    }
+
+    #[test]
+    fn test_matches_in_memory_index() {
+        use super::super::symspell::SymSpell;
+
+        let list = "the 1000\nreceive 50\nmessage 40\ntheir 200\ntier 3\ncat 30\ncar 29\nhelp 100\nwith 500\n";
+        let symspell = SymSpell::from_frequency_list(list, 2);
+        let compiled = MappedLexicon::from_bytes(compile(super::super::symspell::parse_frequency_list(list), 2, 0)).unwrap();
+        for word in ["teh", "mesage", "thier", "cax", "hlep", "wiht", "message", "ca", "xyzzy"] {
+            assert_eq!(compiled.lookup(word), symspell.lookup(word), "{}", word);
+        }
+    }
+
+    #[test]
+    fn test_rejects_garbage() {
+        let temp_dir = TempDir::new().unwrap();
+        let path = temp_dir.path().join("lexicon.bin");
+        fs::write(&path, b"definitely not a lexicon file").unwrap();
+        assert!(MappedLexicon::open(&path).is_err());
+        assert!(MappedLexicon::open(&temp_dir.path().join("missing.bin")).is_err());
+
+        // A valid header whose sections run past the end of the file
+        let mut truncated = compile([("alpha", 1)], 2, 0);
+        truncated.truncate(HEADER_BYTES + 8);
+        assert!(MappedLexicon::from_bytes(truncated).is_err());
+    }
+
+    #[test]
+    fn test_recompiles_when_source_changes() {
+        let temp_dir = TempDir::new().unwrap();
+        let path = temp_dir.path().join("lexicon.bin");
+
+        let first = open_or_compile(&path, [("alpha", 1)], 2, "alpha").unwrap();
+        assert!(first.contains("alpha"));
+
+        // Same source: the existing file is reused as-is
+        let modified = fs::metadata(&path).unwrap().modified().unwrap();
+        let again = open_or_compile(&path, [("ignored", 1)], 2, "alpha").unwrap();
+        assert!(again.contains("alpha"));
+        assert_eq!(fs::metadata(&path).unwrap().modified().unwrap(), modified);
+
+        let second = open_or_compile(&path, [("alpha", 1), ("beta", 1)], 2, "alpha beta").unwrap();
+        assert!(second.contains("beta"));
+        // The old mapping is still readable after the file was replaced
+        assert!(first.contains("alpha"));
+    }
+
+    #[test]
+    #[ignore] // Benchmark: cargo test bench_lexicon_load -- --ignored --nocapture
+    fn bench_lexicon_load() {
+        use super::super::symspell::{parse_frequency_list, DictionaryCorrector, SymSpell, FREQUENCY_LIST, MAX_EDIT_DISTANCE};
+        use std::time::Instant;
+
+        fn max_rss_kb() -> i64 {
+            let mut usage: libc::rusage = unsafe { std::mem::zeroed() };
+            unsafe { libc::getrusage(libc::RUSAGE_SELF, &mut usage) };
+            // Linux reports kilobytes, macOS bytes
+            if cfg!(target_os = "macos") { usage.ru_maxrss / 1024 } else { usage.ru_maxrss }
+        }
+
+        let temp_dir = TempDir::new().unwrap();
+        let path = temp_dir.path().join("lexicon.bin");
+        let start = Instant::now();
+        drop(open_or_compile(&path, parse_frequency_list(FREQUENCY_LIST), MAX_EDIT_DISTANCE, FREQUENCY_LIST).unwrap());
+        let compile_time = start.elapsed();
+
+        // Startup as it runs now: map the file and search it in place
+        let rss_before = max_rss_kb();
+        let start = Instant::now();
+        let mapped: &'static MappedLexicon = Box::leak(Box::new(
+            open_or_compile(&path, parse_frequency_list(FREQUENCY_LIST), MAX_EDIT_DISTANCE, FREQUENCY_LIST).unwrap(),
+        ));
+        let corrector = DictionaryCorrector::new(mapped);
+        let mapped_time = start.elapsed();
+        let start = Instant::now();
+        assert_eq!(corrector.correct("I beleive the mesage"), Some("I believe the message".to_string()));
+        let mapped_lookup = start.elapsed();
+        let rss_mapped = max_rss_kb();
+
+        // Startup from the text list: build the symmetric-delete index in memory
+        let start = Instant::now();
+        let symspell = SymSpell::from_frequency_list(FREQUENCY_LIST, MAX_EDIT_DISTANCE);
+        let parsed_time = start.elapsed();
+        let rss_parsed = max_rss_kb();
+
+        println!("first-run compile: {:?}, {} bytes written", compile_time, mapped.mapped_bytes());
+        println!("mapped startup:    {:?} (first correction {:?}), +{} KB max RSS", mapped_time, mapped_lookup, rss_mapped - rss_before);
+        println!("text list startup: {:?}, {} words indexed, +{} KB max RSS", parsed_time, symspell.len(), rss_parsed - rss_mapped);
+    }
+}
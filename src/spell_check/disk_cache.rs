@@ -0,0 +1,372 @@
+use once_cell::sync::OnceCell;
+use std::cmp::Reverse;
+use std::collections::{HashMap, HashSet};
+use std::fs::{self, File, OpenOptions};
+use std::io::{self, Read, Write};
+use std::path::{Path, PathBuf};
+use std::sync::{Mutex, MutexGuard};
+use std::thread;
+use tracing::{debug, info, warn};
+
+use super::cache::{fingerprint, fingerprint_bytes, CacheKey};
+
+/// File size at which the log is compacted
+pub const DEFAULT_MAX_BYTES: u64 = 4 * 1024 * 1024;
+
+/// Identifies the file format; bump the version when the record layout changes
+const MAGIC: &[u8; 8] = b"TFXCACH1";
+
+/// payload length (u32) + checksum (u32) + scope (u64) + key length (u16)
+const RECORD_HEADER_BYTES: usize = 4 + 4 + 8 + 2;
+
+static DISK_CACHE: OnceCell<DiskCache> = OnceCell::new();
+
+/// Open the process-wide disk cache and load it on a background thread
+pub fn init_disk_cache(path: PathBuf) -> &'static DiskCache {
+    let cache = DISK_CACHE.get_or_init(|| DiskCache::new(path, DEFAULT_MAX_BYTES));
+    thread::spawn(|| {
+        if let Some(cache) = DISK_CACHE.get() {
+            cache.warm();
+        }
+    });
+    cache
+}
+
+/// The process-wide disk cache, if it has been initialised
+pub fn disk_cache() -> Option<&'static DiskCache> {
+    DISK_CACHE.get()
+}
+
+/// A model/prompt combination; entries from other scopes are never returned
+fn scope_of(key: &CacheKey) -> u64 {
+    fingerprint(&format!("{}\0{:016x}", key.model, key.template_fingerprint))
+}
+
+struct Stored {
+    value: String,
+    seq: u64,
+}
+
+#[derive(Default)]
+struct Index {
+    entries: HashMap<(u64, String), Stored>,
+    file_len: u64,
+    next_seq: u64,
+    /// Scopes stored or read during this run, i.e. those of the configured models
+    live_scopes: HashSet<u64>,
+}
+
+/// Append-only correction log next to `config.toml`, loaded lazily.
+///
+/// Each record carries the scope it was generated under, so changing the
+/// model or prompt template invalidates old entries without touching the
+/// file. Compaction keeps the newest entries of every scope used this run,
+/// so a small and a large model share the log, and fills what room is left
+/// with the newest entries of other scopes.
+pub struct DiskCache {
+    path: PathBuf,
+    max_bytes: u64,
+    index: Mutex<Option<Index>>,
+}
+
+impl DiskCache {
+    pub fn new(path: PathBuf, max_bytes: u64) -> Self {
+        Self {
+            path,
+            max_bytes,
+            index: Mutex::new(None),
+        }
+    }
+
+    /// Load the log now instead of on the first lookup
+    pub fn warm(&self) {
+        let guard = self.loaded();
+        if let Some(index) = guard.as_ref() {
+            info!("💾 Loaded {} cached corrections from {:?}", index.entries.len(), self.path);
+        }
+    }
+
+    /// Look up a correction stored by a previous run
+    pub fn get(&self, key: &CacheKey) -> Option<String> {
+        let scope = scope_of(key);
+        let mut guard = self.loaded();
+        let index = guard.as_mut()?;
+        let value = index.entries.get(&(scope, key.text.clone())).map(|stored| stored.value.clone())?;
+        index.live_scopes.insert(scope);
+        Some(value)
+    }
+
+    /// Append a correction, compacting the log if it grew past the size cap
+    pub fn insert(&self, key: &CacheKey, value: &str) -> io::Result<()> {
+        let scope = scope_of(key);
+        let record = encode_record(scope, &key.text, value);
+
+        let mut guard = self.loaded();
+        let index = guard.get_or_insert_with(Index::default);
+
+        if index.file_len == 0 {
+            if let Some(parent) = self.path.parent() {
+                fs::create_dir_all(parent)?;
+            }
+            fs::write(&self.path, MAGIC)?;
+            index.file_len = MAGIC.len() as u64;
+        }
+        let mut file = OpenOptions::new().append(true).open(&self.path)?;
+        file.write_all(&record)?;
+
+        index.file_len += record.len() as u64;
+        index.live_scopes.insert(scope);
+        let seq = index.next_seq;
+        index.next_seq += 1;
+        index.entries.insert((scope, key.text.clone()), Stored { value: value.to_string(), seq });
+
+        if index.file_len > self.max_bytes {
+            self.compact(index)?;
+        }
+        Ok(())
+    }
+
+    /// Current size of the log on disk
+    #[allow(dead_code)]
+    pub fn file_len(&self) -> u64 {
+        self.loaded().as_ref().map(|index| index.file_len).unwrap_or(0)
+    }
+
+    fn loaded(&self) -> MutexGuard<'_, Option<Index>> {
+        let mut guard = self.index.lock().unwrap();
+        if guard.is_none() {
+            *guard = Some(match load_index(&self.path) {
+                Ok(index) => index,
+                Err(e) => {
+                    if e.kind() != io::ErrorKind::NotFound {
+                        warn!("Ignoring unreadable correction cache {:?}: {}", self.path, e);
+                    }
+                    Index::default()
+                }
+            });
+        }
+        guard
+    }
+
+    /// Rewrite the log with the newest entries, taking live scopes first and
+    /// each of them in turn so that a busy model cannot push out a quiet one
+    fn compact(&self, index: &mut Index) -> io::Result<()> {
+        let mut by_scope: HashMap<u64, Vec<(&String, &Stored)>> = HashMap::new();
+        for ((scope, text), stored) in &index.entries {
+            by_scope.entry(*scope).or_default().push((text, stored));
+        }
+        let mut ranked = Vec::with_capacity(index.entries.len());
+        for (scope, mut entries) in by_scope {
+            entries.sort_by(|a, b| b.1.seq.cmp(&a.1.seq));
+            let live = index.live_scopes.contains(&scope);
+            for (rank, (text, stored)) in entries.into_iter().enumerate() {
+                ranked.push(((!live, rank, Reverse(stored.seq)), scope, text, stored));
+            }
+        }
+        ranked.sort_by_key(|entry| entry.0);
+
+        // Leave headroom so we do not compact again on the next insert
+        let budget = self.max_bytes / 2;
+        let mut contents = MAGIC.to_vec();
+        let mut kept = HashSet::new();
+        for (_, scope, text, stored) in ranked {
+            let record = encode_record(scope, text, &stored.value);
+            if (contents.len() + record.len()) as u64 > budget {
+                break;
+            }
+            contents.extend_from_slice(&record);
+            kept.insert((scope, text.clone()));
+        }
+        index.entries.retain(|key, _| kept.contains(key));
+
+        let tmp_path = self.path.with_extension("tmp");
+        fs::write(&tmp_path, &contents)?;
+        fs::rename(&tmp_path, &self.path)?;
+
+        debug!("Compacted correction cache to {} entries ({} bytes)", index.entries.len(), contents.len());
+        index.file_len = contents.len() as u64;
+        Ok(())
+    }
+}
+
+fn encode_record(scope: u64, text: &str, value: &str) -> Vec<u8> {
+    let key_len = text.len().min(u16::MAX as usize);
+    let text = &text.as_bytes()[..key_len];
+
+    let mut payload = Vec::with_capacity(8 + 2 + text.len() + value.len());
+    payload.extend_from_slice(&scope.to_le_bytes());
+    payload.extend_from_slice(&(key_len as u16).to_le_bytes());
+    payload.extend_from_slice(text);
+    payload.extend_from_slice(value.as_bytes());
+
+    let mut record = Vec::with_capacity(8 + payload.len());
+    record.extend_from_slice(&(payload.len() as u32).to_le_bytes());
+    record.extend_from_slice(&checksum(&payload).to_le_bytes());
+    record.extend_from_slice(&payload);
+    record
+}
+
+fn checksum(payload: &[u8]) -> u32 {
+    fingerprint_bytes(payload) as u32
+}
+
+fn load_index(path: &Path) -> io::Result<Index> {
+    let mut bytes = Vec::new();
+    File::open(path)?.read_to_end(&mut bytes)?;
+
+    if !bytes.starts_with(MAGIC) {
+        return Err(io::Error::new(io::ErrorKind::InvalidData, "unknown cache format"));
+    }
+
+    let mut index = Index::default();
+    let mut pos = MAGIC.len();
+    while bytes.len() - pos >= RECORD_HEADER_BYTES {
+        let payload_len = u32::from_le_bytes(bytes[pos..pos + 4].try_into().unwrap()) as usize;
+        let expected = u32::from_le_bytes(bytes[pos + 4..pos + 8].try_into().unwrap());
+        let start = pos + 8;
+        let end = start + payload_len;
+        // A torn write at the end of the log, e.g. after a crash
+        if end > bytes.len() || payload_len < 10 {
+            break;
+        }
+        let payload = &bytes[start..end];
+        pos = end;
+        if checksum(payload) != expected {
+            continue;
+        }
+
+        let scope = u64::from_le_bytes(payload[0..8].try_into().unwrap());
+        let key_len = u16::from_le_bytes(payload[8..10].try_into().unwrap()) as usize;
+        if 10 + key_len > payload.len() {
+            continue;
+        }
+        let text = String::from_utf8_lossy(&payload[10..10 + key_len]).into_owned();
+        let value = String::from_utf8_lossy(&payload[10 + key_len..]).into_owned();
+
+        let seq = index.next_seq;
+        index.next_seq += 1;
+        index.entries.insert((scope, text), Stored { value, seq });
+    }
+
+    // Drop a torn tail so new records are appended right after the last good one
+    if pos < bytes.len() {
+        OpenOptions::new().write(true).open(path)?.set_len(pos as u64)?;
+    }
+
+    index.file_len = pos as u64;
+    Ok(index)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use tempfile::TempDir;
+
+    fn key(text: &str, model: &str) -> CacheKey {
+        CacheKey::new(text, model, fingerprint("template"))
+    }
+
+    #[test]
+    fn test_survives_restart() {
+        let temp_dir = TempDir::new().unwrap();
+        let path = temp_dir.path().join("corrections.cache");
+
+        let cache = DiskCache::new(path.clone(), DEFAULT_MAX_BYTES);
+        assert_eq!(cache.get(&key("teh cat", "phi:2.7b")), None);
+        cache.insert(&key("teh cat", "phi:2.7b"), "the cat").unwrap();
+        cache.insert(&key("recieve", "phi:2.7b"), "receive").unwrap();
+        cache.insert(&key("teh cat", "phi:2.7b"), "The cat").unwrap();
+
+        let reopened = DiskCache::new(path, DEFAULT_MAX_BYTES);
+        assert_eq!(reopened.get(&key("teh cat", "phi:2.7b")), Some("The cat".to_string()));
+        assert_eq!(reopened.get(&key("recieve", "phi:2.7b")), Some("receive".to_string()));
+    }
+
+    #[test]
+    fn test_model_or_template_change_invalidates() {
+        let temp_dir = TempDir::new().unwrap();
+        let cache = DiskCache::new(temp_dir.path().join("corrections.cache"), DEFAULT_MAX_BYTES);
+        cache.insert(&key("teh cat", "phi:2.7b"), "the cat").unwrap();
+
+        assert_eq!(cache.get(&key("teh cat", "llama3.2:1b")), None);
+        assert_eq!(cache.get(&CacheKey::new("teh cat", "phi:2.7b", fingerprint("other template"))), None);
+    }
+
+    #[test]
+    fn test_compacts_past_size_cap() {
+        let temp_dir = TempDir::new().unwrap();
+        let path = temp_dir.path().join("corrections.cache");
+
+        // Left by a model from an earlier run
+        let mut records = MAGIC.to_vec();
+        for i in 0..20 {
+            records.extend_from_slice(&encode_record(scope_of(&key("x", "old")), &format!("old model entry {}", i), "stale"));
+        }
+        fs::write(&path, records).unwrap();
+
+        // A small and a large model take turns
+        let cache = DiskCache::new(path.clone(), 2048);
+        cache.insert(&key("large model entry", "llama3.1:8b"), "kept").unwrap();
+        for i in 0..200 {
+            cache.insert(&key(&format!("sentence number {}", i), "llama3.2:1b"), "fixed").unwrap();
+        }
+
+        assert!(cache.file_len() <= 2048);
+        assert_eq!(fs::metadata(&path).unwrap().len(), cache.file_len());
+
+        let reopened = DiskCache::new(path, 2048);
+        assert_eq!(reopened.get(&key("old model entry 19", "old")), None);
+        assert_eq!(reopened.get(&key("large model entry", "llama3.1:8b")), Some("kept".to_string()));
+        assert_eq!(reopened.get(&key("sentence number 199", "llama3.2:1b")), Some("fixed".to_string()));
+    }
+
+    #[test]
+    fn test_compaction_keeps_scope_read_this_run() {
+        let temp_dir = TempDir::new().unwrap();
+        let path = temp_dir.path().join("corrections.cache");
+        let cache = DiskCache::new(path.clone(), 2048);
+        cache.insert(&key("teh cat", "phi:2.7b"), "the cat").unwrap();
+
+        // After a restart the first model has only been read from when the second compacts the log
+        let reopened = DiskCache::new(path.clone(), 2048);
+        assert_eq!(reopened.get(&key("teh cat", "phi:2.7b")), Some("the cat".to_string()));
+        for i in 0..200 {
+            reopened.insert(&key(&format!("sentence number {}", i), "llama3.2:1b"), "fixed").unwrap();
+        }
+        assert_eq!(DiskCache::new(path, 2048).get(&key("teh cat", "phi:2.7b")), Some("the cat".to_string()));
+    }
+
+    #[test]
+    fn test_ignores_torn_and_corrupt_records() {
+        let temp_dir = TempDir::new().unwrap();
+        let path = temp_dir.path().join("corrections.cache");
+        let cache = DiskCache::new(path.clone(), DEFAULT_MAX_BYTES);
+        cache.insert(&key("teh cat", "phi:2.7b"), "the cat").unwrap();
+        cache.insert(&key("mesage", "phi:2.7b"), "message").unwrap();
+
+        // Flip a byte in the last value and append half a record
+        let mut bytes = fs::read(&path).unwrap();
+        let last = bytes.len() - 1;
+        bytes[last] ^= 0xff;
+        bytes.extend_from_slice(&encode_record(1, "torn", "write")[..12]);
+        fs::write(&path, bytes).unwrap();
+
+        let reopened = DiskCache::new(path, DEFAULT_MAX_BYTES);
+        assert_eq!(reopened.get(&key("teh cat", "phi:2.7b")), Some("the cat".to_string()));
+        assert_eq!(reopened.get(&key("mesage", "phi:2.7b")), None);
+    }
+
+    #[test]
+    fn test_unknown_file_is_ignored() {
+        let temp_dir = TempDir::new().unwrap();
+        let path = temp_dir.path().join("corrections.cache");
+        fs::write(&path, "not a cache").unwrap();
+
+        let cache = DiskCache::new(path.clone(), DEFAULT_MAX_BYTES);
+        assert_eq!(cache.get(&key("teh", "phi:2.7b")), None);
+        cache.insert(&key("teh", "phi:2.7b"), "the").unwrap();
+
+        let reopened = DiskCache::new(path, DEFAULT_MAX_BYTES);
+        assert_eq!(reopened.get(&key("teh", "phi:2.7b")), Some("the".to_string()));
+    }
+}
@@ -0,0 +1,252 @@
+use std::sync::Mutex;
+use std::time::{Duration, Instant};
+use tracing::{info, warn};
+
+/// Consecutive failures before an endpoint is taken out of rotation
+const EJECT_AFTER_FAILURES: u32 = 3;
+
+/// How long a first ejection lasts; repeated ejections double it
+const BASE_EJECTION: Duration = Duration::from_secs(10);
+
+/// Longest an endpoint stays ejected
+const MAX_EJECTION: Duration = Duration::from_secs(120);
+
+/// Weight of the newest sample in each endpoint's latency average
+const LATENCY_EWMA_WEIGHT: f64 = 0.3;
+
+/// How requests are spread over the endpoints
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub enum RoutingPolicy {
+    /// Fewest requests in flight, then lowest latency
+    #[default]
+    LeastOutstanding,
+    /// Lowest recent latency, then fewest requests in flight
+    Latency,
+}
+
+impl RoutingPolicy {
+    pub fn parse(value: &str) -> Option<Self> {
+        match value.trim().to_lowercase().as_str() {
+            "least-outstanding" => Some(Self::LeastOutstanding),
+            "latency" => Some(Self::Latency),
+            _ => None,
+        }
+    }
+
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            Self::LeastOutstanding => "least-outstanding",
+            Self::Latency => "latency",
+        }
+    }
+}
+
+/// Snapshot of one endpoint's state
+#[derive(Clone, Debug, PartialEq)]
+pub struct EndpointStats {
+    pub url: String,
+    pub outstanding: usize,
+    pub latency: Option<Duration>,
+    pub requests: u64,
+    pub failures: u64,
+    pub ejected: bool,
+}
+
+struct Endpoint {
+    url: String,
+    outstanding: usize,
+    latency: Option<Duration>,
+    requests: u64,
+    failures: u64,
+    consecutive_failures: u32,
+    ejections: u32,
+    ejected_until: Option<Instant>,
+}
+
+impl Endpoint {
+    fn is_ejected(&self, now: Instant) -> bool {
+        self.ejected_until.is_some_and(|until| until > now)
+    }
+}
+
+/// Inference servers serving the same model, with routing and passive health checks
+pub struct EndpointPool {
+    endpoints: Mutex<Vec<Endpoint>>,
+    policy: RoutingPolicy,
+}
+
+impl EndpointPool {
+    pub fn new(urls: &[String], policy: RoutingPolicy) -> Self {
+        let endpoints = urls
+            .iter()
+            .map(|url| Endpoint {
+                url: url.trim_end_matches('/').to_string(),
+                outstanding: 0,
+                latency: None,
+                requests: 0,
+                failures: 0,
+                consecutive_failures: 0,
+                ejections: 0,
+                ejected_until: None,
+            })
+            .collect();
+        Self {
+            endpoints: Mutex::new(endpoints),
+            policy,
+        }
+    }
+
+    pub fn len(&self) -> usize {
+        self.endpoints.lock().unwrap().len()
+    }
+
+    pub fn url(&self, index: usize) -> String {
+        self.endpoints.lock().unwrap()[index].url.clone()
+    }
+
+    /// Choose an endpoint not in `tried`, preferring healthy ones.
+    ///
+    /// When every candidate is ejected, the one due back soonest is used rather
+    /// than failing outright.
+    pub fn pick(&self, tried: &[usize]) -> Option<usize> {
+        let endpoints = self.endpoints.lock().unwrap();
+        let now = Instant::now();
+        let candidates = || (0..endpoints.len()).filter(|index| !tried.contains(index));
+
+        let healthy = candidates().filter(|&index| !endpoints[index].is_ejected(now));
+        // Unmeasured endpoints sort first so they get measured
+        let best = match self.policy {
+            RoutingPolicy::LeastOutstanding => healthy.min_by_key(|&index| {
+                let endpoint = &endpoints[index];
+                (endpoint.outstanding, endpoint.latency.unwrap_or_default())
+            }),
+            RoutingPolicy::Latency => healthy.min_by_key(|&index| {
+                let endpoint = &endpoints[index];
+                (endpoint.latency.unwrap_or_default(), endpoint.outstanding)
+            }),
+        };
+        best.or_else(|| candidates().min_by_key(|&index| endpoints[index].ejected_until))
+    }
+
+    /// Mark a request as in flight on `index` until the guard is dropped
+    pub fn begin(&self, index: usize) -> InFlight<'_> {
+        self.endpoints.lock().unwrap()[index].outstanding += 1;
+        InFlight { pool: self, index }
+    }
+
+    pub fn record_success(&self, index: usize, latency: Duration) {
+        let mut endpoints = self.endpoints.lock().unwrap();
+        let endpoint = &mut endpoints[index];
+        endpoint.requests += 1;
+        endpoint.latency = Some(match endpoint.latency {
+            Some(previous) => previous.mul_f64(1.0 - LATENCY_EWMA_WEIGHT) + latency.mul_f64(LATENCY_EWMA_WEIGHT),
+            None => latency,
+        });
+        if endpoint.ejections > 0 || endpoint.consecutive_failures > 0 {
+            info!("Endpoint {} is healthy again", endpoint.url);
+        }
+        endpoint.consecutive_failures = 0;
+        endpoint.ejections = 0;
+        endpoint.ejected_until = None;
+    }
+
+    pub fn record_failure(&self, index: usize) {
+        let mut endpoints = self.endpoints.lock().unwrap();
+        let endpoint = &mut endpoints[index];
+        endpoint.requests += 1;
+        endpoint.failures += 1;
+        endpoint.consecutive_failures += 1;
+        if endpoint.consecutive_failures >= EJECT_AFTER_FAILURES {
+            let ejection = (BASE_EJECTION * 2u32.saturating_pow(endpoint.ejections)).min(MAX_EJECTION);
+            endpoint.ejections += 1;
+            endpoint.consecutive_failures = 0;
+            endpoint.ejected_until = Some(Instant::now() + ejection);
+            warn!("Ejecting endpoint {} for {:?} after repeated failures", endpoint.url, ejection);
+        }
+    }
+
+    pub fn stats(&self) -> Vec<EndpointStats> {
+        let now = Instant::now();
+        self.endpoints
+            .lock()
+            .unwrap()
+            .iter()
+            .map(|endpoint| EndpointStats {
+                url: endpoint.url.clone(),
+                outstanding: endpoint.outstanding,
+                latency: endpoint.latency,
+                requests: endpoint.requests,
+                failures: endpoint.failures,
+                ejected: endpoint.is_ejected(now),
+            })
+            .collect()
+    }
+}
+
+/// A request in flight; releases its slot when dropped, including on cancellation
+pub struct InFlight<'a> {
+    pool: &'a EndpointPool,
+    index: usize,
+}
+
+impl Drop for InFlight<'_> {
+    fn drop(&mut self) {
+        self.pool.endpoints.lock().unwrap()[self.index].outstanding -= 1;
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn pool(policy: RoutingPolicy) -> EndpointPool {
+        EndpointPool::new(&["http://a/".to_string(), "http://b".to_string()], policy)
+    }
+
+    #[test]
+    fn test_least_outstanding() {
+        let pool = pool(RoutingPolicy::LeastOutstanding);
+        assert_eq!(pool.url(0), "http://a");
+
+        let first = pool.begin(pool.pick(&[]).unwrap());
+        let second = pool.pick(&[]).unwrap();
+        assert_ne!(second, first.index);
+        drop(first);
+        assert_eq!(pool.stats().iter().map(|e| e.outstanding).sum::<usize>(), 0);
+    }
+
+    #[test]
+    fn test_latency_routing() {
+        let pool = pool(RoutingPolicy::Latency);
+        pool.record_success(0, Duration::from_millis(200));
+        pool.record_success(1, Duration::from_millis(20));
+        assert_eq!(pool.pick(&[]), Some(1));
+        // Busy does not matter under this policy
+        let _busy = pool.begin(1);
+        assert_eq!(pool.pick(&[]), Some(1));
+        assert_eq!(pool.pick(&[1]), Some(0));
+    }
+
+    #[test]
+    fn test_ejection_and_recovery() {
+        let pool = pool(RoutingPolicy::LeastOutstanding);
+        for _ in 0..EJECT_AFTER_FAILURES {
+            pool.record_failure(0);
+        }
+        assert!(pool.stats()[0].ejected);
+        assert_eq!(pool.pick(&[]), Some(1));
+        // With nothing else left, an ejected endpoint is still tried
+        assert_eq!(pool.pick(&[1]), Some(0));
+
+        pool.record_success(0, Duration::from_millis(10));
+        assert!(!pool.stats()[0].ejected);
+        assert_eq!(pool.stats()[0].failures, EJECT_AFTER_FAILURES as u64);
+    }
+
+    #[test]
+    fn test_parse_policy() {
+        assert_eq!(RoutingPolicy::parse("Latency"), Some(RoutingPolicy::Latency));
+        assert_eq!(RoutingPolicy::parse("random"), None);
+        assert_eq!(RoutingPolicy::LeastOutstanding.as_str(), "least-outstanding");
+    }
+}
@@ -0,0 +1,143 @@
+/// Characters per token, on the low side: misspelled words split into more tokens
+const CHARS_PER_TOKEN: usize = 3;
+
+/// Room for punctuation the model adds and its end-of-answer tokens
+const GENERATION_SLACK: i32 = 8;
+
+/// Short inputs still get enough room for a rephrased word or two
+const MIN_GENERATION_TOKENS: i32 = 16;
+
+/// Upper bound however long the input is
+const MAX_GENERATION_TOKENS: i32 = 1024;
+
+/// Context window sizes to choose from. Ollama loads the model again whenever
+/// `num_ctx` changes, so a few fixed sizes keep reloads to prompts that cross
+/// a boundary, while short presses get a small KV cache.
+pub const CONTEXT_BUCKETS: [i32; 4] = [512, 1024, 2048, 4096];
+
+/// Token count of `text`, erring high, since running out cuts the correction short
+pub fn estimate_tokens(text: &str) -> usize {
+    let chars = text.chars().count();
+    let words = text.split_whitespace().count();
+    chars.div_ceil(CHARS_PER_TOKEN).max(words)
+}
+
+/// How many tokens the model may generate when correcting `text`.
+///
+/// A correction is about as long as its input, so the budget follows the input
+/// with a quarter extra plus slack, instead of a fixed cap.
+pub fn num_predict(text: &str) -> i32 {
+    let estimate = estimate_tokens(text).min(MAX_GENERATION_TOKENS as usize) as i32;
+    (estimate + estimate / 4 + GENERATION_SLACK).clamp(MIN_GENERATION_TOKENS, MAX_GENERATION_TOKENS)
+}
+
+/// Field holding the corrected text in structured output
+pub const CORRECTION_FIELD: &str = "corrected";
+
+/// Tokens for the `{"corrected": "..."}` wrapper around structured output
+pub const JSON_WRAPPER_TOKENS: i32 = 8;
+
+/// JSON schema for structured output: an object with just the corrected text
+pub fn correction_schema() -> serde_json::Value {
+    serde_json::json!({
+        "type": "object",
+        "properties": { CORRECTION_FIELD: { "type": "string" } },
+        "required": [CORRECTION_FIELD],
+    })
+}
+
+/// Smallest context bucket that holds a prompt of `prompt_tokens` plus
+/// `num_predict` generated tokens, or the largest bucket if none does
+pub fn context_size(prompt_tokens: usize, num_predict: i32) -> i32 {
+    let needed = prompt_tokens.saturating_add(num_predict.max(0) as usize);
+    CONTEXT_BUCKETS
+        .iter()
+        .copied()
+        .find(|&bucket| needed <= bucket as usize)
+        .unwrap_or(CONTEXT_BUCKETS[CONTEXT_BUCKETS.len() - 1])
+}
+
+/// Split `template` at `{text}` into the fixed instruction before it and the
+/// part that changes with each text
+pub fn split_template(template: &str) -> (&str, &str) {
+    match template.find("{text}") {
+        Some(index) => (template[..index].trim_end(), &template[index..]),
+        None => ("", template),
+    }
+}
+
+/// Sequences that end generation once the corrected line is done.
+///
+/// The model starting to repeat the instruction before `{text}` in the prompt
+/// `template` means the answer is over. Newlines and the lines after `{text}`
+/// are not used: models often open with them ("\n\nCorrected version:"),
+/// which would stop them before the answer. The streaming cleaner cuts the
+/// answer after its first line instead.
+pub fn stop_sequences(template: &str) -> Vec<String> {
+    split_template(template)
+        .0
+        .lines()
+        .map(str::trim)
+        .filter(|line| !line.is_empty())
+        .map(str::to_string)
+        .collect()
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_budget_follows_input_length() {
+        assert_eq!(estimate_tokens(""), 0);
+        assert_eq!(estimate_tokens("I have teh cat"), 5);
+        assert_eq!(num_predict("hi"), MIN_GENERATION_TOKENS);
+
+        let sentence = "I recieve teh mesage with thier help and it was definately usefull.";
+        let paragraph = sentence.repeat(5);
+        assert!(num_predict(&paragraph) > 4 * num_predict(sentence));
+        assert!(num_predict(sentence) as usize > estimate_tokens(sentence));
+        assert_eq!(num_predict(&"word ".repeat(10_000)), MAX_GENERATION_TOKENS);
+    }
+
+    #[test]
+    fn test_context_buckets() {
+        assert_eq!(context_size(20, 16), 512);
+        assert_eq!(context_size(400, 112), 512);
+        assert_eq!(context_size(400, 113), 1024);
+        assert_eq!(context_size(3000, 1024), 4096);
+        assert_eq!(context_size(100_000, 1024), 4096);
+
+        // Every input length maps onto a bucket
+        let sentence = "I recieve teh mesage with thier help. ";
+        for repeats in [1, 10, 50, 200] {
+            let text = sentence.repeat(repeats);
+            let size = context_size(estimate_tokens(&text), num_predict(&text));
+            assert!(CONTEXT_BUCKETS.contains(&size));
+        }
+    }
+
+    #[test]
+    fn test_correction_schema() {
+        let schema = correction_schema();
+        assert_eq!(schema["properties"]["corrected"]["type"], "string");
+        assert_eq!(schema["required"][0], CORRECTION_FIELD);
+    }
+
+    #[test]
+    fn test_split_template() {
+        assert_eq!(
+            split_template("Correct the spelling:\n{text}\n\nCorrected version:"),
+            ("Correct the spelling:", "{text}\n\nCorrected version:")
+        );
+        assert_eq!(split_template("{text}"), ("", "{text}"));
+        assert_eq!(split_template("no placeholder"), ("", "no placeholder"));
+    }
+
+    #[test]
+    fn test_stop_sequences_from_template() {
+        let stops = stop_sequences("Correct the spelling:\n{text}\n\nCorrected version:");
+        assert_eq!(stops, vec!["Correct the spelling:"]);
+        assert!(stop_sequences("{text}").is_empty());
+    }
+}
@@ -0,0 +1,334 @@
+use once_cell::sync::Lazy;
+use reqwest::Client;
+use std::fmt;
+use std::sync::{Arc, Mutex, Weak};
+use std::time::{Duration, Instant};
+use tracing::{info, warn};
+
+use super::backend::CorrectionBackend;
+use super::runtime::shared_runtime;
+
+/// How often a usable model is re-checked
+const HEALTHY_INTERVAL: Duration = Duration::from_secs(10);
+
+/// How often a missing model or a down server is re-checked
+const UNHEALTHY_INTERVAL: Duration = Duration::from_secs(2);
+
+/// A health request slower than this counts as the server being down
+const CHECK_TIMEOUT: Duration = Duration::from_secs(1);
+
+/// Monitors whose state is shown in the menu bar, by role
+static PUBLISHED: Lazy<Mutex<Vec<(&'static str, Arc<HealthMonitor>)>>> = Lazy::new(|| Mutex::new(Vec::new()));
+
+/// What the server last said about a model
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub enum ModelStatus {
+    /// Not checked yet; requests are attempted
+    #[default]
+    Unknown,
+    ServerDown,
+    /// The server is up but the model is not installed
+    Missing,
+    /// Installed, but the next request may have to load it
+    Available,
+    /// Installed and held in memory
+    Loaded,
+}
+
+impl ModelStatus {
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            Self::Unknown => "unknown",
+            Self::ServerDown => "server down",
+            Self::Missing => "not installed",
+            Self::Available => "available",
+            Self::Loaded => "loaded",
+        }
+    }
+
+    /// Whether a request to the model can succeed
+    pub fn is_usable(&self) -> bool {
+        matches!(self, Self::Unknown | Self::Available | Self::Loaded)
+    }
+
+    /// Preference when endpoints disagree
+    fn rank(&self) -> u8 {
+        match self {
+            Self::ServerDown => 0,
+            Self::Unknown => 1,
+            Self::Missing => 2,
+            Self::Available => 3,
+            Self::Loaded => 4,
+        }
+    }
+}
+
+/// A model was skipped because the health monitor knows it cannot answer
+#[derive(Debug)]
+pub struct ModelUnavailable {
+    pub model: String,
+    pub status: ModelStatus,
+}
+
+impl fmt::Display for ModelUnavailable {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        match self.status {
+            ModelStatus::Missing => write!(f, "Model {} not installed", self.model),
+            _ => write!(f, "Model server unavailable"),
+        }
+    }
+}
+
+impl std::error::Error for ModelUnavailable {}
+
+struct HealthState {
+    status: ModelStatus,
+    checked_at: Option<Instant>,
+}
+
+/// Periodically asks the server whether a model is installed and loaded.
+///
+/// The hotkey path reads the last result instead of probing, so a missing model
+/// or a down server is known before the press rather than discovered by it.
+pub struct HealthMonitor {
+    client: Client,
+    backend: Arc<dyn CorrectionBackend>,
+    urls: Vec<String>,
+    model_name: String,
+    state: Mutex<HealthState>,
+}
+
+impl HealthMonitor {
+    pub fn new(client: Client, backend: Arc<dyn CorrectionBackend>, urls: Vec<String>, model_name: &str) -> Arc<Self> {
+        Arc::new(Self {
+            client,
+            backend,
+            urls,
+            model_name: model_name.to_string(),
+            state: Mutex::new(HealthState {
+                status: ModelStatus::Unknown,
+                checked_at: None,
+            }),
+        })
+    }
+
+    pub fn status(&self) -> ModelStatus {
+        self.state.lock().unwrap().status
+    }
+
+    /// Check every endpoint now and keep the best answer
+    pub async fn refresh(&self) -> ModelStatus {
+        let mut best = ModelStatus::ServerDown;
+        for url in &self.urls {
+            let status = self.check(url).await;
+            if status.rank() > best.rank() {
+                best = status;
+            }
+        }
+        self.update(best);
+        best
+    }
+
+    async fn check(&self, base_url: &str) -> ModelStatus {
+        let up = self.client
+            .get(format!("{}{}", base_url, self.backend.health_path()))
+            .timeout(CHECK_TIMEOUT)
+            .send()
+            .await
+            .is_ok_and(|response| response.status().is_success());
+        if !up {
+            return ModelStatus::ServerDown;
+        }
+
+        if let Some((path, body)) = self.backend.show_request(&self.model_name) {
+            match self.client.post(format!("{}{}", base_url, path)).json(&body).timeout(CHECK_TIMEOUT).send().await {
+                Ok(response) if response.status().is_success() => {}
+                Ok(_) => return ModelStatus::Missing,
+                Err(_) => return ModelStatus::ServerDown,
+            }
+        }
+
+        if let Some(path) = self.backend.loaded_path() {
+            let loaded = match self.client.get(format!("{}{}", base_url, path)).timeout(CHECK_TIMEOUT).send().await {
+                Ok(response) if response.status().is_success() => response
+                    .bytes()
+                    .await
+                    .is_ok_and(|body| self.backend.is_loaded(&body, &self.model_name)),
+                _ => false,
+            };
+            if loaded {
+                return ModelStatus::Loaded;
+            }
+        }
+        ModelStatus::Available
+    }
+
+    fn update(&self, status: ModelStatus) {
+        let mut state = self.state.lock().unwrap();
+        let previous = state.status;
+        state.status = status;
+        state.checked_at = Some(Instant::now());
+        if status == previous {
+            return;
+        }
+        match status {
+            ModelStatus::ServerDown => {
+                warn!("🩺 {} server is not reachable", self.backend.name());
+                if self.backend.name() == "ollama" {
+                    info!("Make sure Ollama is running with: ollama serve");
+                }
+            }
+            ModelStatus::Missing => {
+                warn!("🩺 Model {} is not installed", self.model_name);
+                if self.backend.name() == "ollama" {
+                    info!("Pull the model with: ollama pull {}", self.model_name);
+                }
+            }
+            _ => info!("🩺 Model {} is {}", self.model_name, status.as_str()),
+        }
+    }
+
+    /// Check now and then keep checking in the background.
+    ///
+    /// `on_first_check` gets the result of the first check. The task only holds
+    /// a weak reference, so it stops once the model is dropped.
+    pub fn spawn(self: &Arc<Self>, on_first_check: impl FnOnce(ModelStatus) + Send + 'static) {
+        let monitor: Weak<Self> = Arc::downgrade(self);
+        shared_runtime().spawn(async move {
+            let mut on_first_check = Some(on_first_check);
+            loop {
+                let Some(strong) = monitor.upgrade() else { return };
+                let status = strong.refresh().await;
+                drop(strong);
+                if let Some(on_first_check) = on_first_check.take() {
+                    on_first_check(status);
+                }
+                let interval = if status.is_usable() { HEALTHY_INTERVAL } else { UNHEALTHY_INTERVAL };
+                tokio::time::sleep(interval).await;
+            }
+        });
+    }
+
+    /// e.g. `phi:2.7b: loaded (checked 3s ago)`
+    pub fn report(&self) -> String {
+        let state = self.state.lock().unwrap();
+        match state.checked_at {
+            Some(checked) => format!(
+                "{}: {} (checked {}s ago)",
+                self.model_name, state.status.as_str(), checked.elapsed().as_secs()
+            ),
+            None => format!("{}: not checked yet", self.model_name),
+        }
+    }
+}
+
+/// Show `monitor` in the status report under `role`, replacing any earlier one
+pub fn publish(role: &'static str, monitor: Arc<HealthMonitor>) {
+    let mut published = PUBLISHED.lock().unwrap();
+    published.retain(|(existing, _)| *existing != role);
+    published.push((role, monitor));
+}
+
+/// Drop `role` from the status report, e.g. when its model is switched off
+pub fn unpublish(role: &str) {
+    PUBLISHED.lock().unwrap().retain(|(existing, _)| *existing != role);
+}
+
+/// One line per published model, for the menu bar
+pub fn status_report() -> String {
+    let published = PUBLISHED.lock().unwrap();
+    if published.is_empty() {
+        return "No model configured".to_string();
+    }
+    published
+        .iter()
+        .map(|(role, monitor)| format!("{} model {}", role, monitor.report()))
+        .collect::<Vec<_>>()
+        .join("\n")
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use super::super::backend::{LlamaCppBackend, OllamaBackend};
+    use super::super::runtime::build_http_client;
+    use super::super::test_server::{MockResponse, MockServer};
+    use std::sync::atomic::{AtomicBool, Ordering};
+
+    fn ollama_server(installed: Arc<AtomicBool>, loaded: Arc<AtomicBool>) -> MockServer {
+        MockServer::start(move |request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            "/api/show" if installed.load(Ordering::SeqCst) => MockResponse::json(serde_json::json!({ "details": {} })),
+            "/api/show" => MockResponse::status(404),
+            "/api/ps" if loaded.load(Ordering::SeqCst) => {
+                MockResponse::json(serde_json::json!({ "models": [{ "name": "phi:2.7b", "model": "phi:2.7b" }] }))
+            }
+            "/api/ps" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => MockResponse::status(404),
+        })
+    }
+
+    #[test]
+    fn test_tracks_installed_and_loaded() {
+        let installed = Arc::new(AtomicBool::new(false));
+        let loaded = Arc::new(AtomicBool::new(false));
+        let server = ollama_server(Arc::clone(&installed), Arc::clone(&loaded));
+        let monitor = HealthMonitor::new(
+            build_http_client().unwrap(), Arc::new(OllamaBackend), vec![server.url()], "phi:2.7b",
+        );
+        assert_eq!(monitor.status(), ModelStatus::Unknown);
+        assert!(monitor.status().is_usable());
+
+        let refresh = || shared_runtime().block_on(monitor.refresh());
+        assert_eq!(refresh(), ModelStatus::Missing);
+        assert!(!monitor.status().is_usable());
+
+        installed.store(true, Ordering::SeqCst);
+        assert_eq!(refresh(), ModelStatus::Available);
+        loaded.store(true, Ordering::SeqCst);
+        assert_eq!(refresh(), ModelStatus::Loaded);
+        assert!(monitor.report().starts_with("phi:2.7b: loaded"));
+
+        let show = server.requests().into_iter().find(|r| r.path == "/api/show").unwrap();
+        assert_eq!(show.json()["model"], "phi:2.7b");
+    }
+
+    #[test]
+    fn test_best_endpoint_wins_and_down_server() {
+        let installed = Arc::new(AtomicBool::new(true));
+        let server = ollama_server(installed, Arc::new(AtomicBool::new(false)));
+        let monitor = HealthMonitor::new(
+            build_http_client().unwrap(),
+            Arc::new(OllamaBackend),
+            vec!["http://127.0.0.1:9".to_string(), server.url()],
+            "phi:2.7b",
+        );
+        assert_eq!(shared_runtime().block_on(monitor.refresh()), ModelStatus::Available);
+
+        let down = HealthMonitor::new(
+            build_http_client().unwrap(), Arc::new(LlamaCppBackend), vec!["http://127.0.0.1:9".to_string()], "any",
+        );
+        assert_eq!(shared_runtime().block_on(down.refresh()), ModelStatus::ServerDown);
+        let error = ModelUnavailable { model: "any".to_string(), status: down.status() };
+        assert_eq!(error.to_string(), "Model server unavailable");
+    }
+
+    #[test]
+    fn test_background_checks_and_report() {
+        let server = ollama_server(Arc::new(AtomicBool::new(true)), Arc::new(AtomicBool::new(true)));
+        let monitor = HealthMonitor::new(
+            build_http_client().unwrap(), Arc::new(OllamaBackend), vec![server.url()], "phi:2.7b",
+        );
+        monitor.spawn(|_| {});
+        let deadline = Instant::now() + Duration::from_secs(2);
+        while monitor.status() != ModelStatus::Loaded && Instant::now() < deadline {
+            std::thread::sleep(Duration::from_millis(5));
+        }
+        assert_eq!(monitor.status(), ModelStatus::Loaded);
+
+        publish("test", Arc::clone(&monitor));
+        assert!(status_report().contains("test model phi:2.7b: loaded"));
+        unpublish("test");
+        assert!(!status_report().contains("test model"));
+    }
+}
@@ -0,0 +1,240 @@
+use std::collections::VecDeque;
+use std::future::Future;
+use std::time::Duration;
+use tracing::{debug, warn};
+
+/// Hedge once the primary is slower than this share of its recent requests
+const HEDGE_PERCENTILE: f64 = 0.9;
+
+/// Latency samples kept for the percentile
+const LATENCY_WINDOW: usize = 64;
+
+/// Below this many samples the percentile is too noisy to trust
+const HEDGE_MIN_SAMPLES: usize = 8;
+
+/// Hedge delay used until enough samples have been seen
+const INITIAL_HEDGE_DELAY: Duration = Duration::from_millis(400);
+
+/// Never hedge sooner than this, so fast primaries are not doubled up
+const MIN_HEDGE_DELAY: Duration = Duration::from_millis(50);
+
+/// Recent primary latencies, used to choose when to hedge
+#[derive(Default)]
+pub struct LatencyWindow {
+    samples: VecDeque<Duration>,
+}
+
+impl LatencyWindow {
+    pub fn record(&mut self, sample: Duration) {
+        if self.samples.len() == LATENCY_WINDOW {
+            self.samples.pop_front();
+        }
+        self.samples.push_back(sample);
+    }
+
+    /// Nearest-rank percentile of the window, `p` in 0..=1
+    pub fn percentile(&self, p: f64) -> Option<Duration> {
+        if self.samples.is_empty() {
+            return None;
+        }
+        let mut sorted: Vec<Duration> = self.samples.iter().copied().collect();
+        sorted.sort();
+        let rank = ((p * sorted.len() as f64).ceil() as usize).clamp(1, sorted.len());
+        Some(sorted[rank - 1])
+    }
+
+    /// How long to wait for the primary before sending the hedge
+    pub fn hedge_delay(&self) -> Duration {
+        if self.samples.len() < HEDGE_MIN_SAMPLES {
+            return INITIAL_HEDGE_DELAY;
+        }
+        self.percentile(HEDGE_PERCENTILE).unwrap_or(INITIAL_HEDGE_DELAY).max(MIN_HEDGE_DELAY)
+    }
+}
+
+/// How a hedged request was settled
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum HedgeOutcome {
+    /// The primary answered before the hedge delay
+    NotHedged,
+    PrimaryWon,
+    StandbyWon,
+    BothFailed,
+}
+
+/// Hedge counters for one model
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub struct HedgeStats {
+    pub requests: u64,
+    pub hedged: u64,
+    pub primary_wins: u64,
+    pub standby_wins: u64,
+    pub failures: u64,
+}
+
+impl HedgeStats {
+    pub fn record(&mut self, outcome: HedgeOutcome) {
+        self.requests += 1;
+        match outcome {
+            HedgeOutcome::NotHedged => {}
+            HedgeOutcome::PrimaryWon => {
+                self.hedged += 1;
+                self.primary_wins += 1;
+            }
+            HedgeOutcome::StandbyWon => {
+                self.hedged += 1;
+                self.standby_wins += 1;
+            }
+            HedgeOutcome::BothFailed => {
+                self.hedged += 1;
+                self.failures += 1;
+            }
+        }
+    }
+
+    /// Fraction of requests that sent a hedge
+    pub fn hedge_rate(&self) -> f64 {
+        if self.requests == 0 {
+            0.0
+        } else {
+            self.hedged as f64 / self.requests as f64
+        }
+    }
+}
+
+/// Run `primary`, and if it has not finished after `delay`, race it against `standby`.
+///
+/// The first successful answer wins and the other future is dropped, which
+/// closes its connection. If one side fails the other is still awaited.
+pub async fn race<P, S>(
+    primary: P,
+    standby: impl FnOnce() -> S,
+    delay: Duration,
+) -> (Result<String, Box<dyn std::error::Error>>, HedgeOutcome)
+where
+    P: Future<Output = Result<String, Box<dyn std::error::Error>>>,
+    S: Future<Output = Result<String, Box<dyn std::error::Error>>>,
+{
+    tokio::pin!(primary);
+    tokio::select! {
+        result = &mut primary => return (result, HedgeOutcome::NotHedged),
+        _ = tokio::time::sleep(delay) => {}
+    }
+
+    debug!("Primary slower than {:?}, sending hedge", delay);
+    let standby = standby();
+    tokio::pin!(standby);
+    let mut primary_error = None;
+    let mut standby_failed = false;
+
+    loop {
+        tokio::select! {
+            result = &mut primary, if primary_error.is_none() => match result {
+                Ok(text) => return (Ok(text), HedgeOutcome::PrimaryWon),
+                Err(e) => primary_error = Some(e),
+            },
+            result = &mut standby, if !standby_failed => match result {
+                Ok(text) => return (Ok(text), HedgeOutcome::StandbyWon),
+                Err(e) => {
+                    warn!("Hedge request failed: {}", e);
+                    standby_failed = true;
+                }
+            },
+        }
+        if standby_failed {
+            if let Some(e) = primary_error {
+                return (Err(e), HedgeOutcome::BothFailed);
+            }
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use super::super::runtime::shared_runtime;
+    use std::sync::atomic::{AtomicBool, Ordering};
+    use std::sync::Arc;
+
+    async fn answer(text: &'static str, after: Duration) -> Result<String, Box<dyn std::error::Error>> {
+        tokio::time::sleep(after).await;
+        Ok(text.to_string())
+    }
+
+    async fn fail(after: Duration) -> Result<String, Box<dyn std::error::Error>> {
+        tokio::time::sleep(after).await;
+        Err("model error".into())
+    }
+
+    #[test]
+    fn test_percentile_and_delay() {
+        let mut window = LatencyWindow::default();
+        assert_eq!(window.percentile(0.9), None);
+        assert_eq!(window.hedge_delay(), INITIAL_HEDGE_DELAY);
+
+        for ms in 1..=10 {
+            window.record(Duration::from_millis(ms * 100));
+        }
+        assert_eq!(window.percentile(0.5), Some(Duration::from_millis(500)));
+        assert_eq!(window.hedge_delay(), Duration::from_millis(900));
+
+        // The delay follows the latest samples
+        for _ in 0..LATENCY_WINDOW {
+            window.record(Duration::from_millis(10));
+        }
+        assert_eq!(window.hedge_delay(), MIN_HEDGE_DELAY);
+    }
+
+    #[test]
+    fn test_fast_primary_is_not_hedged() {
+        let standby_started = Arc::new(AtomicBool::new(false));
+        let flag = Arc::clone(&standby_started);
+        let (result, outcome) = shared_runtime().block_on(race(
+            answer("primary", Duration::from_millis(5)),
+            move || {
+                flag.store(true, Ordering::SeqCst);
+                answer("standby", Duration::ZERO)
+            },
+            Duration::from_millis(200),
+        ));
+        assert_eq!(result.unwrap(), "primary");
+        assert_eq!(outcome, HedgeOutcome::NotHedged);
+        assert!(!standby_started.load(Ordering::SeqCst));
+    }
+
+    #[test]
+    fn test_standby_wins_when_primary_is_slow() {
+        let (result, outcome) = shared_runtime().block_on(race(
+            answer("primary", Duration::from_secs(5)),
+            || answer("standby", Duration::from_millis(5)),
+            Duration::from_millis(20),
+        ));
+        assert_eq!(result.unwrap(), "standby");
+        assert_eq!(outcome, HedgeOutcome::StandbyWon);
+    }
+
+    #[test]
+    fn test_failed_side_waits_for_the_other() {
+        let (result, outcome) = shared_runtime().block_on(race(
+            answer("primary", Duration::from_millis(60)),
+            || fail(Duration::ZERO),
+            Duration::from_millis(10),
+        ));
+        assert_eq!(result.unwrap(), "primary");
+        assert_eq!(outcome, HedgeOutcome::PrimaryWon);
+
+        let (result, outcome) = shared_runtime().block_on(race(
+            fail(Duration::from_millis(30)),
+            || fail(Duration::ZERO),
+            Duration::from_millis(10),
+        ));
+        assert!(result.is_err());
+        assert_eq!(outcome, HedgeOutcome::BothFailed);
+
+        let mut stats = HedgeStats::default();
+        stats.record(HedgeOutcome::NotHedged);
+        stats.record(HedgeOutcome::StandbyWon);
+        assert_eq!(stats.hedge_rate(), 0.5);
+        assert_eq!(stats.standby_wins, 1);
+    }
+}
@@ -0,0 +1,375 @@
+use once_cell::sync::{Lazy, OnceCell};
+use std::fs;
+use std::io;
+use std::path::Path;
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::RwLock;
+use tracing::{debug, info, warn};
+
+use super::cache::fingerprint;
+use super::compiled_lexicon::{compile, open_or_compile, MappedLexicon};
+use super::symspell::{is_known_word, parse_frequency_list, tokenize, FREQUENCY_LIST, MAX_EDIT_DISTANCE};
+
+/// Room for user dictionary words on top of the built-in list
+const USER_WORD_CAPACITY: usize = 4096;
+
+/// Target false-positive rate of the Bloom filter
+const FALSE_POSITIVE_RATE: f64 = 0.01;
+
+/// Known words: the built-in list plus the user's dictionary
+pub static LEXICON: Lazy<Lexicon> = Lazy::new(|| Lexicon::with_builtin(USER_WORD_CAPACITY));
+
+/// The built-in list compiled in memory, only used when no compiled lexicon is mapped
+static BUILTIN_COMPILED: Lazy<MappedLexicon> = Lazy::new(|| {
+    let start = std::time::Instant::now();
+    let bytes = compile(builtin_words(), MAX_EDIT_DISTANCE, fingerprint(FREQUENCY_LIST));
+    let lexicon = MappedLexicon::from_bytes(bytes).expect("freshly compiled lexicon is valid");
+    warn!("📚 No compiled lexicon mapped, built {} bytes in memory in {:?}", lexicon.mapped_bytes(), start.elapsed());
+    lexicon
+});
+
+fn builtin_words() -> impl Iterator<Item = (&'static str, u64)> {
+    parse_frequency_list(FREQUENCY_LIST)
+}
+
+/// Map the compiled built-in lexicon, compiling it on first run.
+///
+/// Once the file exists, startup reads no word list: built-in word lookups and
+/// the dictionary corrector's close-match search both read the mapping.
+pub fn init_compiled_lexicon(path: &Path) -> io::Result<()> {
+    let start = std::time::Instant::now();
+    let mapped = open_or_compile(path, builtin_words(), MAX_EDIT_DISTANCE, FREQUENCY_LIST)?;
+    info!("📚 Mapped {} lexicon words from {:?} in {:?}", mapped.len(), path, start.elapsed());
+    // A second call keeps the existing mapping
+    let _ = LEXICON.compiled.set(mapped);
+    Ok(())
+}
+
+/// The compiled built-in lexicon: the mapped file, or a copy compiled in
+/// memory if `init_compiled_lexicon` has not mapped one
+pub fn builtin_lexicon() -> &'static MappedLexicon {
+    LEXICON.compiled.get().unwrap_or_else(|| &BUILTIN_COMPILED)
+}
+
+/// How eagerly the gate declares text clean and skips the model
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub enum GateStrictness {
+    /// Always ask the model
+    Off,
+    /// Skip the model when every word is known; misses grammar errors made
+    /// of real words, such as "their going too the store"
+    #[default]
+    Lenient,
+    /// Only skip the model for a single known word, for grammar-sensitive users:
+    /// known words say nothing about grammar once there are two of them
+    Strict,
+}
+
+impl GateStrictness {
+    pub fn parse(value: &str) -> Option<Self> {
+        match value.trim().to_lowercase().as_str() {
+            "off" => Some(Self::Off),
+            "lenient" => Some(Self::Lenient),
+            "strict" => Some(Self::Strict),
+            _ => None,
+        }
+    }
+
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            Self::Off => "off",
+            Self::Lenient => "lenient",
+            Self::Strict => "strict",
+        }
+    }
+}
+
+/// Fixed-size Bloom filter over lowercase words
+pub struct BloomFilter {
+    bits: Vec<u64>,
+    num_bits: u64,
+    num_hashes: u32,
+}
+
+impl BloomFilter {
+    /// Size the filter for `capacity` items at the given false-positive rate
+    pub fn with_capacity(capacity: usize, false_positive_rate: f64) -> Self {
+        let capacity = capacity.max(1) as f64;
+        let ln2 = std::f64::consts::LN_2;
+        let num_bits = (-(capacity * false_positive_rate.ln()) / (ln2 * ln2)).ceil().max(64.0) as u64;
+        let num_hashes = ((num_bits as f64 / capacity) * ln2).round().clamp(1.0, 16.0) as u32;
+        Self {
+            bits: vec![0; num_bits.div_ceil(64) as usize],
+            num_bits,
+            num_hashes,
+        }
+    }
+
+    pub fn insert(&mut self, item: &str) {
+        let positions: Vec<u64> = self.bit_positions(item).collect();
+        for bit in positions {
+            self.bits[(bit / 64) as usize] |= 1 << (bit % 64);
+        }
+    }
+
+    /// False means definitely absent; true means present with high probability
+    pub fn contains(&self, item: &str) -> bool {
+        self.bit_positions(item)
+            .all(|bit| self.bits[(bit / 64) as usize] & (1 << (bit % 64)) != 0)
+    }
+
+    /// Memory used by the bit array
+    pub fn size_bytes(&self) -> usize {
+        self.bits.len() * 8
+    }
+
+    /// Double hashing: position_i = h1 + i * h2
+    fn bit_positions(&self, item: &str) -> impl Iterator<Item = u64> + '_ {
+        let h1 = fingerprint(item);
+        let h2 = splitmix64(h1) | 1;
+        (0..self.num_hashes as u64).map(move |i| h1.wrapping_add(i.wrapping_mul(h2)) % self.num_bits)
+    }
+}
+
+fn splitmix64(mut x: u64) -> u64 {
+    x = x.wrapping_add(0x9e37_79b9_7f4a_7c15);
+    x = (x ^ (x >> 30)).wrapping_mul(0xbf58_476d_1ce4_e5b9);
+    x = (x ^ (x >> 27)).wrapping_mul(0x94d0_49bb_1331_11eb);
+    x ^ (x >> 31)
+}
+
+/// Counters for the clean-text gate
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub struct GateStats {
+    pub checked: u64,
+    pub short_circuits: u64,
+}
+
+impl GateStats {
+    /// Fraction of checked texts that skipped the model
+    pub fn short_circuit_rate(&self) -> f64 {
+        if self.checked == 0 {
+            0.0
+        } else {
+            self.short_circuits as f64 / self.checked as f64
+        }
+    }
+}
+
+/// Compact set of known words used to decide that text needs no correction
+pub struct Lexicon {
+    filter: RwLock<BloomFilter>,
+    builtin: bool,
+    compiled: OnceCell<MappedLexicon>,
+    checked: AtomicU64,
+    short_circuits: AtomicU64,
+}
+
+impl Lexicon {
+    pub fn new(words: &[&str], extra_capacity: usize) -> Self {
+        let mut filter = BloomFilter::with_capacity(words.len() + extra_capacity, FALSE_POSITIVE_RATE);
+        for word in words {
+            filter.insert(&word.to_lowercase());
+        }
+        Self {
+            filter: RwLock::new(filter),
+            builtin: false,
+            compiled: OnceCell::new(),
+            checked: AtomicU64::new(0),
+            short_circuits: AtomicU64::new(0),
+        }
+    }
+
+    /// Lexicon backed by the built-in word list, with room for `user_capacity` extra words
+    pub fn with_builtin(user_capacity: usize) -> Self {
+        Self {
+            builtin: true,
+            ..Self::new(&[], user_capacity)
+        }
+    }
+
+    /// Add words from a user dictionary file, one word per line
+    pub fn load_user_dictionary(&self, path: &Path) -> usize {
+        let contents = match fs::read_to_string(path) {
+            Ok(contents) => contents,
+            Err(e) => {
+                if e.kind() != std::io::ErrorKind::NotFound {
+                    warn!("Could not read user dictionary {:?}: {}", path, e);
+                }
+                return 0;
+            }
+        };
+
+        let mut filter = self.filter.write().unwrap();
+        let mut added = 0;
+        for word in contents.lines().map(str::trim).filter(|w| !w.is_empty() && !w.starts_with('#')) {
+            filter.insert(&word.to_lowercase().replace('’', "'"));
+            added += 1;
+        }
+        info!("📚 Loaded {} words from user dictionary {:?}", added, path);
+        added
+    }
+
+    /// Whether the word or a regular inflection of it is known
+    pub fn is_known(&self, word: &str) -> bool {
+        let filter = self.filter.read().unwrap();
+        is_known_word(word, |w| filter.contains(w) || self.builtin_contains(w))
+    }
+
+    fn builtin_contains(&self, word: &str) -> bool {
+        if !self.builtin {
+            return false;
+        }
+        match self.compiled.get() {
+            Some(mapped) => mapped.contains(word),
+            None => BUILTIN_COMPILED.contains(word),
+        }
+    }
+
+    /// Decide whether `text` can be declared clean without asking the model
+    pub fn is_clean(&self, text: &str, strictness: GateStrictness) -> bool {
+        if strictness == GateStrictness::Off {
+            return false;
+        }
+        self.checked.fetch_add(1, Ordering::Relaxed);
+
+        let words: Vec<&str> = tokenize(text)
+            .into_iter()
+            .filter(|(is_word, _)| *is_word)
+            .map(|(_, word)| word)
+            .collect();
+        if words.is_empty() || !words.iter().all(|word| self.is_known(word)) {
+            return false;
+        }
+        if strictness == GateStrictness::Strict && words.len() > 1 {
+            return false;
+        }
+
+        self.short_circuits.fetch_add(1, Ordering::Relaxed);
+        let stats = self.stats();
+        debug!(
+            "Lexicon gate skipped the model ({}/{} = {:.0}%)",
+            stats.short_circuits,
+            stats.checked,
+            stats.short_circuit_rate() * 100.0
+        );
+        true
+    }
+
+    pub fn stats(&self) -> GateStats {
+        GateStats {
+            checked: self.checked.load(Ordering::Relaxed),
+            short_circuits: self.short_circuits.load(Ordering::Relaxed),
+        }
+    }
+
+    /// Heap used by the filter and an in-memory built-in lexicon; a mapped
+    /// lexicon is file-backed and not counted
+    #[allow(dead_code)]
+    pub fn size_bytes(&self) -> usize {
+        let builtin = match Lazy::get(&BUILTIN_COMPILED) {
+            Some(compiled) if self.builtin && self.compiled.get().is_none() => compiled.mapped_bytes(),
+            _ => 0,
+        };
+        self.filter.read().unwrap().size_bytes() + builtin
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use tempfile::TempDir;
+
+    fn lexicon() -> Lexicon {
+        Lexicon::new(&["the", "cat", "sat", "on", "mat", "i", "think", "so"], 16)
+    }
+
+    #[test]
+    fn test_bloom_filter_has_no_false_negatives() {
+        let mut filter = BloomFilter::with_capacity(1000, 0.01);
+        let words: Vec<String> = (0..1000).map(|i| format!("word{}", i)).collect();
+        for word in &words {
+            filter.insert(word);
+        }
+        assert!(words.iter().all(|word| filter.contains(word)));
+
+        let false_positives = (0..10_000).filter(|i| filter.contains(&format!("other{}", i))).count();
+        assert!(false_positives < 300, "{} false positives", false_positives);
+    }
+
+    #[test]
+    fn test_strictness_levels() {
+        let lexicon = lexicon();
+        assert!(lexicon.is_clean("the cat sat on the mat", GateStrictness::Lenient));
+        assert!(!lexicon.is_clean("The cat sat on the mat.", GateStrictness::Strict));
+        assert!(lexicon.is_clean("Cat.", GateStrictness::Strict));
+        assert!(!lexicon.is_clean("The cat sat on the mat.", GateStrictness::Off));
+
+        // Real words in the wrong place: only the strict gate leaves these to the model
+        let grammar = "The cat sat on the the mat.";
+        assert!(lexicon.is_clean(grammar, GateStrictness::Lenient));
+        assert!(!lexicon.is_clean(grammar, GateStrictness::Strict));
+    }
+
+    #[test]
+    fn test_unknown_words_go_to_the_model() {
+        let lexicon = lexicon();
+        assert!(!lexicon.is_clean("teh cat sat", GateStrictness::Lenient));
+        assert!(lexicon.is_clean("the cats sat", GateStrictness::Lenient));
+        assert!(!lexicon.is_clean("  ", GateStrictness::Lenient));
+
+        let stats = lexicon.stats();
+        assert_eq!(stats.checked, 3);
+        assert_eq!(stats.short_circuits, 1);
+    }
+
+    #[test]
+    fn test_user_dictionary() {
+        let temp_dir = TempDir::new().unwrap();
+        let path = temp_dir.path().join("dictionary.txt");
+        fs::write(&path, "# my words\nTypoFixer\nollama\n").unwrap();
+
+        let lexicon = lexicon();
+        assert!(!lexicon.is_clean("the ollama cat", GateStrictness::Lenient));
+        assert_eq!(lexicon.load_user_dictionary(&path), 2);
+        assert!(lexicon.is_clean("the ollama cat", GateStrictness::Lenient));
+        assert!(lexicon.is_known("TypoFixer"));
+        assert_eq!(lexicon.load_user_dictionary(&temp_dir.path().join("missing.txt")), 0);
+    }
+
+    #[test]
+    fn test_parse_strictness() {
+        assert_eq!(GateStrictness::parse("Strict"), Some(GateStrictness::Strict));
+        assert_eq!(GateStrictness::parse("off"), Some(GateStrictness::Off));
+        assert_eq!(GateStrictness::parse("bogus"), None);
+        assert_eq!(GateStrictness::Lenient.as_str(), "lenient");
+    }
+
+    #[test]
+    fn test_builtin_lexicon() {
+        assert!(LEXICON.is_known("message"));
+        assert!(LEXICON.is_known("don't"));
+        assert!(LEXICON.is_known("widow"));
+        assert!(LEXICON.is_known("analyze") && LEXICON.is_known("analyse"));
+        assert!(!LEXICON.is_known("mesage"));
+    }
+
+    #[test]
+    fn test_compiled_lexicon_backs_builtin_words() {
+        let temp_dir = TempDir::new().unwrap();
+        let lexicon = Lexicon::with_builtin(16);
+        let mapped = open_or_compile(&temp_dir.path().join("lexicon.bin"), builtin_words(), MAX_EDIT_DISTANCE, FREQUENCY_LIST).unwrap();
+        assert!(lexicon.compiled.set(mapped).is_ok());
+        // The built-in words live in the file, not on the heap
+        assert!(lexicon.size_bytes() < 16 * 1024);
+
+        assert!(lexicon.is_known("message"));
+        assert!(lexicon.is_known("messages"));
+        assert!(lexicon.is_known("don’t"));
+        assert!(!lexicon.is_known("mesage"));
+        // User words still go through the filter
+        assert!(!lexicon.is_known("ollama"));
+        lexicon.filter.write().unwrap().insert("ollama");
+        assert!(lexicon.is_known("ollama"));
+    }
+}
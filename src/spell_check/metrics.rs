@@ -0,0 +1,223 @@
+use once_cell::sync::Lazy;
+use std::collections::HashMap;
+use std::sync::Mutex;
+use std::time::Duration;
+
+use super::backend::ServerTimings;
+
+/// Per-model request timings across all hotkey presses
+pub static TIMING_METRICS: Lazy<TimingMetrics> = Lazy::new(TimingMetrics::default);
+
+/// Bucket upper bounds for durations, in milliseconds
+pub const LATENCY_BUCKETS_MS: [f64; 14] = [
+    1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0, 2000.0, 5000.0, 10000.0, 30000.0,
+];
+
+/// Bucket upper bounds for token throughput, in tokens per second
+const RATE_BUCKETS: [f64; 12] = [
+    1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0, 2000.0, 5000.0,
+];
+
+/// Fixed-bucket histogram; values above the last bound go to an overflow bucket
+#[derive(Clone, Debug, PartialEq)]
+pub struct Histogram {
+    bounds: &'static [f64],
+    counts: Vec<u64>,
+    sum: f64,
+}
+
+impl Histogram {
+    pub fn new(bounds: &'static [f64]) -> Self {
+        Self {
+            bounds,
+            counts: vec![0; bounds.len() + 1],
+            sum: 0.0,
+        }
+    }
+
+    pub fn record(&mut self, value: f64) {
+        let bucket = self.bounds.iter().position(|&bound| value <= bound).unwrap_or(self.bounds.len());
+        self.counts[bucket] += 1;
+        self.sum += value;
+    }
+
+    pub fn count(&self) -> u64 {
+        self.counts.iter().sum()
+    }
+
+    pub fn mean(&self) -> Option<f64> {
+        let count = self.count();
+        (count > 0).then(|| self.sum / count as f64)
+    }
+
+    /// Upper bound of the bucket holding the `p` quantile, `p` in 0..=1
+    pub fn percentile(&self, p: f64) -> Option<f64> {
+        let count = self.count();
+        if count == 0 {
+            return None;
+        }
+        let rank = ((p * count as f64).ceil() as u64).clamp(1, count);
+        let mut seen = 0;
+        for (bucket, &bucket_count) in self.counts.iter().enumerate() {
+            seen += bucket_count;
+            if seen >= rank {
+                return Some(self.bounds.get(bucket).copied().unwrap_or(f64::INFINITY));
+            }
+        }
+        None
+    }
+}
+
+/// Where one model's request time goes
+#[derive(Clone, Debug, PartialEq)]
+pub struct ModelTimings {
+    /// Wall time of the whole request as we saw it
+    pub wall: Histogram,
+    pub load: Histogram,
+    pub prompt_eval: Histogram,
+    pub eval: Histogram,
+    /// Wall time the server does not account for: our code, HTTP and queuing
+    pub overhead: Histogram,
+    pub prompt_rate: Histogram,
+    pub generation_rate: Histogram,
+}
+
+impl Default for ModelTimings {
+    fn default() -> Self {
+        Self {
+            wall: Histogram::new(&LATENCY_BUCKETS_MS),
+            load: Histogram::new(&LATENCY_BUCKETS_MS),
+            prompt_eval: Histogram::new(&LATENCY_BUCKETS_MS),
+            eval: Histogram::new(&LATENCY_BUCKETS_MS),
+            overhead: Histogram::new(&LATENCY_BUCKETS_MS),
+            prompt_rate: Histogram::new(&RATE_BUCKETS),
+            generation_rate: Histogram::new(&RATE_BUCKETS),
+        }
+    }
+}
+
+impl ModelTimings {
+    fn record(&mut self, wall: Duration, timings: &ServerTimings) {
+        self.wall.record(millis(wall));
+        if let Some(load) = timings.load {
+            self.load.record(millis(load));
+        }
+        if let Some(prompt_eval) = timings.prompt_eval {
+            self.prompt_eval.record(millis(prompt_eval));
+        }
+        if let Some(eval) = timings.eval {
+            self.eval.record(millis(eval));
+        }
+        if let Some(total) = timings.total {
+            self.overhead.record(millis(wall.saturating_sub(total)));
+        }
+        if let Some(rate) = timings.prompt_tokens_per_sec() {
+            self.prompt_rate.record(rate);
+        }
+        if let Some(rate) = timings.generation_tokens_per_sec() {
+            self.generation_rate.record(rate);
+        }
+    }
+
+    /// e.g. `n=12 p50: wall 500ms, load 5ms, prompt 100ms, gen 200ms, overhead 20ms; 400 prompt tok/s, 40 gen tok/s`
+    pub fn summary(&self) -> String {
+        let p50 = |histogram: &Histogram| match histogram.percentile(0.5) {
+            Some(value) => format!("{}ms", value),
+            None => "-".to_string(),
+        };
+        let rate = |histogram: &Histogram| histogram.mean().map_or("-".to_string(), |mean| format!("{:.0}", mean));
+        format!(
+            "n={} p50: wall {}, load {}, prompt {}, gen {}, overhead {}; {} prompt tok/s, {} gen tok/s",
+            self.wall.count(),
+            p50(&self.wall),
+            p50(&self.load),
+            p50(&self.prompt_eval),
+            p50(&self.eval),
+            p50(&self.overhead),
+            rate(&self.prompt_rate),
+            rate(&self.generation_rate),
+        )
+    }
+}
+
+fn millis(duration: Duration) -> f64 {
+    duration.as_secs_f64() * 1000.0
+}
+
+/// Timing histograms keyed by model name
+#[derive(Default)]
+pub struct TimingMetrics {
+    models: Mutex<HashMap<String, ModelTimings>>,
+}
+
+impl TimingMetrics {
+    /// Record a request to `model` that took `wall` end to end
+    pub fn record(&self, model: &str, wall: Duration, timings: &ServerTimings) {
+        self.models
+            .lock()
+            .unwrap()
+            .entry(model.to_string())
+            .or_default()
+            .record(wall, timings);
+    }
+
+    #[allow(dead_code)]
+    pub fn model(&self, model: &str) -> Option<ModelTimings> {
+        self.models.lock().unwrap().get(model).cloned()
+    }
+
+    /// One line per model
+    pub fn summary(&self) -> String {
+        let models = self.models.lock().unwrap();
+        let mut names: Vec<&String> = models.keys().collect();
+        names.sort();
+        names
+            .into_iter()
+            .map(|name| format!("{}: {}", name, models[name].summary()))
+            .collect::<Vec<_>>()
+            .join("\n")
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_histogram() {
+        let mut histogram = Histogram::new(&LATENCY_BUCKETS_MS);
+        assert_eq!(histogram.percentile(0.5), None);
+        for value in [3.0, 4.0, 40.0, 400.0, 60000.0] {
+            histogram.record(value);
+        }
+        assert_eq!(histogram.count(), 5);
+        assert_eq!(histogram.percentile(0.4), Some(5.0));
+        assert_eq!(histogram.percentile(0.6), Some(50.0));
+        assert_eq!(histogram.percentile(1.0), Some(f64::INFINITY));
+        assert_eq!(histogram.mean(), Some(60447.0 / 5.0));
+    }
+
+    #[test]
+    fn test_breakdown_per_model() {
+        let metrics = TimingMetrics::default();
+        let timings = ServerTimings {
+            total: Some(Duration::from_millis(300)),
+            load: Some(Duration::from_millis(4)),
+            prompt_eval_count: Some(40),
+            prompt_eval: Some(Duration::from_millis(100)),
+            eval_count: Some(8),
+            eval: Some(Duration::from_millis(190)),
+        };
+        metrics.record("small", Duration::from_millis(340), &timings);
+        metrics.record("large", Duration::from_millis(900), &ServerTimings::default());
+
+        let small = metrics.model("small").unwrap();
+        assert_eq!(small.overhead.percentile(0.5), Some(50.0));
+        assert_eq!(small.prompt_rate.mean(), Some(400.0));
+        assert_eq!(metrics.model("large").unwrap().load.count(), 0);
+
+        let summary = metrics.summary();
+        assert!(summary.starts_with("large: n=1"), "{}", summary);
+        assert!(summary.contains("small: n=1 p50: wall 500ms, load 5ms, prompt 100ms, gen 200ms, overhead 50ms; 400 prompt tok/s"));
+    }
+}
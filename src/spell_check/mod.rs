@@ -1,198 +1,776 @@
 use std::path::Path;
+use std::sync::{Arc, Mutex};
+use std::time::{Duration, Instant};
+use once_cell::sync::Lazy;
 use reqwest::Client;
-use serde::{Deserialize, Serialize};
-use tracing::{info, warn};
-
-// Ollama API request/response structures
-#[derive(Debug, Serialize)]
-struct OllamaRequest {
-    model: String,
-    prompt: String,
-    stream: bool,
-    options: OllamaOptions,
-}
+use tracing::{debug, info, warn};
 
-#[derive(Debug, Serialize)]
-struct OllamaOptions {
-    temperature: f32,
-    top_p: f32,
-    max_tokens: i32,
-}
+use crate::cancel::{CancellationToken, Cancelled};
 
-#[derive(Debug, Deserialize)]
-struct OllamaResponse {
-    response: String,
-    #[allow(dead_code)]
-    done: bool,
-}
+pub mod backend;
+pub mod breaker;
+pub mod cache;
+pub mod compiled_lexicon;
+pub mod disk_cache;
+pub mod endpoints;
+pub mod generation;
+pub mod health;
+pub mod hedge;
+pub mod lexicon;
+pub mod metrics;
+pub mod residency;
+pub mod pipeline;
+pub mod runtime;
+pub mod slot;
+pub mod streaming;
+pub mod symspell;
+
+#[cfg(test)]
+pub mod test_server;
 
-// Model wrapper for text correction using Ollama
+use backend::{CorrectionBackend, GenerationOptions, OllamaBackend};
+use breaker::{BreakerStats, CircuitBreaker, CircuitOpen};
+use cache::fingerprint;
+pub use disk_cache::init_disk_cache;
+use endpoints::{EndpointPool, EndpointStats, RoutingPolicy};
+use health::{HealthMonitor, ModelStatus, ModelUnavailable};
+use hedge::{race, HedgeOutcome, HedgeStats, LatencyWindow};
+use metrics::TIMING_METRICS;
+use residency::{Residency, ResidencyStats, DEFAULT_KEEP_ALIVE_SECS};
+use pipeline::{BudgetExceeded, CorrectionPipeline, DictionaryTier, LlmTier, RulesTier};
+use runtime::{build_http_client, shared_runtime};
+use streaming::{JsonFieldParser, NdjsonLines, StreamingCleaner};
+use symspell::DICTIONARY;
+
+/// Where a local Ollama server listens by default
+pub const DEFAULT_OLLAMA_URL: &str = "http://localhost:11434";
+
+// Model wrapper for text correction against a local inference server
 pub struct LlamaModelWrapper {
     client: Client,
+    backend: Arc<dyn CorrectionBackend>,
     model_name: String,
-    base_url: String,
+    endpoints: EndpointPool,
+    /// Fails requests fast while the server is down; may be shared between models
+    breaker: Arc<CircuitBreaker>,
+    health: Arc<HealthMonitor>,
+    residency: Arc<Residency>,
+    /// Seconds the server keeps the model loaded after a request; `None` leaves it to the server
+    keep_alive: Option<i64>,
+    streaming: bool,
+    /// Send the instruction as a fixed system prompt so the server can reuse its evaluation
+    prefix_reuse: bool,
+    /// Ask for `{"corrected": "..."}` under a JSON schema instead of cleaning free text
+    structured: bool,
+    /// Replaces `PROMPT_TEMPLATE` for free-text corrections
+    prompt_template: Option<String>,
+    /// Smaller model raced against this one when it is slow
+    standby_model: Option<String>,
+    /// Updated by every correction; held only briefly, never across a request
+    timing: Mutex<LatencyState>,
+}
+
+/// Latency measurements and hedge counters shared by concurrent corrections
+#[derive(Default)]
+struct LatencyState {
+    /// Moving average of recent generation times and when it was last updated
+    average: Option<(Duration, Instant)>,
+    /// When a request was last sent despite the estimate, to measure the model again
+    last_probe: Option<Instant>,
+    window: LatencyWindow,
+    hedge_stats: HedgeStats,
+}
+
+/// A model's answer and how the hedge race went
+#[derive(Clone, Debug, PartialEq)]
+pub struct Generation {
+    pub text: String,
+    pub outcome: HedgeOutcome,
+}
+
+impl Generation {
+    /// Whether the answer came from the standby model rather than the primary
+    pub fn from_standby(&self) -> bool {
+        self.outcome == HedgeOutcome::StandbyWon
+    }
 }
 
 impl LlamaModelWrapper {
+    #[allow(dead_code)]
     pub fn new(_model_path: &Path) -> Result<Self, Box<dyn std::error::Error>> {
-        info!("Initializing Ollama client for text correction...");
+        // Use phi-2 model on the default Ollama port
+        Self::with_endpoint(DEFAULT_OLLAMA_URL, "phi:2.7b")
+    }
+    
+    /// Create a wrapper for a specific Ollama server and model
+    #[allow(dead_code)]
+    pub fn with_endpoint(base_url: &str, model_name: &str) -> Result<Self, Box<dyn std::error::Error>> {
+        Self::with_backend(Box::new(OllamaBackend), base_url, model_name)
+    }
+    
+    /// Create a wrapper speaking `backend`'s protocol to the server at `base_url`
+    #[allow(dead_code)]
+    pub fn with_backend(
+        backend: Box<dyn CorrectionBackend>,
+        base_url: &str,
+        model_name: &str,
+    ) -> Result<Self, Box<dyn std::error::Error>> {
+        Self::with_endpoints(backend, &[base_url.to_string()], RoutingPolicy::default(), model_name)
+    }
+    
+    /// Create a wrapper that spreads requests over several servers hosting the same model
+    pub fn with_endpoints(
+        backend: Box<dyn CorrectionBackend>,
+        urls: &[String],
+        policy: RoutingPolicy,
+        model_name: &str,
+    ) -> Result<Self, Box<dyn std::error::Error>> {
+        info!("Initializing {} client for text correction...", backend.name());
+        if urls.is_empty() {
+            return Err("No inference endpoints configured".into());
+        }
         
-        let client = Client::new();
-        let model_name = "phi:2.7b".to_string(); // Use phi-2 model
-        let base_url = "http://localhost:11434".to_string();
+        let client = build_http_client()?;
+        let endpoints = EndpointPool::new(urls, policy);
+        let base_urls: Vec<String> = (0..endpoints.len()).map(|index| endpoints.url(index)).collect();
+        let health_urls = base_urls.iter().map(|url| format!("{}{}", url, backend.health_path())).collect();
+        let backend: Arc<dyn CorrectionBackend> = Arc::from(backend);
         
-        let wrapper = Self {
+        // Nothing is sent here; `start_health_monitor` checks the server in the background
+        Ok(Self {
+            breaker: CircuitBreaker::new(client.clone(), health_urls),
+            health: HealthMonitor::new(client.clone(), Arc::clone(&backend), base_urls.clone(), model_name),
+            residency: Residency::new(client.clone(), Arc::clone(&backend), base_urls, model_name),
+            keep_alive: Some(DEFAULT_KEEP_ALIVE_SECS),
             client,
-            model_name,
-            base_url,
+            backend,
+            model_name: model_name.to_string(),
+            endpoints,
+            streaming: true,
+            prefix_reuse: true,
+            structured: false,
+            prompt_template: None,
+            standby_model: None,
+            timing: Mutex::new(LatencyState::default()),
+        })
+    }
+    
+    /// Name of the Ollama model used for corrections
+    pub fn model_name(&self) -> &str {
+        &self.model_name
+    }
+    
+    /// Fingerprint of the prompt template, so cached corrections follow template changes
+    pub fn prompt_fingerprint(&self) -> u64 {
+        fingerprint(self.template())
+    }
+    
+    fn template(&self) -> &str {
+        if self.structured {
+            STRUCTURED_PROMPT_TEMPLATE
+        } else {
+            self.prompt_template.as_deref().unwrap_or(PROMPT_TEMPLATE)
+        }
+    }
+    
+    /// Use `template` for free-text corrections; `None` restores the built-in one
+    pub fn set_prompt_template(&mut self, template: Option<&str>) -> Result<(), Box<dyn std::error::Error>> {
+        if let Some(template) = template {
+            if !template.contains("{text}") {
+                return Err("Prompt template must contain {text}".into());
+            }
+        }
+        self.prompt_template = template.map(str::to_string);
+        Ok(())
+    }
+    
+    /// Choose between JSON output parsed as it streams and free text cleaned heuristically (default)
+    pub fn set_structured_output(&mut self, structured: bool) {
+        self.structured = structured;
+    }
+    
+    /// Choose between streaming with early termination (default) and a single response
+    #[allow(dead_code)]
+    pub fn set_streaming(&mut self, streaming: bool) {
+        self.streaming = streaming;
+    }
+    
+    /// Choose between a fixed system prompt (default) and the whole template in every prompt
+    #[allow(dead_code)]
+    pub fn set_prefix_reuse(&mut self, prefix_reuse: bool) {
+        self.prefix_reuse = prefix_reuse;
+    }
+    
+    /// Hedge slow requests to `model_name` on the same server; `None` disables hedging
+    pub fn set_standby(&mut self, model_name: Option<&str>) {
+        self.standby_model = model_name.map(str::to_string);
+    }
+    
+    /// Hedge win/loss counters
+    #[allow(dead_code)]
+    pub fn hedge_stats(&self) -> HedgeStats {
+        self.timing.lock().unwrap().hedge_stats
+    }
+    
+    /// Recent generation latency, or `None` if there is no fresh measurement
+    pub fn recent_latency(&self) -> Option<Duration> {
+        self.timing.lock().unwrap().recent()
+    }
+    
+    /// Whether to send a request the recent latency says will not fit anyway.
+    ///
+    /// Skipped requests leave the estimate as it was, so once it has gone a
+    /// probe interval without a sample one press measures the model again.
+    pub fn claim_latency_probe(&self) -> bool {
+        let mut timing = self.timing.lock().unwrap();
+        let stale = timing.average.is_some_and(|(_, updated)| updated.elapsed() >= LATENCY_PROBE_INTERVAL);
+        let probe_due = timing.last_probe.is_none_or(|probed| probed.elapsed() >= LATENCY_PROBE_INTERVAL);
+        if stale && probe_due {
+            timing.last_probe = Some(Instant::now());
+        }
+        stale && probe_due
+    }
+    
+    /// Fold a generation time into the estimate. A `censored` sample is only a
+    /// lower bound, from a request cut off before it finished, so it can raise
+    /// the estimate but not lower it.
+    fn record_latency(&self, sample: Duration, censored: bool) {
+        let mut timing = self.timing.lock().unwrap();
+        timing.window.record(sample);
+        // An estimate that went a probe interval without samples is replaced, not averaged
+        let previous = timing.average
+            .filter(|(_, updated)| updated.elapsed() < LATENCY_PROBE_INTERVAL)
+            .map(|(latency, _)| latency);
+        let average = match previous {
+            Some(previous) => {
+                let average = previous.mul_f64(1.0 - LATENCY_EWMA_WEIGHT) + sample.mul_f64(LATENCY_EWMA_WEIGHT);
+                if censored { average.max(previous) } else { average }
+            }
+            None => sample,
         };
-        
-        // Test if Ollama is available
-        match wrapper.test_ollama_connection() {
-            Ok(_) => {
-                info!("✅ Ollama connection successful!");
-                Ok(wrapper)
+        timing.average = Some((average, Instant::now()));
+    }
+    
+    /// Keep checking in the background whether the server has this model installed and loaded.
+    ///
+    /// If the first check finds the server down the breaker opens, so the first
+    /// presses don't wait on connection attempts.
+    pub fn start_health_monitor(&self) {
+        let breaker = Arc::downgrade(&self.breaker);
+        self.health.spawn(move |status| {
+            if status == ModelStatus::ServerDown {
+                if let Some(breaker) = breaker.upgrade() {
+                    breaker.trip();
+                }
             }
-            Err(e) => {
-                warn!("Could not connect to Ollama: {}", e);
-                info!("Make sure Ollama is running with: ollama serve");
-                info!("And pull the model with: ollama pull phi:2.7b");
-                
-                // Return the wrapper anyway for fallback mode
-                Ok(wrapper)
+        });
+    }
+    
+    /// What the health monitor last saw; `Unknown` until its first check
+    pub fn status(&self) -> ModelStatus {
+        self.health.status()
+    }
+    
+    pub fn health(&self) -> Arc<HealthMonitor> {
+        Arc::clone(&self.health)
+    }
+    
+    /// How long the server keeps the model loaded after each request; negative keeps it forever
+    pub fn set_keep_alive(&mut self, keep_alive: Option<i64>) {
+        self.keep_alive = keep_alive;
+    }
+    
+    pub fn keep_alive(&self) -> Option<i64> {
+        self.keep_alive
+    }
+    
+    /// Preloads, pings and cold-load counting, usable without holding the model lock
+    pub fn residency(&self) -> Arc<Residency> {
+        Arc::clone(&self.residency)
+    }
+    
+    #[allow(dead_code)]
+    pub fn residency_stats(&self) -> ResidencyStats {
+        self.residency.stats()
+    }
+    
+    /// Ping the server every `interval` while corrections are being made, so the model stays loaded
+    pub fn start_keep_alive_pings(&self, interval: Duration) {
+        self.residency.spawn_pings(interval, self.keep_alive);
+    }
+    
+    /// Open a pooled connection to every endpoint with a cheap request, so the
+    /// correction that follows does not pay for connecting
+    pub async fn warm_connection(&self) {
+        for index in 0..self.endpoints.len() {
+            let url = format!("{}{}", self.endpoints.url(index), self.backend.health_path());
+            match self.client.get(&url).timeout(WARM_TIMEOUT).send().await {
+                // Reading the body hands the connection back to the pool
+                Ok(response) => drop(response.bytes().await),
+                Err(e) => debug!("Could not warm connection to {}: {}", url, e),
             }
         }
     }
     
-    fn test_ollama_connection(&self) -> Result<(), Box<dyn std::error::Error>> {
-        let rt = tokio::runtime::Runtime::new()?;
-        rt.block_on(async {
-            let response = self.client
-                .get(format!("{}/api/tags", self.base_url))
-                .send()
-                .await?;
-            
-            if response.status().is_success() {
-                info!("Ollama is running and accessible");
-                Ok(())
-            } else {
-                Err(format!("Ollama returned status: {}", response.status()).into())
-            }
-        })
+    /// The breaker guarding this model's server
+    pub fn breaker(&self) -> Arc<CircuitBreaker> {
+        Arc::clone(&self.breaker)
+    }
+    
+    /// Use `breaker` instead of this model's own, e.g. to share one across models on the same server
+    pub fn set_breaker(&mut self, breaker: Arc<CircuitBreaker>) {
+        self.breaker = breaker;
+    }
+    
+    #[allow(dead_code)]
+    pub fn breaker_stats(&self) -> BreakerStats {
+        self.breaker.stats()
+    }
+    
+    /// Per-endpoint routing and health counters
+    #[allow(dead_code)]
+    pub fn endpoint_stats(&self) -> Vec<EndpointStats> {
+        self.endpoints.stats()
+    }
+    
+    #[allow(dead_code)]
+    pub fn generate(&self, prompt: &str) -> Result<String, Box<dyn std::error::Error>> {
+        self.generate_cancellable(prompt, None, None).map(|generation| generation.text)
     }
     
-    pub fn generate(&mut self, prompt: &str) -> Result<String, Box<dyn std::error::Error>> {
+    /// Like `generate`, but give up with `BudgetExceeded` after `timeout` and
+    /// with `Cancelled` as soon as `cancel` fires, dropping the request either way
+    ///
+    /// Takes `&self`, so one model can serve overlapping corrections from any thread.
+    pub fn generate_cancellable(
+        &self,
+        prompt: &str,
+        timeout: Option<Duration>,
+        cancel: Option<&CancellationToken>,
+    ) -> Result<Generation, Box<dyn std::error::Error>> {
         info!("Generating correction for: '{}'", prompt);
+        if let Some(cancel) = cancel {
+            cancel.check()?;
+        }
+        self.residency.touch();
+        self.breaker.allow()?;
         
-        // Create a focused prompt for text correction - optimized for phi-2
-        let correction_prompt = format!(
-            "Correct the spelling and grammar:\n{}\n\nCorrected version:",
-            prompt
-        );
+        let hedge_delay = self.timing.lock().unwrap().window.hedge_delay();
+        let start = Instant::now();
+        let (result, outcome) = shared_runtime().block_on(async {
+            let response = async {
+                match &self.standby_model {
+                    Some(standby) => race(
+                        self.request(&self.model_name, prompt),
+                        || self.request(standby, prompt),
+                        hedge_delay,
+                    ).await,
+                    None => (self.request(&self.model_name, prompt).await, HedgeOutcome::NotHedged),
+                }
+            };
+            let response = async {
+                match timeout {
+                    // Dropping the request on timeout closes the connection and stops generation
+                    Some(timeout) => tokio::time::timeout(timeout, response)
+                        .await
+                        .unwrap_or_else(|_| (Err(BudgetExceeded.into()), HedgeOutcome::NotHedged)),
+                    None => response.await,
+                }
+            };
+            match cancel {
+                Some(cancel) => tokio::select! {
+                    _ = cancel.cancelled() => (Err(Cancelled.into()), HedgeOutcome::NotHedged),
+                    result = response => result,
+                },
+                None => response.await,
+            }
+        });
+        
+        // The primary started first, so the time taken is its own unless the standby
+        // won; a timeout or lost race only says the primary is at least this slow.
+        // Other errors say nothing about latency but count against the server
+        let elapsed = start.elapsed();
+        match &result {
+            Ok(_) => {
+                self.record_latency(elapsed, outcome == HedgeOutcome::StandbyWon);
+                self.breaker.record_success();
+            }
+            Err(e) if e.is::<BudgetExceeded>() => self.record_latency(elapsed, true),
+            // Says nothing about the server
+            Err(e) if e.is::<Cancelled>() => debug!("Request cancelled after {:?}", elapsed),
+            Err(_) => self.breaker.record_failure(),
+        }
+        if self.standby_model.is_some() {
+            let stats = {
+                let mut timing = self.timing.lock().unwrap();
+                timing.hedge_stats.record(outcome);
+                timing.hedge_stats
+            };
+            if outcome != HedgeOutcome::NotHedged {
+                info!(
+                    "Hedge {:?} after {:?} (standby won {}/{} hedges, {:.0}% of requests hedged)",
+                    outcome, hedge_delay, stats.standby_wins, stats.hedged, stats.hedge_rate() * 100.0
+                );
+            }
+        }
+        let corrected = result?;
         
-        let request = OllamaRequest {
-            model: self.model_name.clone(),
-            prompt: correction_prompt,
-            stream: false,
-            options: OllamaOptions {
-                temperature: 0.0,  // Even lower temperature for more focused responses
-                top_p: 0.8,
-                max_tokens: 50,    // Shorter response length
-            },
+        info!("Generated correction: '{}'", corrected);
+        Ok(Generation { text: corrected, outcome })
+    }
+    
+    /// Request body asking `model_name` to correct `prompt`
+    fn correction_request(&self, model_name: &str, prompt: &str) -> serde_json::Value {
+        // The instruction goes first and never changes, so with prefix reuse the
+        // server only evaluates the user's text and the answer cue
+        let (instruction, template) = if self.prefix_reuse {
+            generation::split_template(self.template())
+        } else {
+            ("", self.template())
         };
+        let correction_prompt = template.replace("{text}", prompt);
+        // Let the model write about as much as it was given, and stop at the end of the line.
+        // Structured output ends with the object instead, and its whitespace must not stop it.
+        let (max_tokens, stop, format) = if self.structured {
+            let max_tokens = generation::num_predict(prompt) + generation::JSON_WRAPPER_TOKENS;
+            (max_tokens, Vec::new(), Some(generation::correction_schema()))
+        } else {
+            (generation::num_predict(prompt), generation::stop_sequences(self.template()), None)
+        };
+        let prompt_tokens = generation::estimate_tokens(instruction) + generation::estimate_tokens(&correction_prompt);
+        let options = GenerationOptions {
+            max_tokens,
+            stop,
+            system: (!instruction.is_empty()).then(|| instruction.to_string()),
+            format,
+            num_ctx: Some(generation::context_size(prompt_tokens, max_tokens)),
+            keep_alive: self.keep_alive,
+            ..GenerationOptions::default()
+        };
+        self.backend.build_request(model_name, &correction_prompt, self.streaming, &options)
+    }
+    
+    /// Ask `model_name` to correct `prompt`, streaming unless disabled.
+    ///
+    /// Failed requests are retried on the other endpoints before giving up.
+    async fn request(&self, model_name: &str, prompt: &str) -> Result<String, Box<dyn std::error::Error>> {
+        let request = self.correction_request(model_name, prompt);
         
-        let rt = tokio::runtime::Runtime::new()?;
-        rt.block_on(async {
-            let response = self.client
-                .post(format!("{}/api/generate", self.base_url))
-                .json(&request)
-                .send()
-                .await?;
-            
-            if !response.status().is_success() {
-                return Err(format!("Ollama API error: {}", response.status()).into());
+        let mut tried = Vec::new();
+        let mut last_error = None;
+        while let Some(index) = self.endpoints.pick(&tried) {
+            tried.push(index);
+            let url = format!("{}{}", self.endpoints.url(index), self.backend.generate_path());
+            let _in_flight = self.endpoints.begin(index);
+            let start = Instant::now();
+            let result = if self.streaming {
+                self.request_streaming(model_name, &url, request.clone(), prompt).await
+            } else {
+                self.request_complete(model_name, &url, request.clone(), prompt).await
+            };
+            match result {
+                Ok(corrected) => {
+                    self.endpoints.record_success(index, start.elapsed());
+                    return Ok(corrected);
+                }
+                Err(e) => {
+                    warn!("Request to {} failed: {}", url, e);
+                    self.endpoints.record_failure(index);
+                    last_error = Some(e);
+                }
             }
-            
-            let ollama_response: OllamaResponse = response.json().await?;
-            let corrected = self.clean_response(&ollama_response.response, prompt);
-            
-            info!("Generated correction: '{}'", corrected);
-            Ok(corrected)
-        })
+        }
+        Err(last_error.unwrap_or_else(|| "No inference endpoints configured".into()))
     }
     
-    fn clean_response(&self, response: &str, original: &str) -> String {
-        // Clean up the response to extract just the corrected text
-        let cleaned = response.trim();
+    /// Send a non-streaming request and clean the full completion
+    async fn request_complete(
+        &self,
+        model_name: &str,
+        url: &str,
+        request: serde_json::Value,
+        original: &str,
+    ) -> Result<String, Box<dyn std::error::Error>> {
+        let start = Instant::now();
+        let response = self.client
+            .post(url)
+            .json(&request)
+            .send()
+            .await?;
         
-        // Remove common prefixes that models sometimes add
-        let prefixes_to_remove = [
-            "Here's the corrected text:",
-            "Corrected text:",
-            "Corrected version:",
-            "Corrected:",
-            "Fixed:",
-            "The corrected text is:",
-            "Here is the corrected version:",
-        ];
+        if !response.status().is_success() {
+            return Err(format!("{} API error: {}", self.backend.name(), response.status()).into());
+        }
         
-        let mut result = cleaned;
-        for prefix in &prefixes_to_remove {
-            if result.starts_with(prefix) {
-                result = result[prefix.len()..].trim();
-                break;
-            }
+        let body = response.bytes().await?;
+        self.record_timings(model_name, start.elapsed(), &body);
+        let text = self.backend.parse_response(&body)?;
+        if self.structured {
+            let mut parser = JsonFieldParser::new(generation::CORRECTION_FIELD);
+            parser.push(&text);
+            return Ok(clean_structured(parser.value(), original));
         }
+        Ok(self.clean_response(&text, original))
+    }
+    
+    /// Stream the completion line by line and stop as soon as the corrected line is complete
+    async fn request_streaming(
+        &self,
+        model_name: &str,
+        url: &str,
+        request: serde_json::Value,
+        original: &str,
+    ) -> Result<String, Box<dyn std::error::Error>> {
+        let start = Instant::now();
+        let mut response = self.client
+            .post(url)
+            .json(&request)
+            .send()
+            .await?;
         
-        // If the response is empty or too different, return original
-        if result.is_empty() || result.len() > original.len() * 2 {
-            return original.to_string();
+        if !response.status().is_success() {
+            return Err(format!("{} API error: {}", self.backend.name(), response.status()).into());
         }
         
-        // Take only the first line if there are multiple lines
-        if let Some(first_line) = result.lines().next() {
-            result = first_line;
+        let mut lines = NdjsonLines::default();
+        let mut cleaner = StreamingCleaner::new(original);
+        let mut parser = self.structured.then(|| JsonFieldParser::new(generation::CORRECTION_FIELD));
+        
+        'stream: loop {
+            let (records, eof) = match response.chunk().await? {
+                Some(bytes) => (lines.push(&bytes), false),
+                None => (lines.finish(), true),
+            };
+            for line in records {
+                let Some(chunk) = self.backend.parse_stream_line(&line)? else { continue };
+                // Load timings only come with the final line, which early termination may skip
+                if chunk.done {
+                    self.record_timings(model_name, start.elapsed(), &line);
+                }
+                let (finished, received) = match parser.as_mut() {
+                    Some(parser) => (parser.push(&chunk.text), parser.len()),
+                    None => (cleaner.push(&chunk.text), cleaner.len()),
+                };
+                if finished {
+                    // Dropping the response closes the connection, which makes
+                    // the server stop generating tokens we would throw away anyway
+                    debug!("Stopping generation early after {} bytes", received);
+                    break 'stream;
+                }
+                if chunk.done {
+                    break 'stream;
+                }
+            }
+            if eof {
+                break;
+            }
         }
         
-        // Remove unwanted periods that the model might add
-        // If the original text didn't end with punctuation, don't add it
-        if !original.ends_with('.') && !original.ends_with('!') && !original.ends_with('?') && result.ends_with('.') {
-            result = result.trim_end_matches('.').trim();
+        if let Some(parser) = parser {
+            return Ok(clean_structured(parser.value(), original));
+        }
+        Ok(self.clean_response(cleaner.text(), original))
+    }
+    
+    /// Record the server's timings from a final response, if it sent any
+    fn record_timings(&self, model_name: &str, wall: Duration, body: &[u8]) {
+        let Some(timings) = self.backend.timings(body) else { return };
+        if let Some(load) = timings.load {
+            self.residency.record_load(load);
         }
+        TIMING_METRICS.record(model_name, wall, &timings);
+        debug!(
+            "{} timings: wall {:?}, server {:?} (load {:?}, prompt {:?} at {:.0} tok/s, gen {:?} at {:.0} tok/s)",
+            model_name,
+            wall,
+            timings.total.unwrap_or_default(),
+            timings.load.unwrap_or_default(),
+            timings.prompt_eval.unwrap_or_default(),
+            timings.prompt_tokens_per_sec().unwrap_or_default(),
+            timings.eval.unwrap_or_default(),
+            timings.generation_tokens_per_sec().unwrap_or_default(),
+        );
+    }
+    
+    fn clean_response(&self, response: &str, original: &str) -> String {
+        // Clean up the response to extract just the corrected text
+        let cleaned = response.trim();
         
-        result.to_string()
+        // Remove common prefixes that models sometimes add
+        let result = strip_known_prefix(cleaned).trim();
+        finish_correction(result, original)
+    }
+}
+
+/// Corrected text from the structured output's field, or `original` if the
+/// model did not produce it
+fn clean_structured(value: Option<&str>, original: &str) -> String {
+    match value {
+        Some(value) => finish_correction(value.trim(), original),
+        None => {
+            warn!("Model output had no {} field, keeping the original text", generation::CORRECTION_FIELD);
+            original.to_string()
+        }
+    }
+}
+
+/// Final checks on an extracted correction, falling back to `original` if it looks wrong
+fn finish_correction(result: &str, original: &str) -> String {
+    // Take only the first line if there are multiple lines
+    let mut result = result.lines().next().unwrap_or(result);
+    
+    // If the response is empty or too different, return original
+    if result.is_empty() || result.len() > original.len() * 2 {
+        return original.to_string();
+    }
+    
+    // Remove unwanted periods that the model might add
+    // If the original text didn't end with punctuation, don't add it
+    if !original.ends_with('.') && !original.ends_with('!') && !original.ends_with('?') && result.ends_with('.') {
+        result = result.trim_end_matches('.').trim();
+    }
+    
+    result.to_string()
+}
+
+impl LatencyState {
+    fn recent(&self) -> Option<Duration> {
+        self.average
+            .filter(|(_, updated)| updated.elapsed() < LATENCY_SAMPLE_TTL)
+            .map(|(latency, _)| latency)
     }
 }
 
+/// Weight of the newest sample in the latency moving average
+const LATENCY_EWMA_WEIGHT: f64 = 0.3;
+
+/// Latency older than this no longer predicts the next request
+const LATENCY_SAMPLE_TTL: Duration = Duration::from_secs(60);
+
+/// A model skipped as too slow is sent one request after this long, so a
+/// server that has caught up is noticed before the estimate expires
+const LATENCY_PROBE_INTERVAL: Duration = Duration::from_secs(10);
+
+/// A warm-up slower than this is dropped; the correction connects on its own
+const WARM_TIMEOUT: Duration = Duration::from_secs(1);
+
+/// Prompt sent to the model; `{text}` is replaced with the text to correct
+const PROMPT_TEMPLATE: &str = "Correct the spelling and grammar:\n{text}\n\nCorrected version:";
+
+/// Prompt for structured output; the field name matches `generation::CORRECTION_FIELD`
+const STRUCTURED_PROMPT_TEMPLATE: &str =
+    "Correct the spelling and grammar. Reply with JSON: {\"corrected\": \"<corrected text>\"}\n{text}";
+
+/// Prefixes that models sometimes put in front of the corrected text
+const PREFIXES_TO_REMOVE: [&str; 7] = [
+    "Here's the corrected text:",
+    "Corrected text:",
+    "Corrected version:",
+    "Corrected:",
+    "Fixed:",
+    "The corrected text is:",
+    "Here is the corrected version:",
+];
+
+/// Strip the first matching chatter prefix, leaving the rest untouched
+fn strip_known_prefix(text: &str) -> &str {
+    for prefix in &PREFIXES_TO_REMOVE {
+        if let Some(rest) = text.strip_prefix(prefix) {
+            return rest;
+        }
+    }
+    text
+}
+
+/// Load the dictionary now so the first hotkey press does not pay for it
+pub fn warm_dictionary() {
+    let start = std::time::Instant::now();
+    Lazy::force(&DICTIONARY);
+    info!("📖 Dictionary ready in {:?}", start.elapsed());
+}
+
+/// Run the tiered pipeline: rules, dictionary, then the small and large models.
+///
+/// A tier's answer is used as soon as its confidence reaches `threshold`;
+/// missing models are skipped, and so are models too slow to answer before
+/// `deadline`. If escalation fails after a model has answered, its unsure
+/// answer is used. Without any model answer this returns `BudgetExceeded` if
+/// time ran out, `CircuitOpen` if the server is down, and `ModelUnavailable`
+/// if the health monitor ruled the models out before the press. `Cancelled`
+/// means `cancel` fired first. Errors are `Send` so that the correction can
+/// run on a blocking thread of an async press.
 pub fn generate_correction(
     text: &str, 
-    model: &mut Option<LlamaModelWrapper>
-) -> Result<String, Box<dyn std::error::Error>> {
+    model: Option<&LlamaModelWrapper>,
+    large_model: Option<&LlamaModelWrapper>,
+    threshold: f32,
+    deadline: Option<Instant>,
+    cancel: Option<&CancellationToken>,
+) -> Result<String, Box<dyn std::error::Error + Send + Sync>> {
     info!("Generating correction for: '{}'", text);
     
-    if let Some(ref mut model) = model {
-        let result = model.generate(text);
-        match &result {
-            Ok(corrected) => info!("Generated correction: '{}'", corrected),
-            Err(e) => {
-                info!("Ollama correction failed: {}", e);
-                // Return original text if Ollama fails
-                return Ok(text.to_string());
-            }
-        }
-        result
+    let has_model = model.is_some() || large_model.is_some();
+    // Models the health monitor knows cannot answer are left out up front
+    let unavailable = [model, large_model]
+        .into_iter()
+        .flatten()
+        .find(|model| !model.status().is_usable())
+        .map(|model| ModelUnavailable { model: model.model_name().to_string(), status: model.status() });
+    let mut pipeline = CorrectionPipeline::new(threshold)
+        .with_deadline(deadline)
+        .with_cancellation(cancel.cloned())
+        .with_tier(RulesTier)
+        .with_tier(DictionaryTier);
+    if let Some(model) = model.filter(|model| model.status().is_usable()) {
+        pipeline = pipeline.with_tier(LlmTier::new("small-llm", model).with_cancellation(cancel.cloned()));
+    }
+    if let Some(model) = large_model.filter(|model| model.status().is_usable()) {
+        pipeline = pipeline.with_tier(LlmTier::new("large-llm", model).with_cancellation(cancel.cloned()));
+    }
+    
+    let result = pipeline.run(text);
+    // A newer press replaced this one; its answer must not be applied
+    if result.cancelled || cancel.is_some_and(|cancel| cancel.is_cancelled()) {
+        return Err(Cancelled.into());
+    }
+    let escalation_error: Option<Box<dyn std::error::Error + Send + Sync>> = if result.confident {
+        None
+    } else if result.budget_exhausted {
+        Some(BudgetExceeded.into())
+    } else if result.unavailable {
+        Some(CircuitOpen.into())
+    } else if let Some(unavailable) = unavailable {
+        Some(unavailable.into())
+    } else if !has_model {
+        Some("Model not loaded".into())
     } else {
-        Err("Model not loaded".into())
+        None
+    };
+    if let Some(error) = escalation_error {
+        // An unsure model answer still beats reporting an error
+        match result.tier {
+            Some(tier) => warn!("Could not escalate past {} tier ({}), using its answer", tier, error),
+            None => return Err(error),
+        }
+    }
+    match result.tier {
+        Some(tier) => info!("Correction from {} tier ({:.2}): '{}'", tier, result.confidence, result.text),
+        None => info!("No tier changed the text"),
     }
+    debug!("Model timings:\n{}", TIMING_METRICS.summary());
+    Ok(result.text)
 }
 
 
 #[cfg(test)]
 mod tests {
     use super::*;
+    use super::pipeline::DEFAULT_ESCALATION_THRESHOLD;
+    use super::test_server::{MockResponse, MockServer};
     use tempfile::TempDir;
     use std::fs;
     use std::path::PathBuf;
+    use std::time::{Duration, Instant};
 
     fn create_temp_model_file() -> (TempDir, PathBuf) {
         let temp_dir = TempDir::new().unwrap();
@@ -218,7 +796,7 @@ mod tests {
     #[test]
     fn test_llama_model_generate() {
         let (_temp_dir, model_path) = create_temp_model_file();
-        let mut model = LlamaModelWrapper::new(&model_path).unwrap();
+        let model = LlamaModelWrapper::new(&model_path).unwrap();
         
         // Note: These tests will only work if Ollama is running with the model
         // If Ollama is not available, they will return the original text or error
@@ -237,15 +815,815 @@ mod tests {
         }
     }
 
+    fn ollama_mock(reply: &'static str) -> MockServer {
+        MockServer::start(move |request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => MockResponse::json(serde_json::json!({ "response": reply, "done": true })),
+        })
+    }
+
+    #[test]
+    fn test_generate_against_mock_server() {
+        let server = ollama_mock("I have the cat");
+        let model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        
+        assert_eq!(model.generate("I have teh cat").unwrap(), "I have the cat");
+        assert_eq!(model.generate("I have teh cat").unwrap(), "I have the cat");
+        
+        // Creating the wrapper sends nothing; only the two generations reach the server
+        assert_eq!(server.request_count(), 2);
+        assert_eq!(server.requests()[0].json()["model"], "phi:2.7b");
+    }
+
+    #[test]
+    fn test_concurrent_corrections_overlap() {
+        let server = MockServer::start(|request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => MockResponse::json(serde_json::json!({ "response": "I have the cat", "done": true }))
+                .delayed(Duration::from_millis(300)),
+        });
+        let model = Arc::new(LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap());
+
+        let start = Instant::now();
+        let handles: Vec<_> = (0..4)
+            .map(|_| {
+                let model = Arc::clone(&model);
+                std::thread::spawn(move || model.generate("I have teh cat").unwrap())
+            })
+            .collect();
+        for handle in handles {
+            assert_eq!(handle.join().unwrap(), "I have the cat");
+        }
+
+        // Serialised, four 300ms requests would take 1.2s
+        assert!(start.elapsed() < Duration::from_millis(700), "took {:?}", start.elapsed());
+        assert_eq!(server.request_count(), 4);
+    }
+
+    fn stream_chunk(token: &str, done: bool) -> String {
+        format!("{}\n", serde_json::json!({ "response": token, "done": done }))
+    }
+
+    #[test]
+    fn test_streaming_stops_after_first_line() {
+        // A chatty model that keeps explaining itself, one token every 40ms
+        let tokens = [
+            "Corrected version:", "\n", "I", " have", " the", " cat", "\n",
+            "Explanation", ":", " teh", " is", " a", " common", " typo", " for", " the", ".",
+        ];
+        let server = MockServer::start(move |request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => {
+                let mut chunks: Vec<_> = tokens
+                    .iter()
+                    .map(|token| (Duration::from_millis(40), stream_chunk(token, false)))
+                    .collect();
+                chunks.push((Duration::from_millis(40), stream_chunk("", true)));
+                MockResponse::streamed(chunks)
+            }
+        });
+        let model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        
+        let start = Instant::now();
+        let corrected = model.generate("I have teh cat").unwrap();
+        let elapsed = start.elapsed();
+        
+        assert_eq!(corrected, "I have the cat");
+        assert_eq!(server.requests()[0].json()["stream"], true);
+        // 7 of 18 chunks are needed; the full stream would take 720ms
+        assert!(elapsed < Duration::from_millis(600), "took {:?}", elapsed);
+        
+        // The server notices the hang-up on its next write
+        let deadline = Instant::now() + Duration::from_secs(2);
+        while server.aborted_streams() == 0 && Instant::now() < deadline {
+            std::thread::sleep(Duration::from_millis(10));
+        }
+        assert_eq!(server.aborted_streams(), 1);
+    }
+
+    #[test]
+    fn test_structured_output_stops_when_field_closes() {
+        // The answer's text would fool the line-based cleaner: a chatter prefix and a period
+        let tokens = [
+            "{", "\"corrected", "\":", " \"", "Fixed:", " I", " have", " the", " cat", "\"",
+            ", \"note\": \"", "teh", " is", " a", " typo", "\"}",
+        ];
+        let server = MockServer::start(move |request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => {
+                let mut chunks: Vec<_> = tokens
+                    .iter()
+                    .map(|token| (Duration::from_millis(40), stream_chunk(token, false)))
+                    .collect();
+                chunks.push((Duration::from_millis(40), stream_chunk("", true)));
+                MockResponse::streamed(chunks)
+            }
+        });
+        let mut model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        model.set_structured_output(true);
+        
+        let start = Instant::now();
+        assert_eq!(model.generate("Fixed: I have teh cat").unwrap(), "Fixed: I have the cat");
+        // 10 of 17 chunks are needed; the full stream would take 680ms
+        assert!(start.elapsed() < Duration::from_millis(600), "took {:?}", start.elapsed());
+        
+        let request = server.requests()[0].json();
+        assert_eq!(request["format"], generation::correction_schema());
+        assert!(request["options"].get("stop").is_none());
+        assert!(request["system"].as_str().unwrap().contains("\"corrected\""));
+        
+        // Non-streaming answers go through the same parser, and missing fields keep the original
+        let server = ollama_mock("{\"corrected\": \"I have the cat.\"}");
+        let mut model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        model.set_structured_output(true);
+        model.set_streaming(false);
+        assert_eq!(model.generate("I have teh cat").unwrap(), "I have the cat");
+        
+        let server = ollama_mock("I have the cat");
+        let mut model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        model.set_structured_output(true);
+        assert_eq!(model.generate("I have teh cat").unwrap(), "I have teh cat");
+        assert_ne!(model.prompt_fingerprint(), LlamaModelWrapper::with_endpoint(&server.url(), "phi").unwrap().prompt_fingerprint());
+    }
+
+    #[test]
+    fn test_streaming_stops_when_output_too_long() {
+        let server = MockServer::start(|_| {
+            let chunks = (0..50)
+                .map(|_| (Duration::from_millis(20), stream_chunk(" blah", false)))
+                .collect();
+            MockResponse::streamed(chunks)
+        });
+        let model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        
+        let start = Instant::now();
+        assert_eq!(model.generate("short").unwrap(), "short");
+        assert!(start.elapsed() < Duration::from_millis(500));
+    }
+
+    #[test]
+    fn test_non_streaming_mode() {
+        let server = ollama_mock("I have the cat\nFixed teh");
+        let mut model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        model.set_streaming(false);
+        
+        assert_eq!(model.generate("I have teh cat").unwrap(), "I have the cat");
+        assert_eq!(server.requests()[0].json()["stream"], false);
+    }
+
+    #[test]
+    #[ignore] // Micro-benchmark: cargo test bench_request_overhead -- --ignored --nocapture
+    fn bench_request_overhead() {
+        const ITERATIONS: u32 = 200;
+        let server = ollama_mock("I have the cat");
+        let url = format!("{}/api/generate", server.url());
+        let body = serde_json::json!({ "model": "phi:2.7b", "prompt": "I have teh cat", "stream": false });
+        
+        // Before: a fresh runtime per request, as generate() used to do
+        let client = Client::new();
+        let start = Instant::now();
+        for _ in 0..ITERATIONS {
+            let rt = tokio::runtime::Runtime::new().unwrap();
+            rt.block_on(async {
+                client.post(&url).json(&body).send().await.unwrap().text().await.unwrap()
+            });
+        }
+        let per_runtime = start.elapsed() / ITERATIONS;
+        
+        // After: shared runtime and pooled, tuned client
+        let model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        let start = Instant::now();
+        for _ in 0..ITERATIONS {
+            model.generate("I have teh cat").unwrap();
+        }
+        let shared = start.elapsed() / ITERATIONS;
+        
+        println!("per-request overhead, runtime per call:  {:?}", per_runtime);
+        println!("per-request overhead, shared runtime:    {:?}", shared);
+    }
+
+    #[test]
+    #[ignore] // Benchmark: cargo test bench_dictionary_vs_llm -- --ignored --nocapture (needs Ollama)
+    fn bench_dictionary_vs_llm() {
+        const SAMPLE: &str = "I recieve teh mesage with thier help.";
+        const ITERATIONS: u32 = 1000;
+        warm_dictionary();
+        
+        let start = Instant::now();
+        for _ in 0..ITERATIONS {
+            assert!(DICTIONARY.correct(SAMPLE).is_some());
+        }
+        println!("dictionary path: {:?} per correction", start.elapsed() / ITERATIONS);
+        
+        let model = LlamaModelWrapper::new(Path::new("unused")).unwrap();
+        let start = Instant::now();
+        match model.generate(SAMPLE) {
+            Ok(corrected) => println!("LLM path:        {:?} ('{}')", start.elapsed(), corrected),
+            Err(e) => println!("LLM path:        unavailable ({})", e),
+        }
+    }
+
+    #[test]
+    #[ignore] // Benchmark: cargo test bench_context_buckets -- --ignored --nocapture (needs Ollama)
+    fn bench_context_buckets() {
+        const MODEL: &str = "phi:2.7b";
+        let client = build_http_client().unwrap();
+        let backend = OllamaBackend;
+        let text = "I recieve teh mesage with thier help and it was definately usefull.";
+        let prompt = PROMPT_TEMPLATE.replace("{text}", text);
+        
+        println!("{:>8} {:>12} {:>12} {:>12} {:>10}", "num_ctx", "memory MB", "VRAM MB", "prompt eval", "load");
+        for num_ctx in generation::CONTEXT_BUCKETS {
+            let options = GenerationOptions {
+                max_tokens: generation::num_predict(text),
+                num_ctx: Some(num_ctx),
+                ..GenerationOptions::default()
+            };
+            let request = backend.build_request(MODEL, &prompt, false, &options);
+            let (timings, running) = shared_runtime().block_on(async {
+                let url = format!("{}{}", DEFAULT_OLLAMA_URL, backend.generate_path());
+                let body = client.post(url).json(&request).send().await?.bytes().await?;
+                let running: serde_json::Value = client
+                    .get(format!("{}/api/ps", DEFAULT_OLLAMA_URL))
+                    .send()
+                    .await?
+                    .json()
+                    .await?;
+                Ok::<_, reqwest::Error>((backend.timings(&body), running))
+            }).expect("Ollama is running");
+            
+            let loaded = running["models"].as_array().and_then(|models| {
+                models.iter().find(|m| m["name"].as_str().is_some_and(|name| name.starts_with(MODEL)))
+            });
+            let megabytes = |key: &str| loaded.and_then(|m| m[key].as_u64()).map_or(0, |bytes| bytes / (1024 * 1024));
+            let timings = timings.unwrap_or_default();
+            println!(
+                "{:>8} {:>12} {:>12} {:>12?} {:>10?}",
+                num_ctx, megabytes("size"), megabytes("size_vram"),
+                timings.prompt_eval.unwrap_or_default(), timings.load.unwrap_or_default(),
+            );
+        }
+    }
+
+    #[test]
+    #[ignore] // Benchmark: cargo test bench_prefix_reuse -- --ignored --nocapture (needs Ollama)
+    fn bench_prefix_reuse() {
+        const SENTENCES: [&str; 6] = [
+            "I recieve teh mesage with thier help.",
+            "She dont know wich way to go.",
+            "Their going too the store tomorow.",
+            "The wether is realy nice todya.",
+            "He has alot of intresting ideas.",
+            "We was definately going to be late.",
+        ];
+        let client = build_http_client().unwrap();
+        let mut model = LlamaModelWrapper::new(Path::new("unused")).unwrap();
+        model.set_streaming(false);
+        let url = format!("{}{}", DEFAULT_OLLAMA_URL, model.backend.generate_path());
+        
+        for reuse in [false, true] {
+            model.set_prefix_reuse(reuse);
+            let mut prompt_eval = Duration::ZERO;
+            let mut prompt_tokens = 0;
+            // The first sentence evaluates the prefix; the rest show what reuse saves
+            for (index, sentence) in SENTENCES.iter().enumerate() {
+                let request = model.correction_request(model.model_name(), sentence);
+                let body = shared_runtime()
+                    .block_on(async { client.post(&url).json(&request).send().await?.bytes().await })
+                    .expect("Ollama is running");
+                let timings = model.backend.timings(&body).unwrap_or_default();
+                if index > 0 {
+                    prompt_eval += timings.prompt_eval.unwrap_or_default();
+                    prompt_tokens += timings.prompt_eval_count.unwrap_or_default();
+                }
+            }
+            let measured = SENTENCES.len() as u32 - 1;
+            println!(
+                "prefix reuse {:<5}: {:?} prompt eval, {} prompt tokens evaluated per request",
+                reuse, prompt_eval / measured, prompt_tokens / measured as u64,
+            );
+        }
+    }
+
+    #[test]
+    fn test_generate_correction_uses_dictionary() {
+        // No model needed for plain misspellings
+        let model = None;
+        let corrected = generate_correction("I recieve teh mesage with thier help.", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, None, None).unwrap();
+        assert_eq!(corrected, "I receive the message with their help.");
+    }
+
+    #[test]
+    fn test_generate_correction_escalates_to_large_model() {
+        let small_server = ollama_mock("I saw the qwzx");
+        let large_server = ollama_mock("I saw the box");
+        let small = Some(LlamaModelWrapper::with_endpoint(&small_server.url(), "small-test").unwrap());
+        let large = Some(LlamaModelWrapper::with_endpoint(&large_server.url(), "large-test").unwrap());
+        
+        // The dictionary cannot place "qwzx", and neither can the small model;
+        // each model gets the original text rather than the dictionary's partial fix
+        let corrected = generate_correction("I saw teh qwzx", small.as_ref(), large.as_ref(), DEFAULT_ESCALATION_THRESHOLD, None, None).unwrap();
+        assert_eq!(corrected, "I saw the box");
+        assert!(small_server.requests().iter().any(|r| r.body.contains("I saw teh qwzx")));
+        assert_eq!(large_server.requests().iter().filter(|r| r.path == "/api/generate").count(), 1);
+        
+        // A confident dictionary fix never reaches either model
+        let requests = small_server.request_count() + large_server.request_count();
+        generate_correction("I saw teh box", small.as_ref(), large.as_ref(), DEFAULT_ESCALATION_THRESHOLD, None, None).unwrap();
+        assert_eq!(small_server.request_count() + large_server.request_count(), requests);
+    }
+
+    #[test]
+    fn test_failed_escalation_keeps_small_model_answer() {
+        let small_server = ollama_mock("I saw the qwzx");
+        // Its own name keeps the correction cache from answering for the escalation test
+        let small = Some(LlamaModelWrapper::with_endpoint(&small_server.url(), "unsure-test").unwrap());
+        
+        // The large model is not installed
+        let missing_server = MockServer::start(|request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            "/api/show" => MockResponse::status(404),
+            _ => MockResponse::json(serde_json::json!({ "response": "I saw the box", "done": true })),
+        });
+        let missing = Some(LlamaModelWrapper::with_endpoint(&missing_server.url(), "missing-test").unwrap());
+        missing.as_ref().unwrap().start_health_monitor();
+        let deadline = Instant::now() + Duration::from_secs(2);
+        while missing.as_ref().unwrap().status() == ModelStatus::Unknown && Instant::now() < deadline {
+            std::thread::sleep(Duration::from_millis(5));
+        }
+        assert_eq!(missing.as_ref().unwrap().status(), ModelStatus::Missing);
+        let corrected = generate_correction("I saw teh qwzx", small.as_ref(), missing.as_ref(), DEFAULT_ESCALATION_THRESHOLD, None, None).unwrap();
+        assert_eq!(corrected, "I saw the qwzx");
+        
+        // The large model is too slow for the time left
+        let slow_server = MockServer::start(|request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => MockResponse::json(serde_json::json!({ "response": "I saw the box", "done": true }))
+                .delayed(Duration::from_millis(300)),
+        });
+        let slow = Some(LlamaModelWrapper::with_endpoint(&slow_server.url(), "slow-test").unwrap());
+        let deadline = Some(Instant::now() + Duration::from_millis(150));
+        let corrected = generate_correction("I saw teh qwzx", small.as_ref(), slow.as_ref(), DEFAULT_ESCALATION_THRESHOLD, deadline, None).unwrap();
+        assert_eq!(corrected, "I saw the qwzx");
+    }
+
+    #[test]
+    fn test_cancel_drops_model_request() {
+        let server = MockServer::start(|request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => {
+                let chunks = (0..50).map(|_| (Duration::from_millis(20), stream_chunk("x", false))).collect();
+                MockResponse::streamed(chunks)
+            }
+        });
+        let model = Some(LlamaModelWrapper::with_endpoint(&server.url(), "cancel-test").unwrap());
+        let cancel = CancellationToken::new();
+        let trigger = cancel.clone();
+        std::thread::spawn(move || {
+            std::thread::sleep(Duration::from_millis(100));
+            trigger.cancel();
+        });
+        
+        let start = Instant::now();
+        let result = generate_correction("I saw teh qwzx", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, None, Some(&cancel));
+        assert!(result.unwrap_err().is::<Cancelled>());
+        assert!(start.elapsed() < Duration::from_millis(500), "took {:?}", start.elapsed());
+        
+        // The connection is closed, and the server is not blamed for it
+        let deadline = Instant::now() + Duration::from_secs(2);
+        while server.aborted_streams() == 0 && Instant::now() < deadline {
+            std::thread::sleep(Duration::from_millis(10));
+        }
+        assert_eq!(server.aborted_streams(), 1);
+        assert_eq!(model.as_ref().unwrap().breaker_stats().consecutive_failures, 0);
+        
+        // Already cancelled: nothing is sent
+        let requests = server.request_count();
+        let result = generate_correction("I saw teh qwzx", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, None, Some(&cancel));
+        assert!(result.unwrap_err().is::<Cancelled>());
+        assert_eq!(server.request_count(), requests);
+    }
+
+    #[test]
+    fn test_generate_correction_respects_deadline() {
+        let server = MockServer::start(|request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => MockResponse::json(serde_json::json!({ "response": "I saw the box", "done": true }))
+                .delayed(Duration::from_millis(300)),
+        });
+        let model = Some(LlamaModelWrapper::with_endpoint(&server.url(), "slow-test").unwrap());
+        
+        // The model is cut off at the deadline instead of blocking
+        let start = Instant::now();
+        let result = generate_correction("I saw teh qwzx", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, Some(start + Duration::from_millis(50)), None);
+        assert!(result.unwrap_err().is::<BudgetExceeded>());
+        assert!(start.elapsed() < Duration::from_millis(250), "took {:?}", start.elapsed());
+        assert!(model.as_ref().unwrap().recent_latency().unwrap() >= Duration::from_millis(30));
+        
+        // Known to be slower than the time left: skipped without a request
+        let requests = server.request_count();
+        let result = generate_correction("I saw teh qwzx", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, Some(Instant::now() + Duration::from_millis(20)), None);
+        assert!(result.unwrap_err().is::<BudgetExceeded>());
+        assert_eq!(server.request_count(), requests);
+        
+        // With enough time the model answers
+        let corrected = generate_correction("I saw teh qwzx", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, Some(Instant::now() + Duration::from_secs(5)), None).unwrap();
+        assert_eq!(corrected, "I saw the box");
+    }
+
+    #[test]
+    fn test_stale_latency_estimate_is_probed() {
+        let server = ollama_mock("I saw the box");
+        let model = Some(LlamaModelWrapper::with_endpoint(&server.url(), "probe-test").unwrap());
+        let slow_estimate = |updated: Instant| model.as_ref().unwrap().timing.lock().unwrap().average = Some((Duration::from_secs(1), updated));
+        let press = || generate_correction("I saw teh qwzx", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, Some(Instant::now() + Duration::from_millis(200)), None);
+        
+        // A fresh estimate over the time left skips the model
+        slow_estimate(Instant::now());
+        let requests = server.request_count();
+        assert!(press().unwrap_err().is::<BudgetExceeded>());
+        assert_eq!(server.request_count(), requests);
+        
+        // Once nothing has refreshed it for a probe interval, one press measures
+        // the model again and the fast answer replaces the estimate
+        slow_estimate(Instant::now() - LATENCY_PROBE_INTERVAL);
+        assert_eq!(press().unwrap(), "I saw the box");
+        assert!(model.as_ref().unwrap().recent_latency().unwrap() < Duration::from_millis(200));
+        assert_eq!(press().unwrap(), "I saw the box");
+        
+        // Only one probe per interval while the model stays slow
+        slow_estimate(Instant::now() - LATENCY_PROBE_INTERVAL);
+        assert!(!model.as_ref().unwrap().claim_latency_probe());
+    }
+    
+    #[test]
+    fn test_timeouts_do_not_lower_the_latency_estimate() {
+        let server = ollama_mock("I saw the box");
+        let model = LlamaModelWrapper::with_endpoint(&server.url(), "censored-test").unwrap();
+        model.record_latency(Duration::from_millis(500), false);
+        
+        // Cut off at 100ms: the model took at least that, which says nothing new
+        model.record_latency(Duration::from_millis(100), true);
+        assert_eq!(model.recent_latency(), Some(Duration::from_millis(500)));
+        model.record_latency(Duration::from_millis(900), true);
+        assert!(model.recent_latency().unwrap() > Duration::from_millis(500));
+        
+        model.record_latency(Duration::from_millis(100), false);
+        assert!(model.recent_latency().unwrap() < Duration::from_millis(900));
+    }
+
+    #[test]
+    fn test_hedges_to_standby_when_primary_is_slow() {
+        let server = MockServer::start(|request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ if request.json()["model"] == "slow-primary" => MockResponse::streamed(vec![
+                (Duration::from_secs(2), stream_chunk("I have", false)),
+                (Duration::from_millis(100), stream_chunk(" the primary cat\n", true)),
+            ]),
+            _ => MockResponse::json(serde_json::json!({ "response": "I have the cat", "done": true })),
+        });
+        let mut model = LlamaModelWrapper::with_endpoint(&server.url(), "slow-primary").unwrap();
+        model.set_standby(Some("fast-standby"));
+        model.record_latency(Duration::from_secs(2), false);
+        
+        let start = Instant::now();
+        let generation = model.generate_cancellable("I have teh cat", None, None).unwrap();
+        assert_eq!(generation.text, "I have the cat");
+        assert!(start.elapsed() < Duration::from_secs(1), "took {:?}", start.elapsed());
+        assert!(generation.from_standby());
+        
+        // The standby's quick answer is not the primary's latency
+        assert_eq!(model.recent_latency(), Some(Duration::from_secs(2)));
+        
+        let stats = model.hedge_stats();
+        assert_eq!((stats.requests, stats.hedged, stats.standby_wins), (1, 1, 1));
+        let models: Vec<String> = server.requests().iter()
+            .filter(|r| r.path == "/api/generate")
+            .map(|r| r.json()["model"].as_str().unwrap_or_default().to_string())
+            .collect();
+        assert_eq!(models, ["slow-primary", "fast-standby"]);
+    }
+
+    #[test]
+    fn test_routes_around_slow_and_failing_endpoints() {
+        let slow = MockServer::start(|request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => MockResponse::json(serde_json::json!({ "response": "I have the cat", "done": true }))
+                .delayed(Duration::from_millis(100)),
+        });
+        let fast = ollama_mock("I have the cat");
+        let failing = MockServer::start(|request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => MockResponse::status(500),
+        });
+        let urls = [failing.url(), slow.url(), fast.url()];
+        let model = LlamaModelWrapper::with_endpoints(
+            Box::new(backend::OllamaBackend), &urls, RoutingPolicy::Latency, "phi:2.7b",
+        ).unwrap();
+        
+        // Every request succeeds even though one endpoint always fails
+        for _ in 0..10 {
+            assert_eq!(model.generate("I have teh cat").unwrap(), "I have the cat");
+        }
+        
+        let stats = model.endpoint_stats();
+        assert!(stats[0].ejected, "{:?}", stats[0]);
+        assert!(stats[0].requests <= 3, "failing endpoint kept getting traffic: {:?}", stats[0]);
+        // Once measured, the fast endpoint takes the traffic
+        assert!(stats[2].requests > stats[1].requests, "{:?}", stats);
+        assert!(stats.iter().all(|endpoint| endpoint.outstanding == 0));
+    }
+    
+    #[test]
+    fn test_all_endpoints_failing_returns_error() {
+        let failing = MockServer::start(|request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => MockResponse::status(503),
+        });
+        let model = LlamaModelWrapper::with_endpoints(
+            Box::new(backend::OllamaBackend), &[failing.url(), failing.url()], RoutingPolicy::LeastOutstanding, "phi:2.7b",
+        ).unwrap();
+        assert!(model.generate("I have teh cat").is_err());
+        // One attempt per endpoint, then the error surfaces
+        assert_eq!(failing.requests().iter().filter(|r| r.path == "/api/generate").count(), 2);
+    }
+
+    #[test]
+    fn test_circuit_breaker_fails_fast_while_server_is_down() {
+        let down = Arc::new(std::sync::atomic::AtomicBool::new(false));
+        let flag = Arc::clone(&down);
+        let server = MockServer::start(move |request| {
+            if flag.load(std::sync::atomic::Ordering::SeqCst) {
+                return MockResponse::status(503);
+            }
+            match request.path.as_str() {
+                "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+                _ => MockResponse::json(serde_json::json!({ "response": "I have the cat", "done": true })),
+            }
+        });
+        let mut model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        model.set_breaker(CircuitBreaker::with_settings(
+            build_http_client().unwrap(),
+            vec![format!("{}/api/tags", server.url())],
+            2,
+            Duration::from_millis(30),
+        ));
+        
+        down.store(true, std::sync::atomic::Ordering::SeqCst);
+        assert!(model.generate("I have teh cat").is_err());
+        assert!(model.generate("I have teh cat").is_err());
+        let sent = server.request_count();
+        
+        // Open: no request reaches the server and the press ends quickly
+        let start = Instant::now();
+        let mut model = Some(model);
+        let result = generate_correction("I have teh Qwzx cat", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, None, None);
+        assert!(result.unwrap_err().is::<CircuitOpen>());
+        assert!(start.elapsed() < Duration::from_millis(20), "{:?}", start.elapsed());
+        let stats = model.as_ref().unwrap().breaker_stats();
+        assert_eq!(stats.opened, 1);
+        assert!(stats.rejected >= 1);
+        
+        // Once the health endpoint answers the probe closes the breaker
+        down.store(false, std::sync::atomic::Ordering::SeqCst);
+        let deadline = Instant::now() + Duration::from_secs(2);
+        while model.as_ref().unwrap().breaker().state() != breaker::BreakerState::Closed && Instant::now() < deadline {
+            std::thread::sleep(Duration::from_millis(10));
+        }
+        assert!(server.request_count() > sent);
+        assert_eq!(model.as_mut().unwrap().generate("I have teh cat").unwrap(), "I have the cat");
+    }
+    
+    #[test]
+    fn test_breaker_opens_when_server_is_down_at_startup() {
+        let mut model = LlamaModelWrapper::with_endpoint("http://127.0.0.1:9", "phi:2.7b").unwrap();
+        model.start_health_monitor();
+        let deadline = Instant::now() + Duration::from_secs(2);
+        while model.breaker().state() == breaker::BreakerState::Closed && Instant::now() < deadline {
+            std::thread::sleep(Duration::from_millis(5));
+        }
+        assert_eq!(model.status(), ModelStatus::ServerDown);
+        assert_eq!(model.breaker_stats().opened, 1);
+        assert!(model.generate("I have teh cat").unwrap_err().is::<CircuitOpen>());
+    }
+    
+    #[test]
+    fn test_generate_correction_skips_missing_model() {
+        let server = MockServer::start(|request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            "/api/show" => MockResponse::status(404),
+            _ => MockResponse::json(serde_json::json!({ "response": "I saw the box", "done": true })),
+        });
+        let model = Some(LlamaModelWrapper::with_endpoint(&server.url(), "missing-test").unwrap());
+        model.as_ref().unwrap().start_health_monitor();
+        let deadline = Instant::now() + Duration::from_secs(2);
+        while model.as_ref().unwrap().status() == ModelStatus::Unknown && Instant::now() < deadline {
+            std::thread::sleep(Duration::from_millis(5));
+        }
+        assert_eq!(model.as_ref().unwrap().status(), ModelStatus::Missing);
+        
+        // The press is answered from the health state, without a generate request
+        let result = generate_correction("I saw teh qwzx", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, None, None);
+        assert_eq!(result.unwrap_err().to_string(), "Model missing-test not installed");
+        assert!(server.requests().iter().all(|r| r.path != "/api/generate"));
+    }
+    
+    /// Ollama stand-in that is cold until something loads the model, then stays warm until evicted
+    fn residency_mock(loaded: Arc<std::sync::atomic::AtomicBool>) -> MockServer {
+        MockServer::start(move |request| {
+            let was_loaded = loaded.swap(true, std::sync::atomic::Ordering::SeqCst);
+            let (load_ns, delay) = if was_loaded { (3_000_000u64, 0) } else { (1_200_000_000u64, 60) };
+            let response = if request.json()["prompt"] == "" { "" } else { "I have the cat" };
+            MockResponse::json(serde_json::json!({ "response": response, "done": true, "load_duration": load_ns }))
+                .delayed(Duration::from_millis(delay))
+        })
+    }
+    
+    #[test]
+    fn test_preload_and_cold_load_counting() {
+        let loaded = Arc::new(std::sync::atomic::AtomicBool::new(false));
+        let server = residency_mock(Arc::clone(&loaded));
+        let mut model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        model.set_keep_alive(Some(900));
+        
+        // The preload pays the cold start so the first press does not
+        let load = shared_runtime().block_on(model.residency().preload(model.keep_alive())).unwrap();
+        assert_eq!(load, Some(Duration::from_millis(1200)));
+        assert_eq!(model.residency_stats().cold_loads, 1);
+        
+        for streaming in [false, true] {
+            model.set_streaming(streaming);
+            assert_eq!(model.generate("I have teh cat").unwrap(), "I have the cat");
+        }
+        assert_eq!(model.residency_stats().cold_loads, 1);
+        assert_eq!(model.residency_stats().timed_responses, 3);
+        
+        // After eviction the next request is counted as a cold load
+        loaded.store(false, std::sync::atomic::Ordering::SeqCst);
+        model.generate("I have teh cat").unwrap();
+        let stats = model.residency_stats();
+        assert_eq!((stats.cold_loads, stats.preloads), (2, 1));
+        
+        // Every request asks the server to keep the model resident
+        assert!(server.requests().iter().all(|r| r.json()["keep_alive"] == 900));
+    }
+    
+    #[test]
+    fn test_warm_connection_before_generate() {
+        let server = MockServer::start(|request| match request.path.as_str() {
+            "/api/tags" => MockResponse::json(serde_json::json!({ "models": [] })),
+            _ => MockResponse::json(serde_json::json!({ "response": "I have the cat" })),
+        });
+        let model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        shared_runtime().block_on(model.warm_connection());
+        assert_eq!(model.generate("I have teh cat").unwrap(), "I have the cat");
+        
+        let paths: Vec<String> = server.requests().into_iter().map(|r| r.path).collect();
+        assert_eq!(paths, vec!["/api/tags", "/api/generate"]);
+        
+        // An unreachable server is only logged
+        let down = LlamaModelWrapper::with_endpoint("http://127.0.0.1:9", "phi:2.7b").unwrap();
+        shared_runtime().block_on(down.warm_connection());
+    }
+    
+    #[test]
+    fn test_records_server_timings_per_model() {
+        let server = MockServer::start(|_| {
+            MockResponse::json(serde_json::json!({
+                "response": "I have the cat", "done": true,
+                "total_duration": 30_000_000u64, "load_duration": 2_000_000u64,
+                "prompt_eval_count": 30, "prompt_eval_duration": 10_000_000u64,
+                "eval_count": 6, "eval_duration": 15_000_000u64,
+            }))
+            .delayed(Duration::from_millis(40))
+        });
+        let mut model = LlamaModelWrapper::with_endpoint(&server.url(), "timings-test").unwrap();
+        for streaming in [false, true] {
+            model.set_streaming(streaming);
+            model.generate("I have teh cat").unwrap();
+        }
+        
+        let timings = TIMING_METRICS.model("timings-test").unwrap();
+        assert_eq!(timings.wall.count(), 2);
+        assert_eq!(timings.eval.percentile(0.5), Some(20.0));
+        assert_eq!(timings.prompt_rate.mean(), Some(3000.0));
+        assert_eq!(timings.generation_rate.mean(), Some(400.0));
+        // The mock's 40ms delay is time the server does not account for
+        assert!(timings.overhead.percentile(0.5).unwrap() >= 10.0);
+        assert!(TIMING_METRICS.summary().contains("timings-test: n=2"));
+    }
+    
+    #[test]
+    fn test_generation_budget_sent_to_server() {
+        let server = ollama_mock("I have the cat");
+        let model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        model.generate("I have teh cat").unwrap();
+        let long_text = "I have teh cat and it is realy a very nice cat indeed. ".repeat(4);
+        model.generate(long_text.trim()).unwrap();
+
+        let options: Vec<serde_json::Value> = server.requests().iter().map(|r| r.json()["options"].clone()).collect();
+        let short = options[0]["num_predict"].as_i64().unwrap();
+        let long = options[1]["num_predict"].as_i64().unwrap();
+        assert_eq!(short, generation::num_predict("I have teh cat") as i64);
+        assert!(long > 3 * short, "short {} long {}", short, long);
+        // Ollama ignores max_tokens, so it must not be what bounds generation
+        assert!(options[0].get("max_tokens").is_none());
+
+        let stops: Vec<&str> = options[0]["stop"].as_array().unwrap().iter().filter_map(|s| s.as_str()).collect();
+        // Models often open with a blank line or "Corrected version:", so neither may stop them
+        assert_eq!(stops, vec!["Correct the spelling and grammar:"]);
+
+        // Short and long inputs get different, fixed context sizes
+        assert_eq!(options[0]["num_ctx"], generation::CONTEXT_BUCKETS[0]);
+        assert_eq!(options[1]["num_ctx"], generation::CONTEXT_BUCKETS[0]);
+        let longer = "I have teh cat and it is realy a very nice cat indeed. ".repeat(40);
+        model.generate(longer.trim()).unwrap();
+        let num_ctx = server.requests()[2].json()["options"]["num_ctx"].as_i64().unwrap();
+        assert!(num_ctx > generation::CONTEXT_BUCKETS[0] as i64);
+        assert!(generation::CONTEXT_BUCKETS.contains(&(num_ctx as i32)));
+    }
+
+    #[test]
+    fn test_instruction_sent_as_fixed_prefix() {
+        let server = ollama_mock("I have the cat");
+        let mut model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        model.generate("I have teh cat").unwrap();
+        model.generate("I saw teh box").unwrap();
+        model.set_prefix_reuse(false);
+        model.generate("I have teh cat").unwrap();
+        
+        let requests: Vec<serde_json::Value> = server.requests().iter().map(|r| r.json()).collect();
+        // Every request shares the same system prompt and only the text changes
+        assert_eq!(requests[0]["system"], "Correct the spelling and grammar:");
+        assert_eq!(requests[0]["system"], requests[1]["system"]);
+        assert_eq!(requests[0]["prompt"], "I have teh cat\n\nCorrected version:");
+        
+        assert!(requests[2].get("system").is_none());
+        assert_eq!(requests[2]["prompt"], PROMPT_TEMPLATE.replace("{text}", "I have teh cat"));
+    }
+    
+    #[test]
+    fn test_custom_prompt_template() {
+        let server = ollama_mock("I have the cat");
+        let mut model = LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap();
+        let fingerprint = model.prompt_fingerprint();
+        assert!(model.set_prompt_template(Some("Fix the typos")).is_err());
+        
+        model.set_prompt_template(Some("Fix the typos:\n{text}\nFixed:")).unwrap();
+        assert_ne!(model.prompt_fingerprint(), fingerprint);
+        model.generate("I have teh cat").unwrap();
+        let request = server.requests()[0].json();
+        assert_eq!(request["system"], "Fix the typos:");
+        assert_eq!(request["prompt"], "I have teh cat\nFixed:");
+        let stops: Vec<&str> = request["options"]["stop"].as_array().unwrap().iter().filter_map(|s| s.as_str()).collect();
+        assert_eq!(stops, vec!["Fix the typos:"]);
+        
+        model.set_prompt_template(None).unwrap();
+        assert_eq!(model.prompt_fingerprint(), fingerprint);
+    }
+    
     #[test]
     fn test_generate_correction_without_model() {
         // Test when no model is loaded
-        let mut model = None;
-        let result = generate_correction("test text", &mut model);
+        let model = None;
+        let result = generate_correction("test text", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, None, None);
         assert!(result.is_err());
         assert_eq!(result.unwrap_err().to_string(), "Model not loaded");
     }
 
+    #[test]
+    fn test_generate_correction_uses_cache() {
+        let server = ollama_mock("I met the Qwzx twins");
+        let model = Some(LlamaModelWrapper::with_endpoint(&server.url(), "phi:2.7b").unwrap());
+        
+        let first = generate_correction("I met teh Qwzx twins", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, None, None).unwrap();
+        let requests_after_first = server.request_count();
+        
+        let start = Instant::now();
+        let second = generate_correction("  I met teh   Qwzx twins ", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, None, None).unwrap();
+        let elapsed = start.elapsed();
+        
+        assert_eq!(first, "I met the Qwzx twins");
+        assert_eq!(second, first);
+        assert_eq!(server.request_count(), requests_after_first);
+        assert!(elapsed < Duration::from_millis(5), "cache hit took {:?}", elapsed);
+    }
+
+    #[test]
+    fn test_fallback_to_original_is_not_cached() {
+        // An empty answer leaves the text as it was, which is not a correction worth keeping
+        let server = ollama_mock("");
+        let model = Some(LlamaModelWrapper::with_endpoint(&server.url(), "fallback-test").unwrap());
+        
+        let first = generate_correction("I met teh Qwzx cousins", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, None, None).unwrap();
+        let requests_after_first = server.request_count();
+        let second = generate_correction("I met teh Qwzx cousins", model.as_ref(), None, DEFAULT_ESCALATION_THRESHOLD, None, None).unwrap();
+        
+        assert_eq!(first, "I met teh Qwzx cousins");
+        assert_eq!(second, first);
+        assert!(server.request_count() > requests_after_first);
+    }
+
     #[test]
     fn test_clean_response() {
         let (_temp_dir, model_path) = create_temp_model_file();
@@ -267,6 +1645,13 @@ mod tests {
         let long_response = "a".repeat(1000);
         let cleaned = model.clean_response(&long_response, "short");
         assert_eq!(cleaned, "short");
+        
+        // Nothing stops the server at a blank line, so the answer may run on after its first line
+        let cleaned = model.clean_response(
+            "\n\nCorrected version:\nThe cat is here\n\nI changed \"teh\" to \"the\", which is the correct spelling.",
+            "teh cat is here",
+        );
+        assert_eq!(cleaned, "The cat is here");
     }
 
     #[test]
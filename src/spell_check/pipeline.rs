@@ -0,0 +1,648 @@
+use once_cell::sync::Lazy;
+use std::fmt;
+use std::sync::Mutex;
+use std::time::{Duration, Instant};
+use tracing::{debug, info, warn};
+
+use crate::cancel::{CancellationToken, Cancelled};
+
+use super::breaker::CircuitOpen;
+use super::cache::{CacheKey, CORRECTION_CACHE};
+use super::disk_cache::disk_cache;
+use super::lexicon::LEXICON;
+use super::symspell::{match_case, tokenize, DICTIONARY};
+use super::LlamaModelWrapper;
+
+/// Tiers answering with at least this confidence end the pipeline
+pub const DEFAULT_ESCALATION_THRESHOLD: f32 = 0.8;
+
+/// Per-tier counters across all hotkey presses
+pub static PIPELINE_STATS: Lazy<PipelineStats> = Lazy::new(PipelineStats::default);
+
+/// Contractions typed without the apostrophe, where the bare form is not a word
+const CONTRACTIONS: [(&str, &str); 17] = [
+    ("dont", "don't"),
+    ("doesnt", "doesn't"),
+    ("didnt", "didn't"),
+    ("isnt", "isn't"),
+    ("wasnt", "wasn't"),
+    ("arent", "aren't"),
+    ("werent", "weren't"),
+    ("havent", "haven't"),
+    ("hasnt", "hasn't"),
+    ("hadnt", "hadn't"),
+    ("couldnt", "couldn't"),
+    ("wouldnt", "wouldn't"),
+    ("shouldnt", "shouldn't"),
+    ("im", "I'm"),
+    ("ive", "I've"),
+    ("youre", "you're"),
+    ("theyre", "they're"),
+];
+
+/// Words that are legitimately doubled ("I had had enough")
+const ALLOWED_REPEATS: [&str; 2] = ["had", "that"];
+
+/// The latency budget ran out before any tier gave a confident answer
+#[derive(Debug)]
+pub struct BudgetExceeded;
+
+impl fmt::Display for BudgetExceeded {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        write!(f, "Latency budget exceeded")
+    }
+}
+
+impl std::error::Error for BudgetExceeded {}
+
+/// A tier's corrected text and how sure it is that nothing is left to fix
+#[derive(Clone, Debug, PartialEq)]
+pub struct TierOutcome {
+    pub text: String,
+    pub confidence: f32,
+}
+
+/// One stage of the correction pipeline, from cheapest to most expensive
+pub trait CorrectionTier {
+    /// Stable name used in stats and logs
+    fn name(&self) -> &'static str;
+
+    /// Correct `text`, or `Ok(None)` when this tier has nothing to add.
+    ///
+    /// Tiers that cannot answer before `deadline` return `BudgetExceeded`.
+    fn correct(&mut self, text: &str, deadline: Option<Instant>) -> Result<Option<TierOutcome>, Box<dyn std::error::Error>>;
+
+    /// Whether an answer below the threshold may still be used when no tier is
+    /// confident. Cheap tiers leave unsure text unchanged; a model rewrites the
+    /// whole text and its confidence is only a heuristic, so its answer stands.
+    fn usable_below_threshold(&self) -> bool {
+        false
+    }
+}
+
+/// Deterministic fixes: standalone "i", doubled words and missing apostrophes
+pub struct RulesTier;
+
+impl CorrectionTier for RulesTier {
+    fn name(&self) -> &'static str {
+        "rules"
+    }
+
+    fn correct(&mut self, text: &str, _deadline: Option<Instant>) -> Result<Option<TierOutcome>, Box<dyn std::error::Error>> {
+        let fixed = apply_rules(text);
+        if fixed == text {
+            return Ok(None);
+        }
+        let confidence = if unknown_words(&fixed, text) == 0 { 0.9 } else { 0.3 };
+        Ok(Some(TierOutcome { text: fixed, confidence }))
+    }
+}
+
+fn apply_rules(text: &str) -> String {
+    let mut tokens: Vec<String> = Vec::new();
+    let mut previous_word: Option<String> = None;
+
+    for (is_word, token) in tokenize(text) {
+        if !is_word {
+            tokens.push(token.to_string());
+            continue;
+        }
+
+        let lower = token.to_lowercase().replace('’', "'");
+        let separated_by_space = tokens.last().is_some_and(|t| t.chars().all(char::is_whitespace));
+        if separated_by_space
+            && previous_word.as_deref() == Some(lower.as_str())
+            && !ALLOWED_REPEATS.contains(&lower.as_str())
+        {
+            tokens.pop();
+            continue;
+        }
+
+        let fixed = if lower == "i" || lower.starts_with("i'") {
+            let mut chars = token.chars();
+            chars.next().map(|first| first.to_uppercase().chain(chars).collect()).unwrap_or_default()
+        } else if let Some((_, contraction)) = CONTRACTIONS.iter().find(|(bare, _)| *bare == lower) {
+            match_case(token, contraction)
+        } else {
+            token.to_string()
+        };
+        tokens.push(fixed);
+        previous_word = Some(lower);
+    }
+
+    tokens.concat()
+}
+
+/// Words in `output` neither dictionary knows, ignoring capitalised names carried over from `input`
+fn unknown_words(output: &str, input: &str) -> usize {
+    tokenize(output)
+        .into_iter()
+        .filter(|(is_word, _)| *is_word)
+        .map(|(_, word)| word)
+        .filter(|word| !DICTIONARY.is_known(word) && !LEXICON.is_known(word))
+        .filter(|word| !(word.starts_with(char::is_uppercase) && input.contains(word)))
+        .count()
+}
+
+/// Symmetric-delete dictionary corrector
+pub struct DictionaryTier;
+
+impl CorrectionTier for DictionaryTier {
+    fn name(&self) -> &'static str {
+        "dictionary"
+    }
+
+    fn correct(&mut self, text: &str, _deadline: Option<Instant>) -> Result<Option<TierOutcome>, Box<dyn std::error::Error>> {
+        let scored = DICTIONARY.correct_scored(text);
+        if scored.text == text {
+            return Ok(None);
+        }
+        Ok(Some(TierOutcome { text: scored.text, confidence: scored.confidence }))
+    }
+}
+
+/// An Ollama model behind the correction caches
+pub struct LlmTier<'a> {
+    name: &'static str,
+    model: &'a LlamaModelWrapper,
+    cancel: Option<CancellationToken>,
+}
+
+impl<'a> LlmTier<'a> {
+    pub fn new(name: &'static str, model: &'a LlamaModelWrapper) -> Self {
+        Self { name, model, cancel: None }
+    }
+
+    /// Drop the model request as soon as `cancel` fires
+    pub fn with_cancellation(mut self, cancel: Option<CancellationToken>) -> Self {
+        self.cancel = cancel;
+        self
+    }
+}
+
+impl CorrectionTier for LlmTier<'_> {
+    fn name(&self) -> &'static str {
+        self.name
+    }
+
+    fn usable_below_threshold(&self) -> bool {
+        true
+    }
+
+    fn correct(&mut self, text: &str, deadline: Option<Instant>) -> Result<Option<TierOutcome>, Box<dyn std::error::Error>> {
+        let key = CacheKey::new(text, self.model.model_name(), self.model.prompt_fingerprint());
+        let corrected = if let Some(corrected) = CORRECTION_CACHE.get(&key) {
+            let stats = CORRECTION_CACHE.stats();
+            info!("Cache hit: '{}' (hit rate {:.0}%)", corrected, stats.hit_rate() * 100.0);
+            corrected
+        } else if let Some(corrected) = disk_cache().and_then(|cache| cache.get(&key)) {
+            info!("Disk cache hit: '{}'", corrected);
+            CORRECTION_CACHE.insert(key, corrected.clone());
+            corrected
+        } else {
+            let timeout = match deadline {
+                Some(deadline) => {
+                    let remaining = deadline.saturating_duration_since(Instant::now());
+                    // Skip a model whose recent answers would not fit in the time left,
+                    // unless it is due a probe to refresh that estimate
+                    if self.model.recent_latency().is_some_and(|latency| latency > remaining) && !self.model.claim_latency_probe() {
+                        debug!("Skipping {}: recent latency {:?} over remaining {:?}", self.model.model_name(), self.model.recent_latency(), remaining);
+                        return Err(BudgetExceeded.into());
+                    }
+                    Some(remaining)
+                }
+                None => None,
+            };
+            let generation = self.model.generate_cancellable(text, timeout, self.cancel.as_ref())?;
+            let corrected = generation.text.clone();
+            // A standby's answer should not stand in for this model's in the cache, and
+            // an unchanged text may be the model falling back rather than a correction
+            if !generation.from_standby() && corrected != text {
+                if let Some(cache) = disk_cache() {
+                    if let Err(e) = cache.insert(&key, &corrected) {
+                        warn!("Could not persist correction: {}", e);
+                    }
+                }
+                CORRECTION_CACHE.insert(key, corrected.clone());
+                debug!("Correction cache: {:?}", CORRECTION_CACHE.stats());
+            }
+            corrected
+        };
+
+        // Without token probabilities, judge the output by whether its words are known
+        let confidence = match unknown_words(&corrected, text) {
+            0 => 0.95,
+            1 => 0.6,
+            _ => 0.3,
+        };
+        Ok(Some(TierOutcome { text: corrected, confidence }))
+    }
+}
+
+/// Final text of a pipeline run
+#[derive(Clone, Debug, PartialEq)]
+pub struct PipelineResult {
+    pub text: String,
+    pub confidence: f32,
+    /// Tier whose answer was used, or `None` if no tier changed the text
+    pub tier: Option<&'static str>,
+    /// Whether the answer reached the escalation threshold
+    pub confident: bool,
+    /// Whether a tier was skipped or cut short by the deadline
+    pub budget_exhausted: bool,
+    /// Whether a model tier was skipped because its server is down
+    pub unavailable: bool,
+    /// Whether the run was cancelled before a confident answer
+    pub cancelled: bool,
+}
+
+/// Runs tiers in order, escalating while confidence stays below the threshold.
+///
+/// Every tier works on the original text: an unsure rewrite ("the wolf howled"
+/// as "the golf howled") is never handed on. If no tier is confident, the most
+/// confident model answer wins, preferring later tiers on ties, and without
+/// one the original text is kept.
+pub struct CorrectionPipeline<'a> {
+    tiers: Vec<Box<dyn CorrectionTier + 'a>>,
+    threshold: f32,
+    deadline: Option<Instant>,
+    cancel: Option<CancellationToken>,
+}
+
+impl<'a> CorrectionPipeline<'a> {
+    pub fn new(threshold: f32) -> Self {
+        Self {
+            tiers: Vec::new(),
+            threshold,
+            deadline: None,
+            cancel: None,
+        }
+    }
+
+    /// Stop escalating once `cancel` fires
+    pub fn with_cancellation(mut self, cancel: Option<CancellationToken>) -> Self {
+        self.cancel = cancel;
+        self
+    }
+
+    /// Stop escalating at `deadline`, skipping tiers too slow to finish by then
+    pub fn with_deadline(mut self, deadline: Option<Instant>) -> Self {
+        self.deadline = deadline;
+        self
+    }
+
+    /// Append a tier; tiers run in the order they are added
+    pub fn with_tier(mut self, tier: impl CorrectionTier + 'a) -> Self {
+        self.tiers.push(Box::new(tier));
+        self
+    }
+
+    pub fn run(&mut self, text: &str) -> PipelineResult {
+        PIPELINE_STATS.record_press();
+        let mut best = PipelineResult {
+            text: text.to_string(),
+            confidence: 0.0,
+            tier: None,
+            confident: false,
+            budget_exhausted: false,
+            unavailable: false,
+            cancelled: false,
+        };
+        let mut unavailable = false;
+
+        for tier in &mut self.tiers {
+            let name = tier.name();
+            let start = Instant::now();
+            if self.deadline.is_some_and(|deadline| start >= deadline) {
+                debug!("Deadline passed before tier {}", name);
+                best.budget_exhausted = true;
+                break;
+            }
+            if self.cancel.as_ref().is_some_and(|cancel| cancel.is_cancelled()) {
+                debug!("Cancelled before tier {}", name);
+                best.cancelled = true;
+                break;
+            }
+            let outcome = tier.correct(text, self.deadline);
+            let elapsed = start.elapsed();
+
+            match outcome {
+                Ok(Some(outcome)) => {
+                    debug!("Tier {} answered in {:?} with confidence {:.2}", name, elapsed, outcome.confidence);
+                    let accepted = outcome.confidence >= self.threshold;
+                    PIPELINE_STATS.record(name, elapsed, if accepted { TierResult::Accepted } else { TierResult::Escalated });
+                    let usable = accepted || tier.usable_below_threshold();
+                    if usable && outcome.confidence >= best.confidence {
+                        best = PipelineResult {
+                            text: outcome.text,
+                            confidence: outcome.confidence,
+                            tier: Some(name),
+                            confident: accepted,
+                            budget_exhausted: false,
+                            unavailable: false,
+                            cancelled: false,
+                        };
+                    }
+                    if accepted {
+                        break;
+                    }
+                }
+                Ok(None) => PIPELINE_STATS.record(name, elapsed, TierResult::Escalated),
+                Err(e) if e.is::<BudgetExceeded>() => {
+                    debug!("Tier {} ran out of budget after {:?}", name, elapsed);
+                    PIPELINE_STATS.record(name, elapsed, TierResult::Skipped);
+                    best.budget_exhausted = true;
+                }
+                Err(e) if e.is::<Cancelled>() => {
+                    debug!("Tier {} cancelled after {:?}", name, elapsed);
+                    PIPELINE_STATS.record(name, elapsed, TierResult::Skipped);
+                    best.cancelled = true;
+                    break;
+                }
+                Err(e) if e.is::<CircuitOpen>() => {
+                    debug!("Tier {} skipped, server unavailable", name);
+                    PIPELINE_STATS.record(name, elapsed, TierResult::Skipped);
+                    unavailable = true;
+                }
+                Err(e) => {
+                    warn!("Tier {} failed after {:?}: {}", name, elapsed, e);
+                    PIPELINE_STATS.record(name, elapsed, TierResult::Failed);
+                }
+            }
+        }
+
+        info!("Pipeline: {}", PIPELINE_STATS.summary());
+        best.unavailable = unavailable;
+        best
+    }
+}
+
+#[derive(Clone, Copy, Debug, PartialEq)]
+enum TierResult {
+    Accepted,
+    Escalated,
+    Skipped,
+    Failed,
+}
+
+/// Counters for one tier
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct TierStats {
+    pub name: &'static str,
+    /// Presses that reached this tier
+    pub runs: u64,
+    /// Presses this tier answered confidently
+    pub accepted: u64,
+    pub escalated: u64,
+    /// Runs that did not fit in the latency budget
+    pub skipped: u64,
+    pub errors: u64,
+    pub total_latency: Duration,
+}
+
+impl TierStats {
+    /// Fraction of runs this tier answered without escalating
+    pub fn hit_rate(&self) -> f64 {
+        if self.runs == 0 {
+            0.0
+        } else {
+            self.accepted as f64 / self.runs as f64
+        }
+    }
+
+    pub fn mean_latency(&self) -> Duration {
+        if self.runs == 0 {
+            Duration::ZERO
+        } else {
+            self.total_latency / self.runs as u32
+        }
+    }
+}
+
+/// Per-tier hit rates and latencies, in the order tiers first ran
+#[derive(Default)]
+pub struct PipelineStats {
+    inner: Mutex<(u64, Vec<TierStats>)>,
+}
+
+impl PipelineStats {
+    fn record_press(&self) {
+        self.inner.lock().unwrap().0 += 1;
+    }
+
+    fn record(&self, name: &'static str, latency: Duration, result: TierResult) {
+        let mut inner = self.inner.lock().unwrap();
+        let tiers = &mut inner.1;
+        let index = match tiers.iter().position(|tier| tier.name == name) {
+            Some(index) => index,
+            None => {
+                tiers.push(TierStats { name, ..TierStats::default() });
+                tiers.len() - 1
+            }
+        };
+        let tier = &mut tiers[index];
+        tier.runs += 1;
+        tier.total_latency += latency;
+        match result {
+            TierResult::Accepted => tier.accepted += 1,
+            TierResult::Escalated => tier.escalated += 1,
+            TierResult::Skipped => tier.skipped += 1,
+            TierResult::Failed => tier.errors += 1,
+        }
+    }
+
+    /// Number of pipeline runs
+    pub fn presses(&self) -> u64 {
+        self.inner.lock().unwrap().0
+    }
+
+    pub fn tiers(&self) -> Vec<TierStats> {
+        self.inner.lock().unwrap().1.clone()
+    }
+
+    /// One-line report, e.g. `rules 2/10 reached, 50% hit, 12µs avg | ...`
+    pub fn summary(&self) -> String {
+        let presses = self.presses();
+        self.tiers()
+            .iter()
+            .map(|tier| {
+                format!(
+                    "{} {}/{} reached, {:.0}% hit, {:?} avg",
+                    tier.name,
+                    tier.runs,
+                    presses,
+                    tier.hit_rate() * 100.0,
+                    tier.mean_latency()
+                )
+            })
+            .collect::<Vec<_>>()
+            .join(" | ")
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    /// Tier returning a fixed answer, counting its calls
+    struct FixedTier {
+        name: &'static str,
+        answer: Option<(&'static str, f32)>,
+        calls: usize,
+        seen: Vec<String>,
+        usable: bool,
+    }
+
+    impl FixedTier {
+        fn new(name: &'static str, answer: Option<(&'static str, f32)>) -> Self {
+            Self { name, answer, calls: 0, seen: Vec::new(), usable: false }
+        }
+
+        /// Like a model: its answer stands even below the threshold
+        fn usable(mut self) -> Self {
+            self.usable = true;
+            self
+        }
+    }
+
+    impl CorrectionTier for &mut FixedTier {
+        fn name(&self) -> &'static str {
+            self.name
+        }
+
+        fn correct(&mut self, text: &str, _deadline: Option<Instant>) -> Result<Option<TierOutcome>, Box<dyn std::error::Error>> {
+            self.calls += 1;
+            self.seen.push(text.to_string());
+            match self.answer {
+                Some(("error", _)) => Err("tier down".into()),
+                Some(("over budget", _)) => Err(BudgetExceeded.into()),
+                Some((text, confidence)) => Ok(Some(TierOutcome { text: text.to_string(), confidence })),
+                None => Ok(None),
+            }
+        }
+
+        fn usable_below_threshold(&self) -> bool {
+            self.usable
+        }
+    }
+
+    #[test]
+    fn test_rules() {
+        assert_eq!(apply_rules("i think i'm right"), "I think I'm right");
+        assert_eq!(apply_rules("I dont know"), "I don't know");
+        assert_eq!(apply_rules("Dont go to the the shop"), "Don't go to the shop");
+        assert_eq!(apply_rules("I had had enough"), "I had had enough");
+        assert_eq!(apply_rules("the. The end"), "the. The end");
+        assert_eq!(apply_rules("im here"), "I'm here");
+    }
+
+    #[test]
+    fn test_stops_at_first_confident_tier() {
+        let mut cheap = FixedTier::new("test-cheap", Some(("fixed", 0.9)));
+        let mut slow = FixedTier::new("test-slow", Some(("slow", 0.99)));
+        let result = CorrectionPipeline::new(0.8).with_tier(&mut cheap).with_tier(&mut slow).run("fxied");
+
+        assert_eq!(result.text, "fixed");
+        assert_eq!(result.tier, Some("test-cheap"));
+        assert!(result.confident);
+        assert_eq!(slow.calls, 0);
+    }
+
+    #[test]
+    fn test_escalates_below_threshold() {
+        let mut unsure = FixedTier::new("test-unsure", Some(("maybe", 0.5)));
+        let mut failing = FixedTier::new("test-failing", Some(("error", 0.0)));
+        let mut silent = FixedTier::new("test-silent", None);
+        let result = CorrectionPipeline::new(0.8)
+            .with_tier(&mut unsure)
+            .with_tier(&mut failing)
+            .with_tier(&mut silent)
+            .run("mabye");
+
+        // Nobody was confident and no model answered: the original text is kept
+        assert_eq!(result.text, "mabye");
+        assert_eq!(result.tier, None);
+        assert!(!result.confident);
+        assert_eq!((failing.calls, silent.calls), (1, 1));
+        // The unsure rewrite was not handed on
+        assert_eq!(silent.seen, vec!["mabye"]);
+
+        let stats = PIPELINE_STATS.tiers();
+        let failing = stats.iter().find(|tier| tier.name == "test-failing").unwrap();
+        assert_eq!(failing.errors, 1);
+        let unsure = stats.iter().find(|tier| tier.name == "test-unsure").unwrap();
+        assert_eq!(unsure.escalated, 1);
+        assert_eq!(unsure.hit_rate(), 0.0);
+    }
+
+    #[test]
+    fn test_unsure_model_answer_beats_original() {
+        let mut dictionary = FixedTier::new("test-unsure-dictionary", Some(("the golf howled", 0.2)));
+        let mut model = FixedTier::new("test-unsure-model", Some(("the wolf howled!", 0.6))).usable();
+        let result = CorrectionPipeline::new(0.8).with_tier(&mut dictionary).with_tier(&mut model).run("the wolf howled");
+        assert_eq!(model.seen, vec!["the wolf howled"]);
+        assert_eq!(result.text, "the wolf howled!");
+        assert_eq!(result.tier, Some("test-unsure-model"));
+        assert!(!result.confident);
+
+        // If the model fails, the unsure rewrite is still not used
+        let mut dictionary = FixedTier::new("test-unsure-dictionary", Some(("the golf howled", 0.2)));
+        let mut model = FixedTier::new("test-unsure-model", Some(("error", 0.0))).usable();
+        let result = CorrectionPipeline::new(0.8).with_tier(&mut dictionary).with_tier(&mut model).run("the wolf howled");
+        assert_eq!(result.text, "the wolf howled");
+        assert_eq!(result.tier, None);
+    }
+
+    #[test]
+    fn test_deadline_stops_escalation() {
+        let mut unsure = FixedTier::new("test-deadline-unsure", Some(("maybe", 0.5)));
+        let mut slow = FixedTier::new("test-deadline-slow", Some(("over budget", 0.0)));
+        let result = CorrectionPipeline::new(0.8)
+            .with_deadline(Some(Instant::now() + Duration::from_secs(60)))
+            .with_tier(&mut unsure)
+            .with_tier(&mut slow)
+            .run("mabye");
+        assert!(result.budget_exhausted);
+        assert!(!result.confident);
+        let stats = PIPELINE_STATS.tiers();
+        assert_eq!(stats.iter().find(|tier| tier.name == "test-deadline-slow").unwrap().skipped, 1);
+
+        // Past the deadline no tier runs at all
+        let mut never = FixedTier::new("test-deadline-never", Some(("fixed", 0.9)));
+        let result = CorrectionPipeline::new(0.8)
+            .with_deadline(Some(Instant::now()))
+            .with_tier(&mut never)
+            .run("fxied");
+        assert_eq!(never.calls, 0);
+        assert_eq!(result.text, "fxied");
+        assert!(result.budget_exhausted);
+    }
+
+    #[test]
+    fn test_builtin_tiers() {
+        let result = CorrectionPipeline::new(DEFAULT_ESCALATION_THRESHOLD)
+            .with_tier(RulesTier)
+            .with_tier(DictionaryTier)
+            .run("I don't beleive teh news");
+        assert_eq!(result.text, "I don't believe the news");
+        assert_eq!(result.tier, Some("dictionary"));
+        assert!(result.confident);
+
+        // Each tier is only partly sure, and neither sees the other's partial fix
+        let result = CorrectionPipeline::new(DEFAULT_ESCALATION_THRESHOLD)
+            .with_tier(RulesTier)
+            .with_tier(DictionaryTier)
+            .run("i dont beleive teh qwzx");
+        assert_eq!(result.text, "i dont beleive teh qwzx");
+        assert_eq!(result.tier, None);
+
+        // Nothing the cheap tiers can settle
+        let result = CorrectionPipeline::new(DEFAULT_ESCALATION_THRESHOLD)
+            .with_tier(RulesTier)
+            .with_tier(DictionaryTier)
+            .run("the qwzx cat");
+        assert_eq!(result.tier, None);
+        assert!(!result.confident);
+        assert!(PIPELINE_STATS.summary().contains("dictionary"));
+    }
+}
@@ -0,0 +1,205 @@
+use reqwest::Client;
+use std::sync::{Arc, Mutex, Weak};
+use std::time::{Duration, Instant};
+use tracing::{debug, info, warn};
+
+use super::backend::{CorrectionBackend, GenerationOptions};
+use super::generation::CONTEXT_BUCKETS;
+use super::runtime::shared_runtime;
+
+/// Seconds the server keeps the model loaded after each request
+pub const DEFAULT_KEEP_ALIVE_SECS: i64 = 30 * 60;
+
+/// A load longer than this means the model had been evicted; warm loads take a few ms
+const COLD_LOAD_THRESHOLD: Duration = Duration::from_millis(250);
+
+/// Keep-alive pings are only sent if a correction ran this recently
+const ACTIVE_WINDOW: Duration = Duration::from_secs(10 * 60);
+
+/// Preloading can include reading gigabytes from disk
+const PRELOAD_TIMEOUT: Duration = Duration::from_secs(120);
+
+/// Cold and warm load counters for one model
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub struct ResidencyStats {
+    pub preloads: u64,
+    pub pings: u64,
+    /// Responses that reported a load time
+    pub timed_responses: u64,
+    pub cold_loads: u64,
+    pub last_load: Option<Duration>,
+}
+
+struct ResidencyState {
+    stats: ResidencyStats,
+    last_active: Option<Instant>,
+}
+
+/// Keeps a model resident on the server: preloading, keep-alive pings and cold-load tracking.
+///
+/// Shared with background tasks, so preloads and pings never hold the model lock.
+pub struct Residency {
+    client: Client,
+    backend: Arc<dyn CorrectionBackend>,
+    urls: Vec<String>,
+    model_name: String,
+    state: Mutex<ResidencyState>,
+}
+
+impl Residency {
+    pub fn new(client: Client, backend: Arc<dyn CorrectionBackend>, urls: Vec<String>, model_name: &str) -> Arc<Self> {
+        Arc::new(Self {
+            client,
+            backend,
+            urls,
+            model_name: model_name.to_string(),
+            state: Mutex::new(ResidencyState {
+                stats: ResidencyStats::default(),
+                last_active: None,
+            }),
+        })
+    }
+
+    pub fn stats(&self) -> ResidencyStats {
+        self.state.lock().unwrap().stats
+    }
+
+    /// Note that the user just asked for a correction
+    pub fn touch(&self) {
+        self.state.lock().unwrap().last_active = Some(Instant::now());
+    }
+
+    /// Count a reported load time, flagging loads slow enough to be cold
+    pub fn record_load(&self, load: Duration) {
+        let mut state = self.state.lock().unwrap();
+        state.stats.timed_responses += 1;
+        state.stats.last_load = Some(load);
+        if load >= COLD_LOAD_THRESHOLD {
+            state.stats.cold_loads += 1;
+            warn!(
+                "🧊 Cold load of {} took {:?} ({} cold loads so far)",
+                self.model_name, load, state.stats.cold_loads
+            );
+        }
+    }
+
+    /// Load the model on every endpoint without generating.
+    ///
+    /// Returns the longest load time reported, or `None` if the driver cannot preload.
+    pub async fn preload(&self, keep_alive: Option<i64>) -> Result<Option<Duration>, Box<dyn std::error::Error>> {
+        if self.backend.preload_request(&self.model_name, &load_options(keep_alive)).is_none() {
+            return Ok(None);
+        }
+        let start = Instant::now();
+        let load = self.load(keep_alive).await?;
+        self.state.lock().unwrap().stats.preloads += 1;
+        info!("🔥 Preloaded {} in {:?}", self.model_name, start.elapsed());
+        Ok(load)
+    }
+
+    async fn load(&self, keep_alive: Option<i64>) -> Result<Option<Duration>, Box<dyn std::error::Error>> {
+        let Some((path, body)) = self.backend.preload_request(&self.model_name, &load_options(keep_alive)) else {
+            return Ok(None);
+        };
+        let mut longest: Option<Duration> = None;
+        for url in &self.urls {
+            let response = self.client
+                .post(format!("{}{}", url, path))
+                .json(&body)
+                .timeout(PRELOAD_TIMEOUT)
+                .send()
+                .await?;
+            if !response.status().is_success() {
+                return Err(format!("Preloading {} failed: {}", self.model_name, response.status()).into());
+            }
+            let body = response.bytes().await?;
+            if let Some(load) = self.backend.timings(&body).and_then(|timings| timings.load) {
+                self.record_load(load);
+                longest = Some(longest.map_or(load, |longest| longest.max(load)));
+            }
+        }
+        Ok(longest)
+    }
+
+    /// Re-send the preload every `interval` while the user is active, so the
+    /// model is not evicted between bursts of corrections.
+    ///
+    /// The task only holds a weak reference, so it stops once the model is dropped.
+    pub fn spawn_pings(self: &Arc<Self>, interval: Duration, keep_alive: Option<i64>) {
+        let residency: Weak<Self> = Arc::downgrade(self);
+        shared_runtime().spawn(async move {
+            loop {
+                tokio::time::sleep(interval).await;
+                let Some(residency) = residency.upgrade() else { return };
+                let active = residency.state.lock().unwrap().last_active
+                    .is_some_and(|active| active.elapsed() < ACTIVE_WINDOW);
+                if !active {
+                    continue;
+                }
+                match residency.load(keep_alive).await {
+                    Ok(_) => residency.state.lock().unwrap().stats.pings += 1,
+                    Err(e) => debug!("Keep-alive ping failed: {}", e),
+                }
+            }
+        });
+    }
+}
+
+/// Loads use the smallest context bucket, which fits most presses, so the
+/// first correction does not have to load the model again at another size
+fn load_options(keep_alive: Option<i64>) -> GenerationOptions {
+    GenerationOptions {
+        keep_alive,
+        num_ctx: Some(CONTEXT_BUCKETS[0]),
+        ..GenerationOptions::default()
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use super::super::backend::{LlamaCppBackend, OllamaBackend};
+    use super::super::runtime::build_http_client;
+    use super::super::test_server::{MockResponse, MockServer};
+
+    #[test]
+    fn test_record_load() {
+        let residency = Residency::new(build_http_client().unwrap(), Arc::new(OllamaBackend), Vec::new(), "phi");
+        residency.record_load(Duration::from_millis(3));
+        residency.record_load(Duration::from_secs(2));
+        let stats = residency.stats();
+        assert_eq!((stats.timed_responses, stats.cold_loads), (2, 1));
+        assert_eq!(stats.last_load, Some(Duration::from_secs(2)));
+    }
+
+    #[test]
+    fn test_preload_unsupported_driver() {
+        let residency = Residency::new(
+            build_http_client().unwrap(), Arc::new(LlamaCppBackend), vec!["http://127.0.0.1:9".to_string()], "any",
+        );
+        assert_eq!(shared_runtime().block_on(residency.preload(None)).unwrap(), None);
+    }
+
+    #[test]
+    fn test_pings_only_while_active() {
+        let server = MockServer::start(|_| {
+            MockResponse::json(serde_json::json!({ "response": "", "done": true, "load_duration": 2_000_000 }))
+        });
+        let residency = Residency::new(build_http_client().unwrap(), Arc::new(OllamaBackend), vec![server.url()], "phi");
+        residency.spawn_pings(Duration::from_millis(20), Some(600));
+
+        std::thread::sleep(Duration::from_millis(80));
+        assert_eq!(server.request_count(), 0);
+
+        residency.touch();
+        let deadline = Instant::now() + Duration::from_secs(2);
+        while residency.stats().pings == 0 && Instant::now() < deadline {
+            std::thread::sleep(Duration::from_millis(5));
+        }
+        assert!(residency.stats().pings >= 1);
+        let ping = server.requests().remove(0).json();
+        assert_eq!((ping["prompt"].as_str(), ping["keep_alive"].as_i64()), (Some(""), Some(600)));
+        assert_eq!(ping["options"]["num_ctx"], CONTEXT_BUCKETS[0]);
+        assert_eq!(residency.stats().cold_loads, 0);
+    }
+}
@@ -0,0 +1,67 @@
+use once_cell::sync::Lazy;
+use reqwest::Client;
+use std::time::Duration;
+use tokio::runtime::Runtime;
+
+/// How long we wait for the TCP handshake with the inference server
+pub const CONNECT_TIMEOUT: Duration = Duration::from_secs(2);
+
+/// Upper bound for a whole request, including a cold model load on the server
+pub const REQUEST_TIMEOUT: Duration = Duration::from_secs(30);
+
+/// How long an idle pooled connection is kept open between hotkey presses
+pub const POOL_IDLE_TIMEOUT: Duration = Duration::from_secs(90);
+
+/// TCP keep-alive interval for pooled connections
+pub const TCP_KEEPALIVE: Duration = Duration::from_secs(60);
+
+/// Process-wide async runtime shared by all inference requests.
+///
+/// Building a multi-threaded runtime per request spins up a worker pool on the
+/// hotkey path and throws away every pooled connection when it is dropped, so we
+/// keep a single small runtime alive for the lifetime of the process.
+static RUNTIME: Lazy<Runtime> = Lazy::new(|| {
+    tokio::runtime::Builder::new_multi_thread()
+        .worker_threads(2)
+        .thread_name("typofixer-rt")
+        .enable_all()
+        .build()
+        .expect("failed to build the shared tokio runtime")
+});
+
+/// Get the shared runtime used for inference requests
+pub fn shared_runtime() -> &'static Runtime {
+    &RUNTIME
+}
+
+/// Build an HTTP client tuned for many small requests to a local server
+pub fn build_http_client() -> Result<Client, reqwest::Error> {
+    Client::builder()
+        .tcp_nodelay(true)
+        .tcp_keepalive(TCP_KEEPALIVE)
+        .pool_idle_timeout(POOL_IDLE_TIMEOUT)
+        .pool_max_idle_per_host(4)
+        .connect_timeout(CONNECT_TIMEOUT)
+        .timeout(REQUEST_TIMEOUT)
+        .build()
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_shared_runtime_is_reused() {
+        let first = shared_runtime() as *const Runtime;
+        let second = shared_runtime() as *const Runtime;
+        assert_eq!(first, second);
+
+        let value = shared_runtime().block_on(async { 21 * 2 });
+        assert_eq!(value, 42);
+    }
+
+    #[test]
+    fn test_build_http_client() {
+        assert!(build_http_client().is_ok());
+    }
+}
@@ -0,0 +1,94 @@
+use std::sync::{Arc, RwLock};
+use tracing::info;
+
+use super::runtime::shared_runtime;
+use super::LlamaModelWrapper;
+
+/// Holds the current model for corrections running on any thread.
+///
+/// Readers clone the `Arc` and release the lock straight away, so a correction
+/// never holds it across a request. Replacing the model does not wait for
+/// corrections in flight; they finish on the model they started with.
+#[derive(Default)]
+pub struct ModelSlot {
+    current: RwLock<Option<Arc<LlamaModelWrapper>>>,
+}
+
+impl ModelSlot {
+    /// The current model, if one is installed
+    pub fn load(&self) -> Option<Arc<LlamaModelWrapper>> {
+        self.current.read().unwrap().clone()
+    }
+
+    /// Install `model`, returning the one it replaces
+    pub fn store(&self, model: Option<Arc<LlamaModelWrapper>>) -> Option<Arc<LlamaModelWrapper>> {
+        std::mem::replace(&mut *self.current.write().unwrap(), model)
+    }
+
+    /// Load `model` on its server, then install it, returning the one it replaces.
+    ///
+    /// Corrections keep using the current model while the new one loads, so
+    /// the first press after a swap does not pay for a cold load. If loading
+    /// fails the current model stays in place. Blocks, so call it off the
+    /// runtime and off the main thread.
+    pub fn replace_warm(&self, model: LlamaModelWrapper) -> Result<Option<Arc<LlamaModelWrapper>>, Box<dyn std::error::Error>> {
+        match shared_runtime().block_on(model.residency().preload(model.keep_alive()))? {
+            Some(load) => info!("🔁 Switching to {} (load took {:?})", model.model_name(), load),
+            None => info!("🔁 Switching to {}", model.model_name()),
+        }
+        Ok(self.store(Some(Arc::new(model))))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use super::super::test_server::{MockResponse, MockServer};
+    use std::time::Duration;
+
+    #[test]
+    fn test_replacing_keeps_loaded_model_alive() {
+        let slot = ModelSlot::default();
+        assert!(slot.load().is_none());
+
+        let first = Arc::new(LlamaModelWrapper::with_endpoint("http://127.0.0.1:9", "first").unwrap());
+        assert!(slot.store(Some(first)).is_none());
+        let in_use = slot.load().unwrap();
+
+        let second = Arc::new(LlamaModelWrapper::with_endpoint("http://127.0.0.1:9", "second").unwrap());
+        let replaced = slot.store(Some(second)).unwrap();
+        assert_eq!(replaced.model_name(), "first");
+        assert_eq!(in_use.model_name(), "first");
+        assert_eq!(slot.load().unwrap().model_name(), "second");
+    }
+
+    #[test]
+    fn test_replace_warm_loads_before_cutover() {
+        let server = MockServer::start(|request| match request.json()["model"].as_str() {
+            Some("second") => MockResponse::json(serde_json::json!({ "done": true, "load_duration": 200_000_000 }))
+                .delayed(Duration::from_millis(200)),
+            _ => MockResponse::status(404),
+        });
+        let slot = Arc::new(ModelSlot::default());
+        slot.store(Some(Arc::new(LlamaModelWrapper::with_endpoint(&server.url(), "first").unwrap())));
+
+        let swapping = Arc::clone(&slot);
+        let url = server.url();
+        let handle = std::thread::spawn(move || {
+            let replaced = swapping.replace_warm(LlamaModelWrapper::with_endpoint(&url, "second").unwrap());
+            replaced.unwrap().unwrap().model_name().to_string()
+        });
+        // Presses made while the new model loads still get the old one
+        std::thread::sleep(Duration::from_millis(50));
+        assert_eq!(slot.load().unwrap().model_name(), "first");
+
+        assert_eq!(handle.join().unwrap(), "first");
+        assert_eq!(slot.load().unwrap().model_name(), "second");
+        assert_eq!(server.requests()[0].json()["model"], "second");
+
+        // A model the server cannot load never replaces a working one
+        let missing = LlamaModelWrapper::with_endpoint(&server.url(), "missing").unwrap();
+        assert!(slot.replace_warm(missing).is_err());
+        assert_eq!(slot.load().unwrap().model_name(), "second");
+    }
+}
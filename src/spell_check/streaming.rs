@@ -0,0 +1,374 @@
+use super::strip_known_prefix;
+
+/// Splits a byte stream into newline-delimited JSON records
+#[derive(Default)]
+pub struct NdjsonLines {
+    pending: Vec<u8>,
+}
+
+impl NdjsonLines {
+    /// Feed raw bytes and return every complete, non-empty line they finish
+    pub fn push(&mut self, bytes: &[u8]) -> Vec<Vec<u8>> {
+        self.pending.extend_from_slice(bytes);
+
+        let mut lines = Vec::new();
+        while let Some(pos) = self.pending.iter().position(|&b| b == b'\n') {
+            let line: Vec<u8> = self.pending.drain(..=pos).collect();
+            let line = line.trim_ascii();
+            if !line.is_empty() {
+                lines.push(line.to_vec());
+            }
+        }
+        lines
+    }
+
+    /// Return the trailing record if the stream ended without a newline
+    pub fn finish(&mut self) -> Vec<Vec<u8>> {
+        let line = std::mem::take(&mut self.pending);
+        let line = line.trim_ascii();
+        if line.is_empty() {
+            Vec::new()
+        } else {
+            vec![line.to_vec()]
+        }
+    }
+}
+
+/// Accumulates streamed tokens and decides when the rest can be discarded.
+///
+/// Prefix stripping runs on every fragment, so generation can stop as soon as
+/// the first line of actual correction is complete or the output has grown
+/// past the length `clean_response` would accept anyway.
+pub struct StreamingCleaner<'a> {
+    original: &'a str,
+    buffer: String,
+    end: Option<usize>,
+}
+
+impl<'a> StreamingCleaner<'a> {
+    pub fn new(original: &'a str) -> Self {
+        Self {
+            original,
+            buffer: String::new(),
+            end: None,
+        }
+    }
+
+    /// Add a token fragment; returns true once no further tokens are needed
+    pub fn push(&mut self, fragment: &str) -> bool {
+        if self.end.is_some() {
+            return true;
+        }
+        self.buffer.push_str(fragment);
+
+        let body = strip_known_prefix(self.buffer.trim_start()).trim_start();
+        let body_start = self.buffer.len() - body.len();
+
+        if let Some(newline) = body.find('\n') {
+            // The body starts with a non-whitespace character, so this
+            // newline terminates a non-empty first line
+            self.end = Some(body_start + newline);
+            return true;
+        }
+
+        if body.len() > self.original.len() * 2 {
+            self.end = Some(self.buffer.len());
+            return true;
+        }
+
+        false
+    }
+
+    /// Number of bytes received so far
+    pub fn len(&self) -> usize {
+        self.buffer.len()
+    }
+
+    /// The received text, cut after the first line once that is complete
+    pub fn text(&self) -> &str {
+        match self.end {
+            Some(end) => &self.buffer[..end],
+            None => &self.buffer,
+        }
+    }
+}
+
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+enum JsonState {
+    /// Before the opening brace
+    Start,
+    /// Inside the object, expecting a key
+    Key,
+    KeyString { escaped: bool },
+    Colon,
+    /// After the wanted key's colon
+    Value,
+    /// Inside the wanted string
+    Field,
+    FieldEscape,
+    FieldUnicode,
+    /// Inside another key's value
+    Skip { depth: u32, in_string: bool, escaped: bool },
+    Done,
+    /// Not JSON, or the object closed without the field
+    Invalid,
+}
+
+/// Extracts one top-level string field from a streamed JSON object.
+///
+/// Fragments are parsed as they arrive, so generation can stop the moment the
+/// field's closing quote comes in rather than after the rest of the object.
+pub struct JsonFieldParser {
+    field: &'static str,
+    state: JsonState,
+    key: String,
+    value: String,
+    /// Hex digits of a `\u` escape in progress
+    unicode: String,
+    /// First half of a surrogate pair, waiting for the second
+    high_surrogate: Option<u32>,
+    received: usize,
+}
+
+impl JsonFieldParser {
+    pub fn new(field: &'static str) -> Self {
+        Self {
+            field,
+            state: JsonState::Start,
+            key: String::new(),
+            value: String::new(),
+            unicode: String::new(),
+            high_surrogate: None,
+            received: 0,
+        }
+    }
+
+    /// Add a fragment; returns true once the field is complete or cannot appear
+    pub fn push(&mut self, fragment: &str) -> bool {
+        self.received += fragment.len();
+        for c in fragment.chars() {
+            if self.is_finished() {
+                break;
+            }
+            self.state = self.step(c);
+        }
+        self.is_finished()
+    }
+
+    fn is_finished(&self) -> bool {
+        matches!(self.state, JsonState::Done | JsonState::Invalid)
+    }
+
+    fn step(&mut self, c: char) -> JsonState {
+        use JsonState::*;
+        match self.state {
+            Start | Key | Colon | Value if c.is_whitespace() => self.state,
+            Start if c == '{' => Key,
+            Key if c == '"' => {
+                self.key.clear();
+                KeyString { escaped: false }
+            }
+            KeyString { escaped: true } => {
+                self.key.push(c);
+                KeyString { escaped: false }
+            }
+            KeyString { escaped: false } => match c {
+                '"' => Colon,
+                '\\' => KeyString { escaped: true },
+                _ => {
+                    self.key.push(c);
+                    self.state
+                }
+            },
+            Colon if c == ':' && self.key == self.field => Value,
+            Colon if c == ':' => Skip { depth: 0, in_string: false, escaped: false },
+            Value if c == '"' => Field,
+            Field => match c {
+                '"' => {
+                    self.flush_surrogate();
+                    Done
+                }
+                '\\' => FieldEscape,
+                _ => {
+                    self.push_value(c);
+                    Field
+                }
+            },
+            FieldEscape => {
+                let decoded = match c {
+                    'n' => '\n',
+                    't' => '\t',
+                    'r' => '\r',
+                    'b' => '\u{8}',
+                    'f' => '\u{c}',
+                    '"' | '\\' | '/' => c,
+                    'u' => {
+                        self.unicode.clear();
+                        return FieldUnicode;
+                    }
+                    _ => return Invalid,
+                };
+                self.push_value(decoded);
+                Field
+            }
+            FieldUnicode => {
+                if !c.is_ascii_hexdigit() {
+                    return Invalid;
+                }
+                self.unicode.push(c);
+                if self.unicode.len() < 4 {
+                    return FieldUnicode;
+                }
+                let code = u32::from_str_radix(&self.unicode, 16).unwrap_or(0xFFFD);
+                self.push_code_unit(code);
+                Field
+            }
+            Skip { depth, in_string: true, escaped } => match c {
+                _ if escaped => Skip { depth, in_string: true, escaped: false },
+                '\\' => Skip { depth, in_string: true, escaped: true },
+                '"' => Skip { depth, in_string: false, escaped: false },
+                _ => self.state,
+            },
+            Skip { depth, in_string: false, .. } => match c {
+                '"' => Skip { depth, in_string: true, escaped: false },
+                '{' | '[' => Skip { depth: depth + 1, in_string: false, escaped: false },
+                '}' | ']' if depth > 0 => Skip { depth: depth - 1, in_string: false, escaped: false },
+                ',' if depth == 0 => Key,
+                // The object closed without the field
+                '}' => Invalid,
+                _ => self.state,
+            },
+            _ => Invalid,
+        }
+    }
+
+    fn push_value(&mut self, c: char) {
+        self.flush_surrogate();
+        self.value.push(c);
+    }
+
+    /// Add a UTF-16 code unit from a `\u` escape, pairing surrogates
+    fn push_code_unit(&mut self, code: u32) {
+        match code {
+            0xD800..=0xDBFF => {
+                self.flush_surrogate();
+                self.high_surrogate = Some(code);
+            }
+            0xDC00..=0xDFFF => match self.high_surrogate.take() {
+                Some(high) => {
+                    let combined = 0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00);
+                    self.value.push(char::from_u32(combined).unwrap_or(char::REPLACEMENT_CHARACTER));
+                }
+                None => self.value.push(char::REPLACEMENT_CHARACTER),
+            },
+            _ => self.push_value(char::from_u32(code).unwrap_or(char::REPLACEMENT_CHARACTER)),
+        }
+    }
+
+    /// A high surrogate without its pair decodes to the replacement character
+    fn flush_surrogate(&mut self) {
+        if self.high_surrogate.take().is_some() {
+            self.value.push(char::REPLACEMENT_CHARACTER);
+        }
+    }
+
+    /// Number of bytes received so far
+    pub fn len(&self) -> usize {
+        self.received
+    }
+
+    /// The field's value, once its closing quote has arrived
+    pub fn value(&self) -> Option<&str> {
+        (self.state == JsonState::Done).then_some(self.value.as_str())
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_ndjson_lines_across_chunks() {
+        let mut lines = NdjsonLines::default();
+        assert!(lines.push(b"{\"response\":\"Th").is_empty());
+
+        let complete = lines.push(b"e\"}\n\n{\"response\":\" cat\"}\n{\"resp");
+        assert_eq!(complete, vec![b"{\"response\":\"The\"}".to_vec(), b"{\"response\":\" cat\"}".to_vec()]);
+
+        let complete = lines.push(b"onse\":\"\"}\n{\"done\":true}");
+        assert_eq!(complete, vec![b"{\"response\":\"\"}".to_vec()]);
+        assert_eq!(lines.finish(), vec![b"{\"done\":true}".to_vec()]);
+        assert!(lines.finish().is_empty());
+    }
+
+    #[test]
+    fn test_stops_after_first_line() {
+        let mut cleaner = StreamingCleaner::new("I have teh cat");
+        assert!(!cleaner.push("I have"));
+        assert!(!cleaner.push(" the cat"));
+        assert!(cleaner.push("\nExplanation: fixed"));
+        assert_eq!(cleaner.text(), "I have the cat");
+    }
+
+    #[test]
+    fn test_strips_prefix_before_looking_for_line_end() {
+        let mut cleaner = StreamingCleaner::new("teh cat");
+        assert!(!cleaner.push("\n\nCorrected version:"));
+        assert!(!cleaner.push("\n"));
+        assert!(!cleaner.push("the cat"));
+        assert!(cleaner.push("\n"));
+        assert_eq!(cleaner.text(), "\n\nCorrected version:\nthe cat");
+    }
+
+    #[test]
+    fn test_stops_when_output_exceeds_length_bound() {
+        let mut cleaner = StreamingCleaner::new("short");
+        assert!(!cleaner.push("a bit"));
+        assert!(cleaner.push(" longer than allowed"));
+        assert_eq!(cleaner.len(), "a bit longer than allowed".len());
+    }
+
+    #[test]
+    fn test_json_field_stops_when_string_closes() {
+        let mut parser = JsonFieldParser::new("corrected");
+        assert!(!parser.push(" {\"correc"));
+        assert!(!parser.push("ted\" : \"I have"));
+        assert_eq!(parser.value(), None);
+        assert!(parser.push(" the cat\", \"note\": \"ignored"));
+        assert_eq!(parser.value(), Some("I have the cat"));
+        // Anything after the closing quote is ignored
+        assert!(parser.push("}"));
+        assert_eq!(parser.value(), Some("I have the cat"));
+    }
+
+    #[test]
+    fn test_json_field_escapes_across_fragments() {
+        let mut parser = JsonFieldParser::new("corrected");
+        for fragment in ["{\"corrected\":\"Say \\", "\"hi\\\" \\u00e9\\u", "d83d\\ude00 \\\\ \\n", "\"}"] {
+            parser.push(fragment);
+        }
+        assert_eq!(parser.value(), Some("Say \"hi\" é😀 \\ \n"));
+    }
+
+    #[test]
+    fn test_json_field_skips_other_keys() {
+        let mut parser = JsonFieldParser::new("corrected");
+        assert!(parser.push(r#"{"notes": {"a": [1, "x\"}"]}, "n": 2, "corrected": "ok"}"#));
+        assert_eq!(parser.value(), Some("ok"));
+    }
+
+    #[test]
+    fn test_json_field_missing_or_malformed() {
+        let mut missing = JsonFieldParser::new("corrected");
+        assert!(missing.push(r#"{"other": "text"}"#));
+        assert_eq!(missing.value(), None);
+
+        let mut not_json = JsonFieldParser::new("corrected");
+        assert!(not_json.push("Corrected version: I have the cat"));
+        assert_eq!(not_json.value(), None);
+
+        let mut not_string = JsonFieldParser::new("corrected");
+        assert!(not_string.push(r#"{"corrected": 42}"#));
+        assert_eq!(not_string.value(), None);
+    }
+}
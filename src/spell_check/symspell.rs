@@ -0,0 +1,613 @@
+use once_cell::sync::Lazy;
+use std::collections::{HashMap, HashSet};
+
+use super::lexicon::{builtin_lexicon, LEXICON};
+
+/// Largest edit distance considered when looking up corrections
+pub const MAX_EDIT_DISTANCE: usize = 2;
+
+/// How much more frequent the best candidate must be than the runner-up
+const DOMINANCE_RATIO: u64 = 20;
+
+/// Lowest confidence at which `correct` applies a dictionary fix
+const CONFIDENT: f32 = 0.85;
+
+/// Confidence when a word looks like a name the dictionary cannot judge
+const NAME_CONFIDENCE: f32 = 0.4;
+
+/// Confidence when a misspelling has no single dominant candidate
+const UNRESOLVED_CONFIDENCE: f32 = 0.2;
+
+/// Confidence of a fix from the known-misspellings table
+const KNOWN_MISSPELLING_CONFIDENCE: f32 = 0.95;
+
+/// Fewest words for a vocabulary to be treated as complete, so that a word it
+/// lacks is a typo rather than a rare word; a few thousand common words would
+/// turn "widow" into "window" and "wolf" into "golf"
+pub const COMPLETE_VOCABULARY_WORDS: usize = 80_000;
+
+/// Built-in word list of about 83k words, one `word count` pair per line
+pub const FREQUENCY_LIST: &str = include_str!("data/en_words.txt");
+
+/// Built-in `misspelling correction` pairs, none of which is a word itself
+const MISSPELLINGS_LIST: &str = include_str!("data/en_misspellings.txt");
+
+/// Dictionary corrector tried before the LLM
+pub static DICTIONARY: Lazy<DictionaryCorrector> = Lazy::new(DictionaryCorrector::builtin);
+
+static KNOWN_MISSPELLINGS: Lazy<HashMap<&'static str, &'static str>> = Lazy::new(|| {
+    MISSPELLINGS_LIST
+        .lines()
+        .map(str::trim)
+        .filter(|line| !line.is_empty() && !line.starts_with('#'))
+        .filter_map(|line| line.split_once(' '))
+        .collect()
+});
+
+/// `word count` pairs from a frequency list; blank lines and `#` comments are skipped
+pub fn parse_frequency_list(list: &str) -> impl Iterator<Item = (&str, u64)> {
+    list.lines()
+        .map(str::trim)
+        .filter(|line| !line.is_empty() && !line.starts_with('#'))
+        .filter_map(|line| {
+            let mut parts = line.split_whitespace();
+            let word = parts.next()?;
+            Some((word, parts.next().and_then(|c| c.parse().ok()).unwrap_or(1)))
+        })
+}
+
+/// Words with frequencies that can be searched for close matches
+pub trait WordIndex: Send + Sync {
+    /// Whether the (lowercase) word is in the dictionary
+    fn contains(&self, word: &str) -> bool;
+
+    /// Dictionary words within the maximum edit distance, closest and most frequent first
+    fn lookup(&self, word: &str) -> Vec<Suggestion>;
+
+    /// Number of dictionary words
+    fn len(&self) -> usize;
+}
+
+impl<T: WordIndex + ?Sized> WordIndex for &T {
+    fn contains(&self, word: &str) -> bool {
+        (**self).contains(word)
+    }
+
+    fn lookup(&self, word: &str) -> Vec<Suggestion> {
+        (**self).lookup(word)
+    }
+
+    fn len(&self) -> usize {
+        (**self).len()
+    }
+}
+
+/// A dictionary word close to the looked-up term
+#[derive(Clone, Debug, PartialEq)]
+pub struct Suggestion {
+    pub term: String,
+    pub distance: usize,
+    pub count: u64,
+}
+
+/// Dictionary output with the confidence of its least certain word
+#[derive(Clone, Debug, PartialEq)]
+pub struct ScoredCorrection {
+    pub text: String,
+    pub confidence: f32,
+}
+
+/// Symmetric-delete spelling index held in memory; `MappedLexicon` is the
+/// compiled form of the same index.
+///
+/// Every dictionary word is stored under all the strings reachable by deleting
+/// up to `max_edit_distance` characters, so a lookup only has to generate the
+/// deletes of the input instead of every possible edit.
+pub struct SymSpell {
+    max_edit_distance: usize,
+    words: Vec<(String, u64)>,
+    index: HashMap<String, u32>,
+    deletes: HashMap<String, Vec<u32>>,
+}
+
+impl SymSpell {
+    pub fn new(max_edit_distance: usize) -> Self {
+        Self {
+            max_edit_distance,
+            words: Vec::new(),
+            index: HashMap::new(),
+            deletes: HashMap::new(),
+        }
+    }
+
+    /// Build from `word count` lines; blank lines and `#` comments are skipped
+    #[allow(dead_code)]
+    pub fn from_frequency_list(list: &str, max_edit_distance: usize) -> Self {
+        let mut symspell = Self::new(max_edit_distance);
+        for (word, count) in parse_frequency_list(list) {
+            symspell.add_word(word, count);
+        }
+        symspell
+    }
+
+    /// Add a word, or raise its count if it is already known
+    #[allow(dead_code)]
+    pub fn add_word(&mut self, word: &str, count: u64) {
+        let word = word.to_lowercase();
+        if let Some(&id) = self.index.get(&word) {
+            let entry = &mut self.words[id as usize].1;
+            *entry = (*entry).max(count);
+            return;
+        }
+
+        let id = self.words.len() as u32;
+        for variant in deletes(&word, self.max_edit_distance) {
+            self.deletes.entry(variant).or_default().push(id);
+        }
+        self.index.insert(word.clone(), id);
+        self.words.push((word, count));
+    }
+
+    /// Whether the (lowercase) word is in the dictionary
+    pub fn contains(&self, word: &str) -> bool {
+        self.index.contains_key(word)
+    }
+
+    /// Number of dictionary words
+    #[allow(dead_code)]
+    pub fn len(&self) -> usize {
+        self.words.len()
+    }
+
+    /// Dictionary words within the maximum edit distance, closest and most frequent first
+    pub fn lookup(&self, word: &str) -> Vec<Suggestion> {
+        let word = word.to_lowercase();
+        if let Some(&id) = self.index.get(&word) {
+            return vec![self.suggestion(id, 0)];
+        }
+
+        let input_len = word.chars().count();
+        let mut seen = HashSet::new();
+        let mut suggestions = Vec::new();
+
+        for variant in deletes(&word, self.max_edit_distance) {
+            let Some(ids) = self.deletes.get(&variant) else { continue };
+            for &id in ids {
+                if !seen.insert(id) {
+                    continue;
+                }
+                let term = &self.words[id as usize].0;
+                if term.chars().count().abs_diff(input_len) > self.max_edit_distance {
+                    continue;
+                }
+                let distance = edit_distance(&word, term);
+                if distance <= self.max_edit_distance {
+                    suggestions.push(self.suggestion(id, distance));
+                }
+            }
+        }
+
+        suggestions.sort_by(|a, b| a.distance.cmp(&b.distance).then(b.count.cmp(&a.count)));
+        suggestions
+    }
+
+    fn suggestion(&self, id: u32, distance: usize) -> Suggestion {
+        let (term, count) = &self.words[id as usize];
+        Suggestion {
+            term: term.clone(),
+            distance,
+            count: *count,
+        }
+    }
+}
+
+impl WordIndex for SymSpell {
+    fn contains(&self, word: &str) -> bool {
+        SymSpell::contains(self, word)
+    }
+
+    fn lookup(&self, word: &str) -> Vec<Suggestion> {
+        SymSpell::lookup(self, word)
+    }
+
+    fn len(&self) -> usize {
+        self.words.len()
+    }
+}
+
+/// The word itself plus every string reachable by deleting up to `max` characters
+pub fn deletes(word: &str, max: usize) -> HashSet<String> {
+    let mut result = HashSet::new();
+    result.insert(word.to_string());
+
+    let mut frontier = vec![word.to_string()];
+    for _ in 0..max {
+        let mut next = Vec::new();
+        for item in &frontier {
+            let chars: Vec<char> = item.chars().collect();
+            if chars.len() <= 1 {
+                continue;
+            }
+            for skip in 0..chars.len() {
+                let variant: String = chars
+                    .iter()
+                    .enumerate()
+                    .filter(|(i, _)| *i != skip)
+                    .map(|(_, c)| c)
+                    .collect();
+                if result.insert(variant.clone()) {
+                    next.push(variant);
+                }
+            }
+        }
+        frontier = next;
+    }
+    result
+}
+
+/// Optimal string alignment distance (Levenshtein plus adjacent transpositions)
+pub fn edit_distance(a: &str, b: &str) -> usize {
+    let a: Vec<char> = a.chars().collect();
+    let b: Vec<char> = b.chars().collect();
+    let mut d = vec![vec![0usize; b.len() + 1]; a.len() + 1];
+
+    for (i, row) in d.iter_mut().enumerate() {
+        row[0] = i;
+    }
+    for j in 0..=b.len() {
+        d[0][j] = j;
+    }
+    for i in 1..=a.len() {
+        for j in 1..=b.len() {
+            let cost = if a[i - 1] == b[j - 1] { 0 } else { 1 };
+            d[i][j] = (d[i - 1][j] + 1).min(d[i][j - 1] + 1).min(d[i - 1][j - 1] + cost);
+            if i > 1 && j > 1 && a[i - 1] == b[j - 2] && a[i - 2] == b[j - 1] {
+                d[i][j] = d[i][j].min(d[i - 2][j - 2] + 1);
+            }
+        }
+    }
+    d[a.len()][b.len()]
+}
+
+/// Fixes texts whose every misspelling has a single high-confidence candidate.
+///
+/// Known misspellings are always fixed. Edit-distance candidates are only
+/// trusted from a complete vocabulary; otherwise an unknown word is left for
+/// the model.
+pub struct DictionaryCorrector {
+    words: Box<dyn WordIndex>,
+    complete: bool,
+}
+
+impl DictionaryCorrector {
+    pub fn new(words: impl WordIndex + 'static) -> Self {
+        let complete = words.len() >= COMPLETE_VOCABULARY_WORDS;
+        Self { words: Box::new(words), complete }
+    }
+
+    /// Treat `words` as complete whatever its size, e.g. a domain word list
+    #[allow(dead_code)]
+    pub fn with_complete_vocabulary(words: impl WordIndex + 'static) -> Self {
+        Self { words: Box::new(words), complete: true }
+    }
+
+    /// The built-in corrector, searching the compiled built-in lexicon in place
+    pub fn builtin() -> Self {
+        Lazy::force(&KNOWN_MISSPELLINGS);
+        Self::new(builtin_lexicon())
+    }
+
+    /// Whether the word, or an inflection of a dictionary word, is known
+    pub fn is_known(&self, word: &str) -> bool {
+        is_known_word(word, |w| self.words.contains(w))
+    }
+
+    /// Correct the text, or `None` if there is nothing to fix or a fix is uncertain
+    #[allow(dead_code)]
+    pub fn correct(&self, text: &str) -> Option<String> {
+        let scored = self.correct_scored(text);
+        (scored.text != text && scored.confidence >= CONFIDENT).then_some(scored.text)
+    }
+
+    /// Replace every misspelling that has a confident candidate and score the result.
+    ///
+    /// The confidence is that of the least certain word, so one unresolved word
+    /// (left unchanged) keeps the whole text below the confident level.
+    pub fn correct_scored(&self, text: &str) -> ScoredCorrection {
+        let mut output = String::with_capacity(text.len());
+        let mut confidence: f32 = 1.0;
+        let mut sentence_start = true;
+
+        for (is_word, token) in tokenize(text) {
+            if !is_word {
+                if token.chars().any(|c| matches!(c, '.' | '!' | '?')) {
+                    sentence_start = true;
+                }
+                output.push_str(token);
+                continue;
+            }
+
+            let at_sentence_start = sentence_start;
+            sentence_start = false;
+
+            // Capitalised mid-sentence or mixed case: likely a name
+            let has_inner_upper = token.chars().skip(1).any(|c| c.is_uppercase());
+            let all_upper = token.chars().all(|c| !c.is_lowercase());
+            let starts_upper = token.chars().next().is_some_and(|c| c.is_uppercase());
+            let looks_like_name = (has_inner_upper && !all_upper) || (starts_upper && !at_sentence_start && !all_upper);
+
+            // Before the known-word check, which reads "occured" as occur + ed
+            let misspelling = KNOWN_MISSPELLINGS.get(token.to_lowercase().as_str()).filter(|_| !looks_like_name);
+            if let Some(correction) = misspelling {
+                output.push_str(&match_case(token, correction));
+                confidence = confidence.min(KNOWN_MISSPELLING_CONFIDENCE);
+                continue;
+            }
+
+            if self.is_known(token) || LEXICON.is_known(token) {
+                output.push_str(token);
+                continue;
+            }
+
+            // Leave names to the model
+            if looks_like_name {
+                output.push_str(token);
+                confidence = confidence.min(NAME_CONFIDENCE);
+                continue;
+            }
+
+            match self.confident_candidate(token) {
+                Some((replacement, word_confidence)) => {
+                    output.push_str(&match_case(token, &replacement));
+                    confidence = confidence.min(word_confidence);
+                }
+                None => {
+                    output.push_str(token);
+                    confidence = confidence.min(UNRESOLVED_CONFIDENCE);
+                }
+            }
+        }
+
+        ScoredCorrection { text: output, confidence }
+    }
+
+    /// The single dominant candidate for a misspelling, with its confidence
+    fn confident_candidate(&self, word: &str) -> Option<(String, f32)> {
+        if !self.complete {
+            return None;
+        }
+
+        let suggestions = self.words.lookup(word);
+        let best = suggestions.first()?;
+        if best.distance == 0 {
+            return None;
+        }
+        // Two-edit fixes are only safe on longer words
+        if best.distance > 1 && word.chars().count() < 5 {
+            return None;
+        }
+
+        let runner_up = suggestions.iter().skip(1).find(|s| s.distance == best.distance);
+        let confidence = if best.distance == 1 { 0.95 } else { CONFIDENT };
+        match runner_up {
+            Some(other) if best.count < other.count.saturating_mul(DOMINANCE_RATIO) => None,
+            _ => Some((best.term.clone(), confidence)),
+        }
+    }
+}
+
+/// Whether `word` or a regular inflection of it is accepted by `contains`.
+///
+/// `contains` is given lowercase words with straight apostrophes.
+pub fn is_known_word(word: &str, contains: impl Fn(&str) -> bool) -> bool {
+    let lower = word.to_lowercase().replace('’', "'");
+    if lower.chars().count() <= 1 || contains(&lower) {
+        return true;
+    }
+
+    // Regular inflections of known words: cats, fixed, typing, quickly...
+    const SUFFIXES: [(&str, &str); 12] = [
+        ("'s", ""), ("ies", "y"), ("ied", "y"), ("es", ""), ("s", ""), ("ed", ""),
+        ("ed", "e"), ("ing", ""), ("ing", "e"), ("ly", ""), ("er", ""), ("est", ""),
+    ];
+    SUFFIXES.iter().any(|(suffix, replacement)| {
+        let Some(stem) = lower.strip_suffix(suffix) else { return false };
+        if stem.len() < 2 {
+            return false;
+        }
+        let stem = format!("{}{}", stem, replacement);
+        if contains(&stem) {
+            return true;
+        }
+        // Doubled final consonant: stopped, running, bigger
+        let mut chars: Vec<char> = stem.chars().collect();
+        let n = chars.len();
+        if n >= 3 && chars[n - 1] == chars[n - 2] {
+            chars.pop();
+            return contains(&chars.into_iter().collect::<String>());
+        }
+        false
+    })
+}
+
+/// Split text into word tokens (letters and inner apostrophes) and everything else
+pub fn tokenize(text: &str) -> Vec<(bool, &str)> {
+    let mut tokens = Vec::new();
+    let mut start = 0;
+    let mut in_word = false;
+    let chars: Vec<(usize, char)> = text.char_indices().collect();
+
+    for (i, &(pos, c)) in chars.iter().enumerate() {
+        let next_is_letter = chars.get(i + 1).is_some_and(|&(_, n)| n.is_alphabetic());
+        let is_word_char = c.is_alphabetic() || (in_word && (c == '\'' || c == '’') && next_is_letter);
+        if is_word_char != in_word && pos > start {
+            tokens.push((in_word, &text[start..pos]));
+            start = pos;
+        }
+        in_word = is_word_char;
+    }
+    if start < text.len() {
+        tokens.push((in_word, &text[start..]));
+    }
+    tokens
+}
+
+/// Apply the capitalisation of `original` to `replacement`
+pub fn match_case(original: &str, replacement: &str) -> String {
+    let letters: Vec<char> = original.chars().filter(|c| c.is_alphabetic()).collect();
+    if letters.len() > 1 && letters.iter().all(|c| c.is_uppercase()) {
+        return replacement.to_uppercase();
+    }
+    if letters.first().is_some_and(|c| c.is_uppercase()) {
+        let mut chars = replacement.chars();
+        return match chars.next() {
+            Some(first) => first.to_uppercase().chain(chars).collect(),
+            None => String::new(),
+        };
+    }
+    replacement.to_string()
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn small_dictionary() -> SymSpell {
+        SymSpell::from_frequency_list("the 1000\nreceive 50\nmessage 40\ntheir 200\ntier 3\ncat 30\nhelp 100\nwith 500\ni 900\n", 2)
+    }
+
+    #[test]
+    fn test_edit_distance() {
+        assert_eq!(edit_distance("teh", "the"), 1);
+        assert_eq!(edit_distance("recieve", "receive"), 1);
+        assert_eq!(edit_distance("mesage", "message"), 1);
+        assert_eq!(edit_distance("kitten", "sitting"), 3);
+        assert_eq!(edit_distance("", "abc"), 3);
+    }
+
+    #[test]
+    fn test_lookup_orders_by_distance_then_frequency() {
+        let symspell = small_dictionary();
+        let suggestions = symspell.lookup("thier");
+        assert_eq!(suggestions[0].term, "their");
+        assert_eq!(suggestions[0].distance, 1);
+        assert!(suggestions.iter().any(|s| s.term == "tier"));
+
+        assert_eq!(symspell.lookup("cat")[0].distance, 0);
+        assert!(symspell.lookup("xyzzy").is_empty());
+    }
+
+    #[test]
+    fn test_corrects_readme_example() {
+        let corrector = DictionaryCorrector::with_complete_vocabulary(small_dictionary());
+        assert_eq!(
+            corrector.correct("I recieve teh mesage with thier help."),
+            Some("I receive the message with their help.".to_string())
+        );
+    }
+
+    #[test]
+    fn test_preserves_case() {
+        let corrector = DictionaryCorrector::with_complete_vocabulary(small_dictionary());
+        assert_eq!(corrector.correct("Teh cat"), Some("The cat".to_string()));
+        assert_eq!(corrector.correct("TEH CAT"), Some("THE CAT".to_string()));
+    }
+
+    #[test]
+    fn test_leaves_clean_and_ambiguous_text_to_the_model() {
+        let corrector = DictionaryCorrector::with_complete_vocabulary(small_dictionary());
+        // Nothing to fix
+        assert_eq!(corrector.correct("the cat"), None);
+        // Inflections of known words are not misspellings
+        assert_eq!(corrector.correct("the cats helped"), None);
+        // No candidate at all
+        assert_eq!(corrector.correct("teh xyzzy"), None);
+        // Looks like a name
+        assert_eq!(corrector.correct("teh cat with Thier"), None);
+    }
+
+    #[test]
+    fn test_scored_correction_keeps_confident_fixes() {
+        let corrector = DictionaryCorrector::with_complete_vocabulary(small_dictionary());
+        let scored = corrector.correct_scored("teh cat with thier xyzzy");
+        // The unresolved word is left for the next tier, the rest is fixed
+        assert_eq!(scored.text, "the cat with their xyzzy");
+        assert!(scored.confidence < CONFIDENT);
+
+        let scored = corrector.correct_scored("teh cat");
+        assert_eq!(scored.text, "the cat");
+        assert!(scored.confidence >= CONFIDENT);
+        assert_eq!(corrector.correct_scored("the cat").confidence, 1.0);
+    }
+
+    #[test]
+    fn test_rejects_close_competitors() {
+        let symspell = SymSpell::from_frequency_list("cat 100\ncar 90\n", 2);
+        let corrector = DictionaryCorrector::with_complete_vocabulary(symspell);
+        assert_eq!(corrector.correct("cax"), None);
+    }
+
+    #[test]
+    fn test_small_vocabulary_only_fixes_known_misspellings() {
+        // Nine words are nowhere near complete: "cax" may well be a real word
+        let corrector = DictionaryCorrector::new(small_dictionary());
+        assert_eq!(corrector.correct("the cax"), None);
+        assert_eq!(corrector.correct("teh cat"), Some("the cat".to_string()));
+    }
+
+    #[test]
+    fn test_builtin_dictionary() {
+        // A full-size vocabulary, searched in the compiled lexicon
+        assert!(DICTIONARY.complete);
+        assert!(DICTIONARY.words.len() >= COMPLETE_VOCABULARY_WORDS);
+        assert_eq!(
+            DICTIONARY.correct("I recieve teh mesage with thier help."),
+            Some("I receive the message with their help.".to_string())
+        );
+        assert_eq!(DICTIONARY.correct("I don't think so."), None);
+        assert_eq!(DICTIONARY.correct("I recieved it yesterday"), Some("I received it yesterday".to_string()));
+    }
+
+    #[test]
+    fn test_builtin_dictionary_fixes_by_edit_distance() {
+        // None of these is in the known-misspellings table
+        for (typo, fixed) in [("langauge", "language"), ("hapened", "happened"), ("beautful", "beautiful"), ("problm", "problem")] {
+            assert!(!KNOWN_MISSPELLINGS.contains_key(typo));
+            let text = format!("the {} was odd", typo);
+            assert_eq!(DICTIONARY.correct(&text), Some(format!("the {} was odd", fixed)), "{}", typo);
+        }
+        // American spellings are words, not typos of the British ones
+        assert_eq!(DICTIONARY.correct("we analyze the labor market"), None);
+    }
+
+    #[test]
+    fn test_builtin_dictionary_keeps_less_common_words() {
+        for text in [
+            "the widow", "the mayor", "a hunch", "beef stew", "the wolf howled",
+            "a foal", "the bridle", "a gecko",
+        ] {
+            let scored = DICTIONARY.correct_scored(text);
+            let kept: Vec<&str> = text.split(' ').skip(1).collect();
+            assert!(kept.iter().all(|word| scored.text.contains(word)), "{} became {}", text, scored.text);
+            assert!(scored.confidence < CONFIDENT || scored.text == text, "{} at {}", text, scored.confidence);
+        }
+        assert_eq!(DICTIONARY.correct("Thier widow"), Some("Their widow".to_string()));
+    }
+
+    #[test]
+    fn test_known_misspellings_are_not_words() {
+        assert!(KNOWN_MISSPELLINGS.len() > 100);
+        let words: HashSet<&str> = FREQUENCY_LIST.lines().filter_map(|line| line.split_whitespace().next()).collect();
+        assert!(KNOWN_MISSPELLINGS.keys().all(|misspelling| !words.contains(misspelling)));
+        assert_eq!(DICTIONARY.correct("it occured to me"), Some("it occurred to me".to_string()));
+    }
+
+    #[test]
+    fn test_tokenize_keeps_everything() {
+        let text = "Don't  stop—it's 5 o'clock!";
+        let tokens = tokenize(text);
+        assert_eq!(tokens.iter().map(|(_, t)| *t).collect::<String>(), text);
+        assert!(tokens.contains(&(true, "Don't")));
+        assert!(tokens.contains(&(true, "o'clock")));
+    }
+}
@@ -0,0 +1,239 @@
+// Minimal HTTP/1.1 stand-in server for exercising the inference client in tests
+
+use std::io::{BufRead, BufReader, Read, Write};
+use std::net::{TcpListener, TcpStream};
+use std::sync::atomic::{AtomicBool, AtomicUsize, Ordering};
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::Duration;
+
+/// A request received by the mock server
+#[derive(Clone, Debug)]
+pub struct MockRequest {
+    pub method: String,
+    pub path: String,
+    pub body: String,
+}
+
+impl MockRequest {
+    /// Parse the request body as JSON
+    pub fn json(&self) -> serde_json::Value {
+        serde_json::from_str(&self.body).unwrap_or(serde_json::Value::Null)
+    }
+}
+
+/// A canned response; multiple chunks are sent with chunked transfer encoding
+#[derive(Clone, Debug)]
+pub struct MockResponse {
+    pub status: u16,
+    pub delay: Duration,
+    pub chunks: Vec<(Duration, String)>,
+}
+
+impl MockResponse {
+    /// A JSON response sent in one piece
+    pub fn json(body: serde_json::Value) -> Self {
+        Self {
+            status: 200,
+            delay: Duration::ZERO,
+            chunks: vec![(Duration::ZERO, body.to_string())],
+        }
+    }
+
+    /// An empty response with the given status code
+    pub fn status(status: u16) -> Self {
+        Self {
+            status,
+            delay: Duration::ZERO,
+            chunks: vec![(Duration::ZERO, String::new())],
+        }
+    }
+
+    /// A chunked response where each chunk is written after its delay
+    pub fn streamed(chunks: Vec<(Duration, String)>) -> Self {
+        Self {
+            status: 200,
+            delay: Duration::ZERO,
+            chunks,
+        }
+    }
+
+    /// Wait before sending the response headers
+    pub fn delayed(mut self, delay: Duration) -> Self {
+        self.delay = delay;
+        self
+    }
+}
+
+type Handler = dyn Fn(&MockRequest) -> MockResponse + Send + Sync;
+
+/// Local server that answers every request through a handler closure
+pub struct MockServer {
+    port: u16,
+    requests: Arc<Mutex<Vec<MockRequest>>>,
+    aborted_streams: Arc<AtomicUsize>,
+    shutdown: Arc<AtomicBool>,
+}
+
+impl MockServer {
+    /// Start a server on an ephemeral localhost port
+    pub fn start<F>(handler: F) -> Self
+    where
+        F: Fn(&MockRequest) -> MockResponse + Send + Sync + 'static,
+    {
+        let listener = TcpListener::bind("127.0.0.1:0").expect("bind mock server");
+        let port = listener.local_addr().unwrap().port();
+        let requests = Arc::new(Mutex::new(Vec::new()));
+        let aborted_streams = Arc::new(AtomicUsize::new(0));
+        let shutdown = Arc::new(AtomicBool::new(false));
+        let handler: Arc<Handler> = Arc::new(handler);
+
+        {
+            let requests = Arc::clone(&requests);
+            let aborted_streams = Arc::clone(&aborted_streams);
+            let shutdown = Arc::clone(&shutdown);
+            thread::spawn(move || {
+                for stream in listener.incoming() {
+                    if shutdown.load(Ordering::SeqCst) {
+                        break;
+                    }
+                    let Ok(stream) = stream else { continue };
+                    let handler = Arc::clone(&handler);
+                    let requests = Arc::clone(&requests);
+                    let aborted_streams = Arc::clone(&aborted_streams);
+                    thread::spawn(move || {
+                        serve_connection(stream, &*handler, &requests, &aborted_streams);
+                    });
+                }
+            });
+        }
+
+        Self {
+            port,
+            requests,
+            aborted_streams,
+            shutdown,
+        }
+    }
+
+    /// Base URL of the server, e.g. `http://127.0.0.1:4242`
+    pub fn url(&self) -> String {
+        format!("http://127.0.0.1:{}", self.port)
+    }
+
+    /// All requests received so far
+    pub fn requests(&self) -> Vec<MockRequest> {
+        self.requests.lock().unwrap().clone()
+    }
+
+    /// Number of requests received so far
+    pub fn request_count(&self) -> usize {
+        self.requests.lock().unwrap().len()
+    }
+
+    /// Number of streamed responses the client hung up on before the end
+    pub fn aborted_streams(&self) -> usize {
+        self.aborted_streams.load(Ordering::SeqCst)
+    }
+}
+
+impl Drop for MockServer {
+    fn drop(&mut self) {
+        self.shutdown.store(true, Ordering::SeqCst);
+        // Wake the accept loop so it notices the shutdown flag
+        let _ = TcpStream::connect(("127.0.0.1", self.port));
+    }
+}
+
+fn serve_connection(
+    stream: TcpStream,
+    handler: &Handler,
+    requests: &Mutex<Vec<MockRequest>>,
+    aborted_streams: &AtomicUsize,
+) {
+    let _ = stream.set_nodelay(true);
+    let mut writer = match stream.try_clone() {
+        Ok(writer) => writer,
+        Err(_) => return,
+    };
+    let mut reader = BufReader::new(stream);
+
+    // Keep-alive: serve requests until the client closes the connection
+    while let Some(request) = read_request(&mut reader) {
+        requests.lock().unwrap().push(request.clone());
+        let response = handler(&request);
+        if !write_response(&mut writer, &response) {
+            if response.chunks.len() > 1 {
+                aborted_streams.fetch_add(1, Ordering::SeqCst);
+            }
+            return;
+        }
+    }
+}
+
+fn read_request(reader: &mut BufReader<TcpStream>) -> Option<MockRequest> {
+    let mut request_line = String::new();
+    if reader.read_line(&mut request_line).ok()? == 0 {
+        return None;
+    }
+    let mut parts = request_line.split_whitespace();
+    let method = parts.next()?.to_string();
+    let path = parts.next()?.to_string();
+
+    let mut content_length = 0;
+    loop {
+        let mut line = String::new();
+        if reader.read_line(&mut line).ok()? == 0 {
+            return None;
+        }
+        let line = line.trim_end();
+        if line.is_empty() {
+            break;
+        }
+        if let Some((name, value)) = line.split_once(':') {
+            if name.trim().eq_ignore_ascii_case("content-length") {
+                content_length = value.trim().parse().unwrap_or(0);
+            }
+        }
+    }
+
+    let mut body = vec![0u8; content_length];
+    reader.read_exact(&mut body).ok()?;
+
+    Some(MockRequest {
+        method,
+        path,
+        body: String::from_utf8_lossy(&body).into_owned(),
+    })
+}
+
+/// Write the response, returning false if the client went away mid-way
+fn write_response(writer: &mut TcpStream, response: &MockResponse) -> bool {
+    thread::sleep(response.delay);
+
+    if response.chunks.len() <= 1 {
+        let body = response.chunks.first().map(|(_, body)| body.as_str()).unwrap_or("");
+        let head = format!(
+            "HTTP/1.1 {} Mock\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n",
+            response.status,
+            body.len()
+        );
+        return writer.write_all(head.as_bytes()).is_ok() && writer.write_all(body.as_bytes()).is_ok();
+    }
+
+    let head = format!(
+        "HTTP/1.1 {} Mock\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n",
+        response.status
+    );
+    if writer.write_all(head.as_bytes()).is_err() {
+        return false;
+    }
+    for (delay, chunk) in &response.chunks {
+        thread::sleep(*delay);
+        let framed = format!("{:x}\r\n{}\r\n", chunk.len(), chunk);
+        if writer.write_all(framed.as_bytes()).and_then(|_| writer.flush()).is_err() {
+            return false;
+        }
+    }
+    writer.write_all(b"0\r\n\r\n").is_ok()
+}